@@ -1,7 +1,43 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+# bcrypt solta o GIL: um pool pequeno de threads roda hashes em paralelo sem travar o loop.
+HASH_THREADS = int(os.getenv("HASH_THREADS", "4"))
+# Controle de admissão: acima disso (rodando + na fila) a requisição é recusada com 503
+# em vez de acumular espera (com ~200 ms por hash, 32 na fila já são ~1,6 s com 4 threads).
+HASH_FILA_MAX = int(os.getenv("HASH_FILA_MAX", "32"))
+
+_pool = ThreadPoolExecutor(max_workers=HASH_THREADS, thread_name_prefix="bcrypt")
+_em_uso = 0  # só é alterado no event loop
+
+
+class HashOcupado(Exception):
+    """Pool de hash cheio; o cliente deve tentar de novo em instantes."""
+
+
 def gerar_hash(senha: str) -> str:
     return bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 def verificar_hash(senha: str, senha_hash: str) -> bool:
     return bcrypt.checkpw(senha.encode('utf-8'), senha_hash.encode('utf-8'))
+
+
+async def _no_pool(fn, *args):
+    global _em_uso
+    if _em_uso >= HASH_FILA_MAX:
+        raise HashOcupado()
+    _em_uso += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+    finally:
+        _em_uso -= 1
+
+
+async def gerar_hash_async(senha: str) -> str:
+    return await _no_pool(gerar_hash, senha)
+
+async def verificar_hash_async(senha: str, senha_hash: str) -> bool:
+    return await _no_pool(verificar_hash, senha, senha_hash)
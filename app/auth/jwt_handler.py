@@ -1,6 +1,8 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from jose import jwt
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +10,7 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
 ALGORITHM = "HS256"
 DEFAULT_ACCESS_MIN = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+JWT_CACHE_MAX = int(os.getenv("JWT_CACHE_MAX", "4096"))
 
 def criar_token(dados: dict, *, minutes: int | None = None) -> str:
     """Gera JWT com expiração configurável em minutos (default via env)."""
@@ -19,3 +22,45 @@ def criar_token(dados: dict, *, minutes: int | None = None) -> str:
 
 def decodificar_token(token: str) -> dict:
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+class CacheAteExpirar:
+    """
+    LRU pequeno indexado pelo token: cada entrada vale até o `exp` do próprio JWT.
+    Usado só no event loop (sem locks).
+    """
+
+    def __init__(self, maximo: int = JWT_CACHE_MAX):
+        self.maximo = maximo
+        self._itens: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    def get(self, token: str):
+        item = self._itens.get(token)
+        if item is None:
+            return None
+        exp, valor = item
+        if exp <= time.time():
+            del self._itens[token]
+            return None
+        self._itens.move_to_end(token)
+        return valor
+
+    def put(self, token: str, exp: float, valor) -> None:
+        self._itens[token] = (exp, valor)
+        self._itens.move_to_end(token)
+        while len(self._itens) > self.maximo:
+            self._itens.popitem(last=False)
+
+    def clear(self) -> None:
+        self._itens.clear()
+
+
+_payloads = CacheAteExpirar()
+
+def decodificar_token_cache(token: str) -> dict:
+    """`decodificar_token` com memória: tokens já verificados não passam de novo pela assinatura."""
+    payload = _payloads.get(token)
+    if payload is None:
+        payload = decodificar_token(token)  # levanta se inválido/expirado (nada é cacheado)
+        _payloads.put(token, payload.get("exp") or time.time(), payload)
+    return payload
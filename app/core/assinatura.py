@@ -0,0 +1,41 @@
+# app/core/assinatura.py
+"""
+URLs assinadas (HMAC-SHA256) para entregar blobs sem passar pela autenticação/Mongo:
+a API emite um link curto para /api/arquivos/<sha>.<ext> e quem entrega só confere
+a assinatura e a validade.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import time
+from typing import Optional
+from urllib.parse import urlencode
+
+from app.auth.jwt_handler import SECRET_KEY
+
+ARQUIVOS_SECRET = (os.getenv("ARQUIVOS_SECRET") or SECRET_KEY).encode("utf-8")
+ARQUIVOS_LINK_TTL = int(os.getenv("ARQUIVOS_LINK_TTL", "900"))  # segundos
+ARQUIVOS_PREFIXO = "/api/arquivos"
+
+
+def _assinatura(nome_arquivo: str, exp: int, nome: Optional[str]) -> str:
+    msg = f"{nome_arquivo}\n{exp}\n{nome or ''}".encode("utf-8")
+    digest = hmac.new(ARQUIVOS_SECRET, msg, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def gerar_link(sha256: str, ext: str, *, nome: Optional[str] = None, ttl: Optional[int] = None) -> tuple[str, int]:
+    """Retorna (url, exp). `nome` é o nome sugerido no download e também é assinado."""
+    exp = int(time.time()) + (ttl or ARQUIVOS_LINK_TTL)
+    nome_arquivo = f"{sha256}.{ext}"
+    params = {"exp": exp, "sig": _assinatura(nome_arquivo, exp, nome)}
+    if nome:
+        params["nome"] = nome
+    return f"{ARQUIVOS_PREFIXO}/{nome_arquivo}?{urlencode(params)}", exp
+
+
+def verificar_link(nome_arquivo: str, exp: int, sig: str, nome: Optional[str] = None) -> bool:
+    if exp < time.time():
+        return False
+    return hmac.compare_digest(_assinatura(nome_arquivo, exp, nome), sig)
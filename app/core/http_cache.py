@@ -0,0 +1,57 @@
+# app/core/http_cache.py
+"""
+Validadores HTTP para arquivos endereçados por conteúdo: o SHA-256 gravado na geração
+vira um ETag forte (sem ler o arquivo), `If-None-Match` responde 304 e URLs versionadas
+(`?v=<sha>`) podem ser cacheadas como imutáveis. Range/If-Range ficam com o FileResponse
+do Starlette (206 simples e multipart/byteranges), com o Content-Type multipart corrigido.
+"""
+import os
+
+from fastapi import Request
+from fastapi.responses import FileResponse
+
+CACHE_IMUTAVEL = "private, max-age=31536000, immutable"
+CACHE_REVALIDAR = "private, no-cache"
+
+
+def etag_forte(sha256: str) -> str:
+    return f'"{sha256}"'
+
+
+def nao_modificado(request: Request, etag: str) -> bool:
+    """True se o `If-None-Match` do cliente já contém `etag` (comparação fraca, RFC 9110)."""
+    valor = request.headers.get("if-none-match")
+    if not valor:
+        return False
+    if valor.strip() == "*":
+        return True
+    return etag in (t.strip().removeprefix("W/") for t in valor.split(","))
+
+
+def _corrigir_multipart(headers: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+    """
+    O Starlette anuncia `multipart/byteranges; boundary=...` no Content-Range; pela RFC 9110
+    ele é o Content-Type da resposta 206 com várias faixas (e não há Content-Range no topo).
+    """
+    multipart = next((v for k, v in headers if k == b"content-range" and v.startswith(b"multipart/")), None)
+    if multipart is None:
+        return headers
+    return [(k, v) for k, v in headers if k not in (b"content-range", b"content-type")] + [(b"content-type", multipart)]
+
+
+class FileResponseContada(FileResponse):
+    """FileResponse que conta os bytes de corpo realmente enviados (inclusive em 206)."""
+
+    bytes_enviados = 0
+
+    async def __call__(self, scope, receive, send):
+        async def _send(msg):
+            if msg["type"] == "http.response.start" and msg["status"] == 206:
+                msg = {**msg, "headers": _corrigir_multipart(list(msg["headers"]))}
+            elif msg["type"] == "http.response.body":
+                self.bytes_enviados += len(msg.get("body", b""))
+            elif msg["type"] == "http.response.pathsend":
+                self.bytes_enviados += os.path.getsize(msg["path"])
+            await send(msg)
+
+        await super().__call__(scope, receive, _send)
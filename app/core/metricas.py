@@ -0,0 +1,153 @@
+# app/core/metricas.py
+"""
+Métricas Prometheus do pipeline (worker) e da API. A API expõe `/metrics`; o worker sobe
+um exportador próprio na porta `METRICAS_PORTA_WORKER` (ver app.tasks.celery_app).
+
+Nos laços quentes (um bloco de TTS, uma página) as séries com label já vêm resolvidas
+em `ETAPA`, então cada medida é só um `perf_counter` e um `observe` (mais o span da
+etapa, que é no-op com o rastreamento desligado).
+Com vários processos (uvicorn --workers, celery prefork) defina `PROMETHEUS_MULTIPROC_DIR`
+para que a coleta some os processos.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+    start_http_server,
+)
+
+from app.core.rastreio import span
+
+METRICAS_PORTA_WORKER = int(os.getenv("METRICAS_PORTA_WORKER", "9101"))
+
+ETAPAS = ("extracao", "limpeza", "gemini", "tts_bloco", "concatenacao", "armazenamento")
+
+ETAPA_SEGUNDOS = Histogram(
+    "transcrissor_etapa_segundos", "Duração de cada etapa do pipeline de áudio", ["etapa"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+ETAPA = {e: ETAPA_SEGUNDOS.labels(e) for e in ETAPAS}
+
+PAGINAS_PROCESSADAS = Counter("transcrissor_paginas_processadas_total", "Páginas extraídas de PDFs")
+BYTES_PROCESSADOS = Counter("transcrissor_bytes_processados_total", "Bytes lidos (pdf) e gerados (audio)", ["tipo"])
+BYTES_PDF = BYTES_PROCESSADOS.labels("pdf")
+BYTES_AUDIO = BYTES_PROCESSADOS.labels("audio")
+
+FILA_ESPERA = Histogram(
+    "transcrissor_fila_espera_segundos", "Tempo entre publicar a task e o worker começá-la", ["task"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 3600),
+)
+TASKS = Counter("transcrissor_tasks_total", "Tasks encerradas por resultado", ["task", "resultado"])
+
+HTTP_SEGUNDOS = Histogram(
+    "transcrissor_http_segundos", "Latência das rotas da API", ["metodo", "rota", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+# Rotas medidas pelo middleware (o SSE fica de fora: a conexão dura o quanto o cliente quiser)
+MODULOS_MEDIDOS = frozenset({"app.routes.aulas", "app.routes.materias", "app.routes.auth_routes"})
+
+# Limitador das APIs externas (app.services.limitador)
+LIMITADOR_ESPERA = Histogram(
+    "transcrissor_limitador_espera_segundos", "Espera por vaga (cota/concorrência) antes de chamar o provedor",
+    ["provedor"], buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+PROVEDOR_CHAMADAS = Counter(
+    "transcrissor_provedor_chamadas_total", "Chamadas aos provedores por resultado (ok, limite, erro, falha)",
+    ["provedor", "resultado"],
+)
+HEDGES = Counter(
+    "transcrissor_hedges_total", "Hedges de blocos de TTS (disparado, venceu, sem_orcamento, pool_cheio)",
+    ["provedor", "desfecho"],
+)
+
+# Monitor (app.core.monitor): atraso do event loop e comandos do Mongo
+LOOP_ATRASO = Histogram(
+    "transcrissor_loop_atraso_segundos", "Atraso da batida do event loop da API",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+MONGO_COMANDO_SEGUNDOS = Histogram(
+    "transcrissor_mongo_comando_segundos", "Duração dos comandos do Mongo (pymongo/Motor)", ["comando"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+MONGO_IDAS = Histogram(
+    "transcrissor_mongo_idas", "Idas ao Mongo por requisição", ["metodo", "rota"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+# Requisição em curso ({"idas": n, "scope": scope}); o Motor copia o contexto para a thread
+# do pymongo, então o listener do monitor incrementa o contador da requisição certa
+REQUISICAO_ATUAL: ContextVar[Optional[dict]] = ContextVar("requisicao_atual", default=None)
+
+
+@contextmanager
+def medir(etapa: str):
+    """Histograma da etapa + span com o mesmo nome no trace do job."""
+    serie, t0 = ETAPA[etapa], time.perf_counter()
+    with span(etapa):
+        try:
+            yield
+        finally:
+            serie.observe(time.perf_counter() - t0)
+
+
+def _registro():
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return None  # registro padrão do processo
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro)
+    return registro
+
+
+def resposta_metricas() -> Response:
+    registro = _registro()
+    dados = generate_latest(registro) if registro else generate_latest()
+    return Response(content=dados, media_type=CONTENT_TYPE_LATEST)
+
+
+def iniciar_exportador(porta: int = METRICAS_PORTA_WORKER) -> None:
+    """Servidor HTTP de métricas do worker (thread daemon). Porta ocupada só gera log."""
+    registro = _registro()
+    try:
+        if registro:
+            start_http_server(porta, registry=registro)
+        else:
+            start_http_server(porta)
+        print(f"[metricas] Exportador do worker em :{porta}/metrics")
+    except OSError as e:
+        print(f"[metricas] Exportador não iniciado na porta {porta}: {e}")
+
+
+class MetricasHTTP:
+    """Middleware ASGI: latência e idas ao Mongo por rota (o template, ex. /api/aulas/{aula_id}/pdfs)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        t0, status = time.perf_counter(), 500
+        requisicao = {"idas": 0, "scope": scope}
+        token = REQUISICAO_ATUAL.set(requisicao)
+
+        async def _send(msg):
+            nonlocal status
+            if msg["type"] == "http.response.start":
+                status = msg["status"]
+            await send(msg)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            REQUISICAO_ATUAL.reset(token)
+            # O roteador grava a rota casada no próprio scope
+            rota = scope.get("route")
+            endpoint = getattr(rota, "endpoint", None)
+            if endpoint is not None and endpoint.__module__ in MODULOS_MEDIDOS:
+                HTTP_SEGUNDOS.labels(scope["method"], rota.path, str(status)).observe(time.perf_counter() - t0)
+                MONGO_IDAS.labels(scope["method"], rota.path).observe(requisicao["idas"])
@@ -0,0 +1,214 @@
+# app/core/monitor.py
+"""
+Monitor sempre ligado da API:
+
+- Travamentos do event loop: uma batida no loop a cada `limiar/2` e uma thread vigia que,
+  se a batida atrasar mais que `MONITOR_LOOP_LIMIAR_MS`, captura a pilha da thread do loop
+  (é ali que está o código síncrono que travou: hash, IO de arquivo...). O atraso de toda
+  batida vai para `transcrissor_loop_atraso_segundos`.
+- Comandos do Mongo (pymongo `CommandListener`, vale para o Motor da API e o pymongo do
+  worker): duração por comando e os mais lentos que `MONITOR_MONGO_LIMIAR_MS`, com a rota
+  e o formato do filtro (só nomes de campos), o suficiente para achar o índice que falta.
+- Idas ao Mongo por rota, contadas na requisição em curso (ver `metricas.MetricasHTTP`).
+
+Os últimos `MONITOR_MAX_EVENTOS` de cada tipo ficam em memória e saem em
+`GET /internal/monitor` com o header `X-Monitor-Token: <MONITOR_TOKEN>`. Sem `MONITOR_TOKEN`
+a rota responde 404 (expõe pilhas, caminhos de arquivo e o formato das consultas).
+Custo: duas acordadas por batida e um dict por comando do Mongo.
+"""
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import monitoring
+
+from app.core.metricas import LOOP_ATRASO, MONGO_COMANDO_SEGUNDOS, MONGO_IDAS, REQUISICAO_ATUAL
+
+MONITOR_LOOP_LIMIAR_MS = float(os.getenv("MONITOR_LOOP_LIMIAR_MS", "100"))  # 0 desliga a vigia
+MONITOR_MONGO_LIMIAR_MS = float(os.getenv("MONITOR_MONGO_LIMIAR_MS", "100"))
+MONITOR_MAX_EVENTOS = int(os.getenv("MONITOR_MAX_EVENTOS", "50"))
+MONITOR_TOKEN = os.getenv("MONITOR_TOKEN") or None
+PILHA_MAX = 15  # quadros guardados por travamento (os mais internos)
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _local(quadros: list[traceback.FrameSummary]) -> str:
+    """Quadro mais interno do app (senão o mais interno de todos): onde o loop parou."""
+    do_app = [q for q in quadros if f"{os.sep}app{os.sep}" in q.filename]
+    q = (do_app or quadros or [None])[-1]
+    return f"{q.filename}:{q.lineno} {q.name}" if q else "?"
+
+
+class VigiaLoop:
+    """Batida no event loop + thread que captura a pilha do loop quando a batida atrasa."""
+
+    def __init__(self, limiar_ms: float = MONITOR_LOOP_LIMIAR_MS, max_eventos: int = MONITOR_MAX_EVENTOS):
+        self.limiar = limiar_ms / 1000
+        self.intervalo = self.limiar / 2
+        self.travamentos: deque = deque(maxlen=max_eventos)
+        self._ultima = time.monotonic()
+        self._aberto: Optional[dict] = None
+        self._parar = threading.Event()
+        self._tarefa: Optional[asyncio.Task] = None
+        self._thread_loop: Optional[int] = None
+
+    def iniciar(self) -> None:
+        """Chame de dentro do loop a vigiar (startup da API)."""
+        self._thread_loop = threading.get_ident()
+        self._tarefa = asyncio.get_running_loop().create_task(self._batida())
+        threading.Thread(target=self._vigiar, name="vigia-loop", daemon=True).start()
+
+    def parar(self) -> None:
+        self._parar.set()
+        if self._tarefa:
+            self._tarefa.cancel()
+
+    async def _batida(self) -> None:
+        self._ultima = time.monotonic()
+        while True:
+            antes = self._ultima
+            await asyncio.sleep(self.intervalo)
+            # Batida nova antes de fechar o evento: a vigia não reabre o mesmo travamento
+            self._ultima = time.monotonic()
+            atraso = max(0.0, self._ultima - antes - self.intervalo)
+            LOOP_ATRASO.observe(atraso)
+            aberto, self._aberto = self._aberto, None
+            if aberto is not None:
+                aberto["duracao_ms"] = round(atraso * 1000, 1)
+                print(f"[monitor] Event loop travado por {aberto['duracao_ms']} ms em {aberto['local']}")
+
+    def _vigiar(self) -> None:
+        while not self._parar.wait(self.intervalo / 2):
+            if self._aberto is not None or time.monotonic() - self._ultima - self.intervalo < self.limiar:
+                continue
+            quadro = sys._current_frames().get(self._thread_loop)
+            quadros = traceback.extract_stack(quadro)[-PILHA_MAX:] if quadro else []
+            evento = {
+                "em": _agora(),
+                "duracao_ms": None,  # preenchida quando o loop volta a bater
+                "local": _local(quadros),
+                "pilha": [f"{q.filename}:{q.lineno} {q.name}: {q.line}" for q in quadros],
+            }
+            self.travamentos.append(evento)
+            self._aberto = evento
+
+
+def _forma(nome: str, comando: dict) -> dict:
+    """Coleção e formato do comando: nomes de campos do filtro e etapas do pipeline, sem valores."""
+    forma = {"colecao": comando.get("collection") if nome == "getMore" else comando.get(nome)}
+    filtro = comando.get("filter", comando.get("query"))
+    for chave in ("updates", "deletes"):
+        if filtro is None and comando.get(chave):
+            filtro = comando[chave][0].get("q")
+    if isinstance(filtro, dict):
+        forma["filtro"] = sorted(filtro)
+    if comando.get("sort"):
+        forma["ordem"] = list(comando["sort"])
+    if comando.get("pipeline"):
+        forma["pipeline"] = [next(iter(etapa), "?") for etapa in comando["pipeline"]]
+    return forma
+
+
+class OuvinteMongo(monitoring.CommandListener):
+    """Duração de cada comando, idas por requisição e os comandos mais lentos que o limiar."""
+
+    def __init__(self, limiar_ms: float = MONITOR_MONGO_LIMIAR_MS, max_eventos: int = MONITOR_MAX_EVENTOS):
+        self.limiar = limiar_ms / 1000
+        self.lentos: deque = deque(maxlen=max_eventos)
+        self._em_curso: dict = {}  # (conexão, request_id) -> (comando, requisição)
+
+    def started(self, event) -> None:
+        requisicao = REQUISICAO_ATUAL.get()
+        if requisicao is not None:
+            requisicao["idas"] += 1
+        self._em_curso[(event.connection_id, event.request_id)] = (event.command, requisicao)
+
+    def succeeded(self, event) -> None:
+        self._encerrar(event, None)
+
+    def failed(self, event) -> None:
+        self._encerrar(event, getattr(event, "failure", None))
+
+    def _encerrar(self, event, falha) -> None:
+        comando, requisicao = self._em_curso.pop((event.connection_id, event.request_id), (None, None))
+        duracao = event.duration_micros / 1e6
+        MONGO_COMANDO_SEGUNDOS.labels(event.command_name).observe(duracao)
+        if duracao < self.limiar:
+            return
+        rota = requisicao["scope"].get("route") if requisicao else None
+        evento = {
+            "em": _agora(),
+            "comando": event.command_name,
+            "duracao_ms": round(duracao * 1000, 1),
+            "rota": f"{requisicao['scope']['method']} {rota.path}" if rota else None,
+            **_forma(event.command_name, comando or {}),
+        }
+        if falha is not None:
+            evento["falha"] = str(falha)[:200]
+        self.lentos.append(evento)
+        print(f"[monitor] Mongo lento: {evento}")
+
+
+ouvinte = OuvinteMongo()
+vigia: Optional[VigiaLoop] = None
+_ouvinte_instalado = False
+
+
+def instalar_ouvinte_mongo() -> None:
+    """Registra o listener (uma vez); vale para os clientes criados depois."""
+    global _ouvinte_instalado
+    if not _ouvinte_instalado:
+        monitoring.register(ouvinte)
+        _ouvinte_instalado = True
+
+
+def iniciar_vigia() -> None:
+    """Sobe a vigia do loop atual (uma vez por processo); `MONITOR_LOOP_LIMIAR_MS=0` desliga."""
+    global vigia
+    if vigia is None and MONITOR_LOOP_LIMIAR_MS > 0:
+        vigia = VigiaLoop()
+        vigia.iniciar()
+
+
+def idas_por_rota() -> dict:
+    """Requisições e idas ao Mongo por rota (deste processo), da mais para a menos custosa."""
+    rotas: dict = {}
+    for familia in MONGO_IDAS.collect():
+        for amostra in familia.samples:
+            tipo = amostra.name.rsplit("_", 1)[-1]
+            if tipo in ("count", "sum"):
+                chave = f"{amostra.labels['metodo']} {amostra.labels['rota']}"
+                rotas.setdefault(chave, {})["requisicoes" if tipo == "count" else "idas"] = int(amostra.value)
+    for r in rotas.values():
+        r["media"] = round(r["idas"] / r["requisicoes"], 2) if r.get("requisicoes") else 0.0
+    return dict(sorted(rotas.items(), key=lambda kv: -kv[1]["media"]))
+
+
+def autorizado(headers) -> bool:
+    """True só com `MONITOR_TOKEN` definido e o header `X-Monitor-Token` igual a ele."""
+    token = headers.get("x-monitor-token")
+    return MONITOR_TOKEN is not None and token is not None and hmac.compare_digest(
+        token.encode("utf-8"), MONITOR_TOKEN.encode("utf-8")
+    )
+
+
+def estado() -> dict:
+    return {
+        "loop": {
+            "limiar_ms": MONITOR_LOOP_LIMIAR_MS,
+            "ativo": vigia is not None,
+            "travamentos": list(vigia.travamentos) if vigia else [],
+        },
+        "mongo": {"limiar_ms": ouvinte.limiar * 1000, "lentos": list(ouvinte.lentos)},
+        "rotas": idas_por_rota(),
+    }
@@ -32,3 +32,19 @@ def audio_path(usuario_id: str, aula_id: str, pdf_id: str, ext: str = "mp3") ->
     Caminho final do áudio: data/audios/<usuario_id>/<aula_id>/<pdf_id>.<ext>
     """
     return audio_dir(usuario_id, aula_id) / f"{pdf_id}.{ext}"
+
+def blob_relpath(sha256: str, ext: str) -> str:
+    """
+    Caminho de um blob relativo a data/blobs/: <aa>/<bb>/<sha256>.<ext>
+    (também é o sufixo usado no offload para o servidor de arquivos)
+    """
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{ext}"
+
+def blob_path(sha256: str, ext: str) -> Path:
+    """
+    Caminho de um blob endereçado por conteúdo: data/blobs/<aa>/<bb>/<sha256>.<ext>
+    (o mesmo arquivo é compartilhado por todos os documentos com o mesmo hash)
+    """
+    caminho = DATA_DIR / "blobs" / blob_relpath(sha256, ext)
+    ensure_dir(caminho.parent)
+    return caminho
@@ -0,0 +1,115 @@
+# app/core/perfil.py
+"""
+Profiling sob demanda: CPU (cProfile) + alocações (tracemalloc) de uma requisição ou de
+um job, gravados em `DATA_DIR/perfis/`.
+
+- API: header `X-Perfil: <PERFIL_TOKEN>`. Sem `PERFIL_TOKEN` o middleware nem é instalado.
+  A resposta traz `X-Perfil-Id`; os arquivos ficam em `perfis/requisicoes/<id>.*`.
+  O cProfile vê a thread inteira, então outras requisições concorrentes no mesmo event
+  loop aparecem no perfil.
+- Worker: `gerar_audio_google_task(pdf_id, perfilar=True)` (a API repassa quando a
+  requisição veio com o header) ou amostragem `PERFIL_AMOSTRAGEM` (0..1, padrão 0).
+  Arquivos em `perfis/pdfs/<pdf_id>-<timestamp>.*`.
+
+Cada perfil gera `.prof` (abre com `python -m pstats` ou snakeviz), `.tracemalloc`
+(`tracemalloc.Snapshot.load`) e um `.txt` com o topo dos dois. Um perfil por processo
+por vez: pedidos simultâneos seguem sem perfil.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from app.core.paths import DATA_DIR
+
+PERFIL_TOKEN = os.getenv("PERFIL_TOKEN") or None
+PERFIL_AMOSTRAGEM = float(os.getenv("PERFIL_AMOSTRAGEM", "0"))
+PERFIL_DIR = DATA_DIR / "perfis"
+PERFIL_HEADER = "x-perfil"
+
+_ativo = threading.Lock()
+
+
+def _resumo(perfil: cProfile.Profile, snapshot: tracemalloc.Snapshot) -> str:
+    saida = io.StringIO()
+    pstats.Stats(perfil, stream=saida).sort_stats("cumulative").print_stats(30)
+    saida.write("\n== Alocações (tracemalloc, por linha) ==\n")
+    for estat in snapshot.statistics("lineno")[:30]:
+        saida.write(f"{estat}\n")
+    return saida.getvalue()
+
+
+@contextmanager
+def perfilar(destino: Path):
+    """Perfila o bloco e grava `<destino>.prof/.tracemalloc/.txt`; o `as` diz se perfilou."""
+    if not _ativo.acquire(blocking=False):
+        print(f"[perfil] Outro perfil em andamento; seguindo sem perfil: {destino.name}")
+        yield False
+        return
+    iniciou_tracemalloc = not tracemalloc.is_tracing()
+    try:
+        if iniciou_tracemalloc:
+            tracemalloc.start(10)
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield True
+        finally:
+            perfil.disable()
+            snapshot = tracemalloc.take_snapshot()
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            perfil.dump_stats(f"{destino}.prof")
+            snapshot.dump(f"{destino}.tracemalloc")
+            Path(f"{destino}.txt").write_text(_resumo(perfil, snapshot), encoding="utf-8")
+            print(f"[perfil] Gravado em {destino}.*")
+    finally:
+        if iniciou_tracemalloc:
+            tracemalloc.stop()
+        _ativo.release()
+
+
+def solicitado(headers) -> bool:
+    """True se a requisição pediu perfil com o token certo."""
+    return PERFIL_TOKEN is not None and headers.get(PERFIL_HEADER) == PERFIL_TOKEN
+
+
+def opcoes_task(headers) -> dict:
+    """kwargs do `.delay` da task: repassa o pedido de perfil da requisição ao job."""
+    return {"perfilar": True} if solicitado(headers) else {}
+
+
+def perfil_da_task(pdf_id: str, forcar: bool = False):
+    """Contexto para o job: perfil se pedido ou sorteado; senão um nullcontext."""
+    if forcar or (PERFIL_AMOSTRAGEM and random.random() < PERFIL_AMOSTRAGEM):
+        return perfilar(PERFIL_DIR / "pdfs" / f"{pdf_id}-{time.strftime('%Y%m%dT%H%M%S')}")
+    return nullcontext()
+
+
+class PerfilHTTP:
+    """Middleware ASGI: perfila só as requisições com `X-Perfil: <PERFIL_TOKEN>`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if headers.get(PERFIL_HEADER.encode()) != PERFIL_TOKEN.encode():
+            return await self.app(scope, receive, send)
+
+        perfil_id = uuid.uuid4().hex
+        with perfilar(PERFIL_DIR / "requisicoes" / perfil_id) as ativo:
+            async def _send(msg):
+                if ativo and msg["type"] == "http.response.start":
+                    msg = {**msg, "headers": [*msg.get("headers", []), (b"x-perfil-id", perfil_id.encode())]}
+                await send(msg)
+
+            await self.app(scope, receive, _send)
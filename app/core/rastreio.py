@@ -0,0 +1,171 @@
+# app/core/rastreio.py
+"""
+Rastreamento distribuído (OpenTelemetry) de um job: o upload abre o trace, o contexto
+(W3C `traceparent`) segue nos headers da task Celery, cada etapa do worker vira um span
+(via `metricas.medir`) e o `_post_evento` devolve o contexto à API no header HTTP.
+
+Exportação em `TRACING`: "desligado" (padrão; os spans não gravam nada), "arquivo"
+(um JSON por linha em `TRACING_ARQUIVO`) ou "otlp" (coletor em OTEL_EXPORTER_OTLP_ENDPOINT).
+O caminho crítico de um job, a partir do arquivo:
+
+    python -m app.core.rastreio <trace_id>
+"""
+import functools
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Mapping, Optional
+
+from opentelemetry import context, propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor, SimpleSpanProcessor, SpanExporter, SpanExportResult,
+)
+
+from app.core.paths import DATA_DIR
+
+TRACING = os.getenv("TRACING", "desligado").lower()
+TRACING_ARQUIVO = Path(os.getenv("TRACING_ARQUIVO") or DATA_DIR / "traces" / "spans.jsonl")
+
+_tracer = trace.get_tracer("transcrissor")
+_configurado = False
+_spans_de_task: dict[str, tuple] = {}
+
+
+def _linha(s) -> dict:
+    return {
+        "trace_id": f"{s.context.trace_id:032x}",
+        "span_id": f"{s.context.span_id:016x}",
+        "pai": f"{s.parent.span_id:016x}" if s.parent else None,
+        "nome": s.name,
+        "servico": s.resource.attributes.get("service.name"),
+        "inicio_ns": s.start_time,
+        "fim_ns": s.end_time,
+        "status": s.status.status_code.name,
+        "atributos": dict(s.attributes or {}),
+    }
+
+
+class _ExportadorArquivo(SpanExporter):
+    """Anexa os spans em JSON Lines (API e worker podem dividir o arquivo no volume de dados)."""
+
+    def __init__(self, caminho: Path):
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        linhas = "".join(json.dumps(_linha(s), ensure_ascii=False, default=str) + "\n" for s in spans)
+        with self._lock, open(self.caminho, "a", encoding="utf-8") as f:
+            f.write(linhas)
+        return SpanExportResult.SUCCESS
+
+
+def configurar(servico: str) -> None:
+    """Instala o provider do processo (uma vez). Desligado: fica o no-op do OpenTelemetry."""
+    global _configurado
+    if _configurado or TRACING not in ("arquivo", "otlp"):
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": servico}))
+    if TRACING == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    else:
+        # Síncrono (sem thread): sobrevive ao fork dos processos do Celery
+        provider.add_span_processor(SimpleSpanProcessor(_ExportadorArquivo(TRACING_ARQUIVO)))
+    trace.set_tracer_provider(provider)
+    _configurado = True
+
+
+@contextmanager
+def span(nome: str, contexto: Optional[context.Context] = None, **atributos):
+    with _tracer.start_as_current_span(nome, context=contexto, attributes=atributos or None) as s:
+        yield s
+
+
+def rastreado(nome: str):
+    """Decorator de rota async: o handler inteiro vira um span (abre o trace se não houver)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(nome):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def injetar(carrier: Optional[dict] = None) -> dict:
+    """Grava o contexto atual (`traceparent`) em `carrier`; sem trace ativo, nada muda."""
+    carrier = {} if carrier is None else carrier
+    propagate.inject(carrier)
+    return carrier
+
+
+def extrair(carrier: Mapping) -> context.Context:
+    return propagate.extract(carrier)
+
+
+def trace_id_atual() -> Optional[str]:
+    ctx = trace.get_current_span().get_span_context()
+    return f"{ctx.trace_id:032x}" if ctx.is_valid else None
+
+
+def abrir_span_task(task_id: str, nome: str, carrier: Mapping) -> None:
+    """Span da task inteira, filho do contexto que veio nos headers; fechado em `fechar_span_task`."""
+    s = _tracer.start_span(nome, context=extrair(carrier))
+    _spans_de_task[task_id] = (s, context.attach(trace.set_span_in_context(s)))
+
+
+def fechar_span_task(task_id: str, estado: Optional[str]) -> None:
+    aberto = _spans_de_task.pop(task_id, None)
+    if aberto is None:
+        return
+    s, token = aberto
+    s.set_attribute("celery.estado", estado or "")
+    s.end()
+    context.detach(token)
+
+
+def caminho_critico(spans: list[dict]) -> str:
+    """Árvore do trace com offsets; `*` marca o caminho crítico (o filho que termina por último)."""
+    filhos: dict[Optional[str], list[dict]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["inicio_ns"]):
+        filhos.setdefault(s["pai"] if s["pai"] in ids else None, []).append(s)
+    raizes = filhos.get(None, [])
+    if not raizes:
+        return ""
+    t0 = min(s["inicio_ns"] for s in spans)
+    critico = set()
+    atual = max(raizes, key=lambda s: s["fim_ns"])
+    while atual:
+        critico.add(atual["span_id"])
+        atual = max(filhos.get(atual["span_id"], []), key=lambda s: s["fim_ns"], default=None)
+
+    linhas = []
+
+    def _imprimir(s: dict, nivel: int) -> None:
+        marca = "*" if s["span_id"] in critico else " "
+        linhas.append(
+            f"{marca} {(s['inicio_ns'] - t0) / 1e6:10.1f} ms {(s['fim_ns'] - s['inicio_ns']) / 1e6:10.1f} ms  "
+            f"{'  ' * nivel}{s['nome']} [{s['servico']}]{' ERRO' if s['status'] == 'ERROR' else ''}"
+        )
+        for f in filhos.get(s["span_id"], []):
+            _imprimir(f, nivel + 1)
+
+    for r in raizes:
+        _imprimir(r, 0)
+    return "\n".join(linhas)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("uso: python -m app.core.rastreio <trace_id>")
+    with open(TRACING_ARQUIVO, encoding="utf-8") as f:
+        spans = [s for s in map(json.loads, f) if s["trace_id"] == sys.argv[1]]
+    print("  início(offset)    duração  span" if spans else "trace não encontrado")
+    print(caminho_critico(spans))
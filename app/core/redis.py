@@ -0,0 +1,30 @@
+# app/core/redis.py
+"""
+Clientes Redis compartilhados (mesma REDIS_URL do Celery). A API usa o async e o worker o
+síncrono. Timeouts curtos: quem usa Redis para sinais auxiliares não deve travar se ele cair.
+"""
+import os
+
+import redis
+import redis.asyncio as redis_asyncio
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_OPCOES = {"socket_connect_timeout": 1, "socket_timeout": 1, "decode_responses": True}
+
+_cliente_sync: redis.Redis | None = None
+_cliente_async: redis_asyncio.Redis | None = None
+
+
+def redis_sync() -> redis.Redis:
+    global _cliente_sync
+    if _cliente_sync is None:
+        _cliente_sync = redis.Redis.from_url(REDIS_URL, **_OPCOES)
+    return _cliente_sync
+
+
+def redis_async() -> redis_asyncio.Redis:
+    global _cliente_async
+    if _cliente_async is None:
+        _cliente_async = redis_asyncio.Redis.from_url(REDIS_URL, **_OPCOES)
+    return _cliente_async
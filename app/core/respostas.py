@@ -0,0 +1,45 @@
+# app/core/respostas.py
+"""
+Caminho rápido de JSON para listas grandes vindas do Mongo: os documentos já saem do
+banco no formato do modelo (projeção + `id` em string), então a rota devolve direto uma
+`RespostaJSON` — o FastAPI não revalida contra o `response_model` quando recebe uma
+Response pronta — e o orjson serializa `ObjectId`/`datetime` sem passar pelo
+`jsonable_encoder`.
+"""
+from typing import Any, AsyncIterable, Iterable
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _padrao(valor: Any):
+    if isinstance(valor, ObjectId):
+        return str(valor)
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+class RespostaJSON(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_padrao, option=orjson.OPT_NON_STR_KEYS)
+
+
+def projecao(campos: Iterable[str]) -> dict:
+    """Projeção do Mongo com os campos de um modelo *InDB (o `id` vem do `_id`)."""
+    return {c: 1 for c in campos if c != "id"}
+
+
+async def linhas(cursor: AsyncIterable[dict], campos: Iterable[str]) -> list[dict]:
+    """
+    Converte documentos do banco no formato de saída do modelo sem instanciá-lo:
+    `_id` vira `id` (string) e campos ausentes saem como null, como nos defaults.
+    """
+    campos = tuple(campos)
+    saida = []
+    async for doc in cursor:
+        linha = {c: doc.get(c) for c in campos}
+        linha["id"] = str(doc["_id"])
+        saida.append(linha)
+    return saida
@@ -1,6 +1,24 @@
+import os
+
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+# Páginas transcritas sem uso há mais que isso saem do cache (TTL do Mongo)
+PAGINAS_TTL_DIAS = int(os.getenv("PAGINAS_TTL_DIAS", "90"))
+
 async def ensure_indexes(db: AsyncIOMotorDatabase):
     await db.materias.create_index([("usuario_id", 1), ("titulo", 1)])
     await db.aulas.create_index([("usuario_id", 1), ("materia_id", 1)])
     await db.pdfs.create_index([("usuario_id", 1), ("aula_id", 1)])
+    # Reaproveitamento de resultados por conteúdo (upload de PDF idêntico)
+    await db.pdfs.create_index([("sha256", 1), ("status", 1)])
+    # Cache de áudio por bloco (texto + config de TTS)
+    await db.blobs.create_index([("chave", 1)], sparse=True)
+    # Cache de transcrição por página (por usuário)
+    await db.paginas.create_index([("usuario_id", 1), ("sha256", 1)], unique=True)
+    await db.paginas.create_index([("atualizado_em", 1)], expireAfterSeconds=PAGINAS_TTL_DIAS * 24 * 3600)
+    # Exclusões pendentes de purga (só documentos marcados entram no índice)
+    for coll in ("materias", "aulas", "pdfs"):
+        await db[coll].create_index([("excluido_em", 1)], sparse=True)
+    # Bytes servidos por sessão de escuta (métrica; some após 30 dias sem uso)
+    await db.sessoes_escuta.create_index([("pdf_id", 1)])
+    await db.sessoes_escuta.create_index([("atualizado_em", 1)], expireAfterSeconds=30 * 24 * 3600)
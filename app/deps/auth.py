@@ -2,7 +2,7 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from bson import ObjectId
-from app.auth.jwt_handler import decodificar_token  # tua função
+from app.auth.jwt_handler import decodificar_token_cache  # verifica uma vez por token (até o exp)
 
 security = HTTPBearer(auto_error=False)
 
@@ -18,7 +18,7 @@ async def get_usuario_atual(credentials: HTTPAuthorizationCredentials = Depends(
 
     token = credentials.credentials  # só o JWT, sem "Bearer "
     try:
-        payload = decodificar_token(token)
+        payload = decodificar_token_cache(token)
         user_id_str = payload.get("sub") or payload.get("user_id") or payload.get("_id")
         if not user_id_str:
             raise ValueError("user id não encontrado no token")
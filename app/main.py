@@ -1,8 +1,15 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import aulas, materias, sse, eventos, auth_routes
+from app.routes import aulas, materias, sse, eventos, auth_routes, arquivos, arvore
 from app.routes.auth_routes import get_current_user, ensure_indexes
 from app.db.mongo import get_db
+from app.db.indexes import ensure_indexes as ensure_indexes_dados
+from app.core.metricas import MetricasHTTP, resposta_metricas
+from app.core import monitor, rastreio
+from app.core.perfil import PERFIL_TOKEN, PerfilHTTP
+
+rastreio.configurar("transcrissor-api")
+monitor.instalar_ouvinte_mongo()  # antes do primeiro cliente Motor (criado sob demanda)
 
 app = FastAPI(
     title="Transcrição de PDFs para Áudio",
@@ -11,13 +18,26 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
+    monitor.iniciar_vigia()
     db = get_db()
     await ensure_indexes(db)
+    await ensure_indexes_dados(db)
 
 @app.get("/health")
 async def health():
     return {"ok": True}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return resposta_metricas()
+
+@app.get("/internal/monitor", include_in_schema=False)
+async def monitor_interno(request: Request):
+    """Travamentos do event loop, comandos lentos do Mongo e idas ao Mongo por rota."""
+    if not monitor.autorizado(request.headers):
+        raise HTTPException(status_code=404)
+    return monitor.estado()
+
 @app.get("/api/secure/ping")
 async def secure_ping(user = Depends(get_current_user)):
     return {"msg": f"pong, {user['nome']}"}
@@ -30,6 +50,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricasHTTP)
+if PERFIL_TOKEN:  # sem token, nenhum custo por requisição
+    app.add_middleware(PerfilHTTP)
 
 '''
 Quando for usar refresh cookie httpOnly, troque para:
@@ -49,3 +72,5 @@ app.include_router(aulas.router, prefix="/api")
 app.include_router(sse.router, prefix="/api")
 app.include_router(eventos.router, prefix="/api")
 app.include_router(auth_routes.router, prefix="/api/auth")
+app.include_router(arquivos.router, prefix="/api")
+app.include_router(arvore.router, prefix="/api")
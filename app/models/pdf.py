@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
 from app.models.materia import PyObjectId  # ok por enquanto
@@ -13,6 +13,7 @@ class PdfInDB(BaseModel):
     caminho: str
     transcricao: Optional[str] = None
     audio_path: Optional[str] = None
+    audio_sha256: Optional[str] = None  # ETag do áudio; use ?v=<audio_sha256> para cache imutável
     data_upload: datetime
 
     # Pydantic v2: config no nível do modelo
@@ -20,3 +21,11 @@ class PdfInDB(BaseModel):
         populate_by_name=True,
         json_encoders={ObjectId: str},
     )
+
+
+STATUS_MAX_IDS = 500
+
+
+class StatusPdfsIn(BaseModel):
+    pdf_ids: List[str] = Field(..., max_length=STATUS_MAX_IDS)
+    token: Optional[str] = None  # devolvido na resposta anterior; igual = nada mudou
@@ -0,0 +1,76 @@
+# app/routes/arquivos.py
+"""
+Entrega de blobs (MP3/PDF) por URL assinada, sem Mongo e sem o token do usuário.
+Com ARQUIVOS_OFFLOAD_PREFIXO definido, a API só confere a assinatura e devolve um
+X-Accel-Redirect: quem transfere os bytes é o nginx, com sendfile
+(ver docker/nginx/arquivos.conf). Sem offload, serve direto do disco.
+"""
+import os
+import re
+import time
+import unicodedata
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+from app.core.assinatura import verificar_link
+from app.core.http_cache import etag_forte, nao_modificado
+from app.core.paths import DATA_DIR, blob_relpath
+
+router = APIRouter()
+
+ARQUIVOS_OFFLOAD_HEADER = os.getenv("ARQUIVOS_OFFLOAD_HEADER", "X-Accel-Redirect")
+ARQUIVOS_OFFLOAD_PREFIXO = os.getenv("ARQUIVOS_OFFLOAD_PREFIXO", "")  # ex.: "/_blobs"
+
+_TIPOS = {"mp3": "audio/mpeg", "pdf": "application/pdf"}
+_SHA256 = re.compile(r"^[a-f0-9]{64}$")
+_FORA_DO_FILENAME = re.compile(r'["\\\x00-\x1f\x7f]')  # quebrariam o filename="..."
+
+
+def _content_disposition(nome: str) -> str:
+    """`inline` com o nome em ASCII (sem aspas/barras) e o original em `filename*` (RFC 5987)."""
+    ascii_ = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii")
+    valor = f'inline; filename="{_FORA_DO_FILENAME.sub("", ascii_)}"'
+    codificado = quote(nome)
+    if codificado != nome:
+        valor += f"; filename*=utf-8''{codificado}"
+    return valor
+
+
+@router.get("/arquivos/{sha256}.{ext}")
+async def entregar_arquivo(
+    sha256: str,
+    ext: str,
+    request: Request,
+    exp: int,
+    sig: str,
+    nome: Optional[str] = None,
+):
+    if ext not in _TIPOS or not _SHA256.match(sha256):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    if not verificar_link(f"{sha256}.{ext}", exp, sig, nome):
+        raise HTTPException(status_code=403, detail="Link inválido ou expirado")
+
+    # Conteúdo endereçado por hash nunca muda: pode ficar em cache enquanto o link valer
+    headers = {
+        "ETag": etag_forte(sha256),
+        "Cache-Control": f"private, max-age={max(0, exp - int(time.time()))}, immutable",
+    }
+    if nome:
+        headers["Content-Disposition"] = _content_disposition(nome)
+    if nao_modificado(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    relativo = blob_relpath(sha256, ext)
+    if ARQUIVOS_OFFLOAD_PREFIXO:
+        headers[ARQUIVOS_OFFLOAD_HEADER] = f"{ARQUIVOS_OFFLOAD_PREFIXO.rstrip('/')}/{relativo}"
+        return Response(status_code=200, headers=headers, media_type=_TIPOS[ext])
+
+    caminho = DATA_DIR / "blobs" / relativo
+    try:
+        stat_result = caminho.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+    return FileResponse(path=str(caminho), stat_result=stat_result, media_type=_TIPOS[ext], headers=headers)
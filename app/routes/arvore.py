@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.db.mongo import get_db
+from app.deps.auth import get_usuario_atual, UsuarioToken
+from app.services.cache_respostas import resposta_em_cache
+from app.services.exclusao import VIVO
+
+router = APIRouter()
+
+# Só metadados: transcrição, blocos, índice etc. ficam de fora (são as partes pesadas do doc)
+_CAMPOS_PDF = {
+    "_id": 0, "id": {"$toString": "$_id"}, "filename": 1, "descricao": 1,
+    "status": 1, "progresso": 1, "audio_sha256": 1, "data_upload": 1,
+}
+_CAMPOS_AULA = {
+    "_id": 0, "id": {"$toString": "$_id"}, "titulo": 1, "descricao": 1, "data_upload": 1, "pdfs": 1,
+}
+_CAMPOS_MATERIA = {
+    "_id": 0, "id": {"$toString": "$_id"}, "nome": 1, "descricao": 1, "data_criacao": 1, "aulas": 1,
+}
+
+
+def pipeline_arvore(usuario_id) -> list[dict]:
+    """
+    matéria → aulas → PDFs do usuário numa agregação só. `aula_id`/`materia_id` são strings
+    nos filhos, daí o $toString do _id do pai; o filtro por usuário vem primeiro em cada
+    $lookup para usar os índices (usuario_id, materia_id) e (usuario_id, aula_id).
+    """
+    pdfs = {
+        "$lookup": {
+            "from": "pdfs",
+            "let": {"aula": {"$toString": "$_id"}},
+            "pipeline": [
+                {"$match": {"usuario_id": usuario_id, **VIVO, "$expr": {"$eq": ["$aula_id", "$$aula"]}}},
+                {"$sort": {"data_upload": -1}},
+                {"$project": _CAMPOS_PDF},
+            ],
+            "as": "pdfs",
+        }
+    }
+    aulas = {
+        "$lookup": {
+            "from": "aulas",
+            "let": {"materia": {"$toString": "$_id"}},
+            "pipeline": [
+                {"$match": {"usuario_id": usuario_id, **VIVO, "$expr": {"$eq": ["$materia_id", "$$materia"]}}},
+                {"$sort": {"data_upload": -1}},
+                pdfs,
+                {"$project": _CAMPOS_AULA},
+            ],
+            "as": "aulas",
+        }
+    }
+    return [
+        {"$match": {"usuario_id": usuario_id, **VIVO}},
+        {"$sort": {"data_criacao": -1}},
+        aulas,
+        {"$project": _CAMPOS_MATERIA},
+    ]
+
+
+@router.get("/arvore")
+async def arvore(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user: UsuarioToken = Depends(get_usuario_atual),
+):
+    """
+    Matérias do usuário com suas aulas e os metadados dos PDFs, numa ida ao Mongo
+    (substitui as chamadas separadas a /materias, /aulas/materia/{id} e /aulas/{id}/pdfs).
+    """
+    async def gerar():
+        return await db.materias.aggregate(pipeline_arvore(user.id)).to_list(length=None)
+
+    return await resposta_em_cache(request, user.id, gerar, progresso=True)  # tem status/progresso
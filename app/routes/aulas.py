@@ -1,23 +1,53 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+from starlette.background import BackgroundTask
 from typing import Optional, List
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
+import hashlib
+import math
+import os
 import unicodedata
 
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.db.mongo import get_db
 from app.models.aula import AulaCreate, AulaInDB
-from app.models.pdf import PdfInDB
+from app.models.pdf import PdfInDB, StatusPdfsIn
 from app.deps.auth import get_usuario_atual, UsuarioToken
 
-from app.core.paths import pdf_path, audio_path  # data/pdfs/<usuario>/<aula>/<pdf>.pdf
-from app.tasks.audio import gerar_audio_google_task
+from app.core.paths import audio_path, blob_path  # data/audios/<usuario>/<aula>/<pdf>.mp3 (legado) e blobs
+from app.core.assinatura import ARQUIVOS_LINK_TTL, gerar_link
+from app.core.respostas import RespostaJSON, linhas, projecao
+from app.core import rastreio
+from app.core.perfil import opcoes_task
+from app.core.http_cache import (
+    CACHE_IMUTAVEL, CACHE_REVALIDAR, FileResponseContada, etag_forte, nao_modificado,
+)
+from app.services.blob_store import (
+    guardar_blob, reter_blob, reter_blobs,
+)
+from app.services.audio_generator import TTS_CONFIG_GOOGLE
+from app.services.indice_audio import localizar_pagina
+from app.services.exclusao import VIVO, marcar_pdf, marcar_aulas, marcar_materia
+from app.services.cancelamento import sinalizar_cancelamento
+from app.services.cache_respostas import invalidar_usuario, resposta_em_cache, versao_usuario
+from app.services.ownership import assert_do_usuario
+from app.tasks.audio import gerar_audio_google_task, gerar_audio_intervalo_task, gerar_audio_edge_task
+from app.tasks.limpeza import agendar_purga
 
 router = APIRouter()
 
+# Pedido de intervalo "processando" há mais que isso é considerado perdido e pode ser refeito
+INTERVALO_TIMEOUT = timedelta(minutes=30)
+# #EXT-X-TARGETDURATION de jobs antigos, que não gravaram `hls_target` (ver app.tasks.audio)
+HLS_TARGET_ESTIMATIVA = int(os.getenv("HLS_TARGET_ESTIMATIVA", "30"))
+
+# Listagens saem direto do Mongo no formato dos modelos (ver app.core.respostas)
+CAMPOS_AULA = tuple(AulaInDB.model_fields)
+CAMPOS_PDF = tuple(PdfInDB.model_fields)
+
 # =====================================================================================
 # AULAS
 # =====================================================================================
@@ -32,9 +62,9 @@ async def criar_aula(
     Cria uma nova aula vinculada a uma matéria existente do usuário logado.
     """
     # Garante que a matéria existe e pertence ao usuário
-    materia = await db.materias.find_one({"_id": ObjectId(aula.materia_id), "usuario_id": user.id})
-    if not materia:
-        raise HTTPException(status_code=404, detail="Matéria não encontrada")
+    await assert_do_usuario(
+        db, "materias", ObjectId(aula.materia_id), user.id, detail="Matéria não encontrada", projection={"_id": 1}
+    )
 
     aula_dict = {
         "titulo": aula.titulo,
@@ -45,54 +75,56 @@ async def criar_aula(
     }
 
     result = await db.aulas.insert_one(aula_dict)
+    await invalidar_usuario(user.id)
     return AulaInDB(id=str(result.inserted_id), **aula_dict)
 
 @router.get("/aulas/", response_model=List[AulaInDB])
 async def listar_aulas(
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_db),
     user: UsuarioToken = Depends(get_usuario_atual),
 ):
     """
     Lista as aulas do usuário logado.
     """
-    aulas: List[AulaInDB] = []
-    cursor = db.aulas.find({"usuario_id": user.id}).sort("data_upload", -1)
-    async for aula in cursor:
-        aula["id"] = str(aula.pop("_id"))
-        aula.setdefault("descricao", None)
-        aula.setdefault("audio_path", None)
-        aulas.append(AulaInDB(**aula))
-    return aulas
+    async def gerar():
+        cursor = db.aulas.find({"usuario_id": user.id, **VIVO}, projecao(CAMPOS_AULA)).sort("data_upload", -1)
+        return await linhas(cursor, CAMPOS_AULA)
+
+    return await resposta_em_cache(request, user.id, gerar)
 
 
 @router.get("/aulas/materia/{materia_id}", response_model=List[AulaInDB])
 async def listar_aulas_por_materia(
     materia_id: str,
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_db),
     user: UsuarioToken = Depends(get_usuario_atual),
 ):
     """
     Lista as aulas da matéria informada (apenas do usuário logado).
     """
-    # Garante que a matéria pertence ao usuário
-    materia = await db.materias.find_one({"_id": ObjectId(materia_id), "usuario_id": user.id})
-    if not materia:
-        raise HTTPException(status_code=404, detail="Matéria não encontrada")
+    async def gerar():
+        # Garante que a matéria pertence ao usuário (só em miss: o cache é por usuário)
+        await assert_do_usuario(
+            db, "materias", ObjectId(materia_id), user.id, detail="Matéria não encontrada", projection={"_id": 1}
+        )
+        cursor = db.aulas.find(
+            {"usuario_id": user.id, "materia_id": materia_id, **VIVO}, projecao(CAMPOS_AULA)
+        ).sort("data_upload", -1)
+        return await linhas(cursor, CAMPOS_AULA)
 
-    aulas: List[AulaInDB] = []
-    cursor = db.aulas.find({"usuario_id": user.id, "materia_id": materia_id}).sort("data_upload", -1)
-    async for aula in cursor:
-        aula["id"] = str(aula.pop("_id"))
-        aulas.append(AulaInDB(**aula))
-    return aulas
+    return await resposta_em_cache(request, user.id, gerar)
 
 # =====================================================================================
 # PDFs DA AULA
 # =====================================================================================
 
 @router.post("/aulas/{aula_id}/pdfs/", response_model=PdfInDB)
+@rastreio.rastreado("upload_pdf")
 async def upload_pdf(
     aula_id: str,
+    request: Request,
     file: UploadFile = File(...),
     descricao: Optional[str] = None,
     db: AsyncIOMotorDatabase = Depends(get_db),
@@ -102,9 +134,9 @@ async def upload_pdf(
     Faz upload de um PDF para uma aula do usuário e dispara task de processamento.
     """
     # Aula precisa ser do usuário
-    aula = await db.aulas.find_one({"_id": ObjectId(aula_id), "usuario_id": user.id})
-    if not aula:
-        raise HTTPException(status_code=404, detail="Aula não encontrada")
+    await assert_do_usuario(
+        db, "aulas", ObjectId(aula_id), user.id, detail="Aula não encontrada", projection={"_id": 1}
+    )
 
     # Normaliza o nome do arquivo (ASCII-safe)
     nome_arquivo = (
@@ -113,152 +145,544 @@ async def upload_pdf(
         .replace(" ", "_")
     )
 
-    # Cria doc no Mongo primeiro para ter o pdf_id
+    # Grava no store endereçado por conteúdo: uploads idênticos compartilham o mesmo arquivo
+    with rastreio.span("gravar_pdf"):
+        contents = await file.read()
+        sha, destino = await guardar_blob(db, contents, "pdf")  # data/blobs/<aa>/<bb>/<sha>.pdf
+
     pdf_data = {
         "usuario_id": user.id,
         "aula_id": aula_id,               # segue teu padrão (string)
         "filename": nome_arquivo,
         "descricao": descricao,
-        "caminho": "",                    # preenchido após salvar
+        "caminho": str(destino),
+        "sha256": sha,
+        "tts_config": TTS_CONFIG_GOOGLE,
         "transcricao": None,
         "audio_path": None,
         "data_upload": datetime.utcnow(),
         "status": "processando",
     }
+    trace_id = rastreio.trace_id_atual()
+    if trace_id:
+        pdf_data["trace_id"] = trace_id  # python -m app.core.rastreio <trace_id>
+
+    # Mesmo PDF já processado (por qualquer usuário) com a mesma config: reaproveita o resultado.
+    # Áudio com blocos na voz alternativa do hedge não conta como síntese dessa config.
+    existente = await db.pdfs.find_one(
+        {"sha256": sha, "tts_config": TTS_CONFIG_GOOGLE, "status": "concluido", "audio_sha256": {"$ne": None},
+         "hedge_alternativo": {"$ne": True}, **VIVO},
+        projection={
+            "transcricao": 1, "audio_path": 1, "audio_sha256": 1,
+            "paginas": 1, "blocos": 1, "indice_audio": 1,
+        },
+    )
+    if existente:
+        await reter_blob(db, existente["audio_sha256"], Path(existente["audio_path"]))
+        await reter_blobs(db, [b["sha256"] for b in existente.get("blocos") or []])
+        pdf_data.update(
+            transcricao=existente.get("transcricao"),
+            audio_path=existente["audio_path"],
+            audio_sha256=existente["audio_sha256"],
+            paginas=existente.get("paginas"),
+            blocos=existente.get("blocos"),
+            indice_audio=existente.get("indice_audio"),
+            status="concluido",
+            reaproveitado_de=existente["_id"],
+        )
+
     result = await db.pdfs.insert_one(pdf_data)
     pdf_id = str(result.inserted_id)
-
-    # Salva o arquivo no layout por usuário
-    destino = pdf_path(str(user.id), aula_id, pdf_id)  # data/pdfs/<user>/<aula>/<pdf>.pdf
-    destino.parent.mkdir(parents=True, exist_ok=True)
-    contents = await file.read()
-    destino.write_bytes(contents)
-
-    # Atualiza caminho no Mongo
-    await db.pdfs.update_one({"_id": result.inserted_id}, {"$set": {"caminho": str(destino)}})
-    pdf_saved = await db.pdfs.find_one({"_id": result.inserted_id})
+    await invalidar_usuario(user.id)
 
     # Dispara processamento completo no Celery (como no teu código)
-    gerar_audio_google_task.delay(pdf_id)
+    if not existente:
+        gerar_audio_google_task.delay(pdf_id, **opcoes_task(request.headers))
 
-    pdf_saved["id"] = str(pdf_saved.pop("_id"))
-    return PdfInDB(**pdf_saved)
+    pdf_data.pop("_id", None)
+    return PdfInDB(id=pdf_id, **pdf_data)
 
 @router.get("/aulas/{aula_id}/pdfs", response_model=List[PdfInDB])
 async def listar_pdfs_da_aula(
     aula_id: str,
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_db),
     user: UsuarioToken = Depends(get_usuario_atual),
 ):
     """
     Lista os PDFs de uma aula específica do usuário.
     """
-    aula = await db.aulas.find_one({"_id": ObjectId(aula_id), "usuario_id": user.id})
-    if not aula:
-        raise HTTPException(status_code=404, detail="Aula não encontrada")
+    async def gerar():
+        await assert_do_usuario(
+            db, "aulas", ObjectId(aula_id), user.id, detail="Aula não encontrada", projection={"_id": 1}
+        )
+        cursor = db.pdfs.find(
+            {"usuario_id": user.id, "aula_id": aula_id, **VIVO}, projecao(CAMPOS_PDF)
+        ).sort("data_upload", -1)
+        return await linhas(cursor, CAMPOS_PDF)
 
-    pdfs: List[PdfInDB] = []
-    cursor = db.pdfs.find({"usuario_id": user.id, "aula_id": aula_id}).sort("data_upload", -1)
-    async for pdf in cursor:
-        pdf["id"] = str(pdf.pop("_id"))
-        pdfs.append(PdfInDB(**pdf))
-    return pdfs
+    return await resposta_em_cache(request, user.id, gerar)
+
+@router.post("/pdfs/status")
+async def status_pdfs(
+    corpo: StatusPdfsIn,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user: UsuarioToken = Depends(get_usuario_atual),
+):
+    """
+    Estado de processamento de vários PDFs (id, status, progresso, áudio pronto) numa
+    consulta só, sem transcrição. O `token` muda com a versão de progresso do usuário (a
+    mesma de /arvore): se o cliente manda o token atual, responde `alterado: false`
+    sem ir ao Mongo. PDFs inexistentes ou de outro usuário ficam fora da lista.
+    """
+    try:
+        oids = [ObjectId(p) for p in corpo.pdf_ids]
+    except Exception:
+        raise HTTPException(status_code=422, detail="pdf_ids inválidos (esperado ObjectId de 24 caracteres hex).")
+
+    # Versão (a que muda com o progresso) lida antes da consulta: uma escrita no meio gera
+    # token novo no próximo poll
+    versao = await versao_usuario(user.id, progresso=True)
+    token = None
+    if versao is not None:
+        token = f"{versao}-{hashlib.sha1(','.join(sorted(corpo.pdf_ids)).encode()).hexdigest()[:16]}"
+        if corpo.token == token:
+            return RespostaJSON({"token": token, "alterado": False})
+
+    cursor = db.pdfs.find(
+        {"_id": {"$in": oids}, "usuario_id": user.id, **VIVO},
+        {"status": 1, "progresso": 1, "audio_sha256": 1, "audio_path": 1},
+    )
+    pdfs = [{
+        "id": str(p["_id"]),
+        "status": p.get("status"),
+        "progresso": p.get("progresso"),
+        "audio_pronto": bool(p.get("audio_sha256") or p.get("audio_path")),  # legado: só audio_path
+    } async for p in cursor]
+    return RespostaJSON({"token": token, "alterado": True, "pdfs": pdfs})
 
 # =====================================================================================
 # ÁUDIO
 # =====================================================================================
 
-@router.post("/pdfs/{pdf_id}/gerar-audio", response_model=PdfInDB)
+@router.post("/pdfs/{pdf_id}/gerar-audio", status_code=202)
+@rastreio.rastreado("gerar_audio_edge")
 async def gerar_audio_pdf(
     pdf_id: str,
     db: AsyncIOMotorDatabase = Depends(get_db),
     user: UsuarioToken = Depends(get_usuario_atual),
 ):
     """
-    (Manual) Gera áudio com Edge TTS a partir da transcrição de um PDF do usuário.
+    (Manual) Enfileira a geração de áudio com Edge TTS a partir da transcrição de um PDF.
+    Responde na hora com o id do job; o progresso chega pelos eventos SSE (`progresso` 0..1).
     """
-    pdf = await db.pdfs.find_one({"_id": ObjectId(pdf_id), "usuario_id": user.id})
+    pdf = await db.pdfs.find_one({"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO})
     if not pdf:
         raise HTTPException(status_code=404, detail="PDF não encontrado")
 
     if not pdf.get("transcricao"):
         raise HTTPException(status_code=400, detail="Este PDF ainda não possui transcrição.")
 
-    # Caminho padronizado para o áudio
-    aula_id = pdf["aula_id"]
-    dest_audio = audio_path(str(user.id), aula_id, pdf_id, ext="mp3")
-    dest_audio.parent.mkdir(parents=True, exist_ok=True)
-
-    # Lazy import para evitar ciclos
-    from app.services.audio_generator import gerar_audio_edge
-
+    # "processando" antes de enfileirar: um worker rápido pode concluir antes da volta do .delay()
+    await db.pdfs.update_one(
+        {"_id": pdf["_id"]},
+        {"$set": {"status": "processando", "progresso": 0.0}, "$unset": {"job_id": ""}},
+    )
     try:
-        await gerar_audio_edge(pdf["transcricao"], str(dest_audio))
-        await db.pdfs.update_one(
-            {"_id": ObjectId(pdf_id)},
-            {"$set": {"audio_path": str(dest_audio)}}
-        )
-        pdf["audio_path"] = str(dest_audio)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao gerar áudio: {e}")
-
-    pdf["id"] = str(pdf["_id"])
-    return PdfInDB(**pdf)
+        job = gerar_audio_edge_task.delay(pdf_id)
+    except Exception:
+        await db.pdfs.update_one({"_id": pdf["_id"]}, {"$set": {"status": pdf.get("status")}})
+        raise
+    # Só anota o job se ele ainda não terminou (nem foi cancelado)
+    await db.pdfs.update_one({"_id": pdf["_id"], "status": "processando"}, {"$set": {"job_id": job.id}})
+    await invalidar_usuario(user.id)
+    return {"job_id": job.id, "pdf_id": pdf_id, "status": "processando"}
 
 
 @router.post("/pdfs/{pdf_id}/gerar-audio-google")
+@rastreio.rastreado("gerar_audio_google")
 async def gerar_audio_pdf_google(
     pdf_id: str,
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_db),
     user: UsuarioToken = Depends(get_usuario_atual),
 ):
     # Verifica posse antes de enfileirar
-    pdf = await db.pdfs.find_one({"_id": ObjectId(pdf_id), "usuario_id": user.id})
+    pdf = await db.pdfs.find_one({"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO})
     if not pdf:
         raise HTTPException(status_code=404, detail="PDF não encontrado")
-    gerar_audio_google_task.delay(pdf_id)
+    gerar_audio_google_task.delay(pdf_id, **opcoes_task(request.headers))
     return {"mensagem": "Tarefa de geração de áudio iniciada com sucesso"}
 
 
+def _resposta_audio(
+    request: Request,
+    caminho: Path,
+    sha: Optional[str],
+    *,
+    filename: Optional[str] = None,
+    download: bool = False,
+    versao: Optional[str] = None,
+) -> Response:
+    """
+    Entrega um MP3 com validadores: ETag = SHA-256 gravado na geração, 304 para
+    `If-None-Match`, Range/If-Range pelo FileResponse e `immutable` quando a URL
+    traz a versão atual (`?v=<sha>`). Só faz um stat() no arquivo.
+    """
+    headers = {"Cache-Control": CACHE_IMUTAVEL if sha and versao == sha else CACHE_REVALIDAR}
+    if sha:
+        headers["ETag"] = etag_forte(sha)
+        if nao_modificado(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    try:
+        stat_result = caminho.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Arquivo de áudio não encontrado.")
+
+    safe_name = None
+    if filename:
+        safe_name = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+
+    return FileResponseContada(
+        path=str(caminho),
+        stat_result=stat_result,
+        filename=safe_name,
+        media_type="audio/mpeg",
+        headers=headers,
+        content_disposition_type="attachment" if download else "inline",
+    )
+
+
+async def _registrar_escuta(db: AsyncIOMotorDatabase, usuario_id, pdf_id: str, sessao: Optional[str], resposta: Response):
+    """Acumula bytes servidos por sessão de escuta (um player = uma sessão)."""
+    enviados = getattr(resposta, "bytes_enviados", 0)
+    agora = datetime.utcnow()
+    await db.sessoes_escuta.update_one(
+        {"_id": f"{usuario_id}:{pdf_id}:{sessao or '-'}"},
+        {
+            "$inc": {
+                "bytes": enviados,
+                "requisicoes": 1,
+                "respostas_304": 1 if resposta.status_code == 304 else 0,
+            },
+            "$set": {"atualizado_em": agora},
+            "$setOnInsert": {"usuario_id": usuario_id, "pdf_id": pdf_id, "sessao": sessao, "criado_em": agora},
+        },
+        upsert=True,
+    )
+
+
 @router.get("/pdfs/{pdf_id}/audio", response_class=FileResponse)
 async def baixar_audio_pdf(
     pdf_id: str,
+    request: Request,
     download: bool = False,
+    v: Optional[str] = None,
+    sessao: Optional[str] = None,
     db: AsyncIOMotorDatabase = Depends(get_db),
     user: UsuarioToken = Depends(get_usuario_atual),
 ):
     """
     Toca ou baixa o áudio do PDF do usuário (conforme `download`).
+    Aceita Range (seek), `If-None-Match` (304) e `?v=<audio_sha256>` para cache imutável.
+    `sessao` (ou o header X-Sessao-Escuta) agrupa os bytes servidos por sessão de escuta.
     """
-    pdf = await db.pdfs.find_one({"_id": ObjectId(pdf_id), "usuario_id": user.id})
+    pdf = await db.pdfs.find_one(
+        {"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO},
+        projection={"aula_id": 1, "filename": 1, "audio_path": 1, "audio_sha256": 1},
+    )
     if not pdf:
         raise HTTPException(status_code=404, detail="PDF não encontrado")
 
     # Recalcula o caminho padronizado; se o doc tiver um caminho antigo, usamos ele como fallback
-    aula_id = pdf["aula_id"]
-    padrao = audio_path(str(user.id), aula_id, pdf_id, ext="mp3")
-    caminho = Path(pdf.get("audio_path") or padrao)
+    caminho = Path(pdf.get("audio_path") or audio_path(str(user.id), pdf["aula_id"], pdf_id, ext="mp3"))
+    if not pdf.get("audio_path") and not caminho.exists():
+        raise HTTPException(
+            status_code=404,
+            detail="Áudio ainda não foi gerado para este PDF (acompanhe por /audio/playlist.m3u8).",
+        )
+
+    # O arquivo no store se chama <sha>.mp3; para o usuário, usa o nome do PDF
+    resposta = _resposta_audio(
+        request, caminho, pdf.get("audio_sha256"),
+        filename=f"{Path(pdf.get('filename') or caminho.name).stem}.mp3",
+        download=download,
+        versao=v,
+    )
+    sessao = sessao or request.headers.get("x-sessao-escuta")
+    if resposta.status_code == 304:
+        await _registrar_escuta(db, user.id, pdf_id, sessao, resposta)
+    else:
+        resposta.background = BackgroundTask(_registrar_escuta, db, user.id, pdf_id, sessao, resposta)
+    return resposta
+
+def _segmentos_atuais(pdf: dict) -> tuple[list[dict], bool]:
+    """
+    Segmentos (blocos) que compõem o áudio do PDF e se a lista já está completa.
+    Durante o processamento são os publicados até agora; depois, os blocos do áudio final
+    (desde que o áudio atual seja mesmo a concatenação deles, e não um Edge manual).
+    """
+    indice = pdf.get("indice_audio") or {}
+    if pdf.get("status") == "concluido" and indice.get("audio_sha256") == pdf.get("audio_sha256"):
+        return pdf.get("blocos") or [], True
+    return pdf.get("segmentos") or [], False
+
+
+@router.get("/pdfs/{pdf_id}/audio/playlist.m3u8")
+async def playlist_audio_pdf(
+    pdf_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user: UsuarioToken = Depends(get_usuario_atual),
+):
+    """
+    Playlist HLS (tipo EVENT) com os blocos já sintetizados: dá para começar a ouvir
+    assim que o primeiro bloco fica pronto. Ganha #EXT-X-ENDLIST quando o job termina.
+    """
+    pdf = await db.pdfs.find_one(
+        {"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO},
+        projection={
+            "status": 1, "segmentos": 1, "blocos": 1, "hls_target": 1,
+            "audio_sha256": 1, "indice_audio.audio_sha256": 1,
+        },
+    )
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF não encontrado")
+
+    segmentos, completo = _segmentos_atuais(pdf)
+    # Processando ainda sem alvo fixado: a síntese não começou
+    if not segmentos and (pdf.get("status") != "processando" or not pdf.get("hls_target")):
+        raise HTTPException(status_code=404, detail="Não há áudio em segmentos para este PDF.")
+
+    # O alvo é fixado pelo job antes da síntese e não muda mais (o player guarda o primeiro que lê)
+    alvo = pdf.get("hls_target")
+    if not alvo:
+        alvo = max([1] + [math.ceil(s.get("duracao", 0)) for s in segmentos])
+        if not completo:
+            alvo = max(alvo, HLS_TARGET_ESTIMATIVA)
+    linhas = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{alvo}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:EVENT",
+    ]
+    # Segmentos por URL assinada: o player baixa direto do servidor de arquivos, sem token.
+    # Depois do #EXT-X-ENDLIST o player não recarrega a playlist: os links precisam valer a
+    # aula inteira (mais a folga de sempre), senão os últimos segmentos dão 403 no meio.
+    ttl = math.ceil(sum(s.get("duracao", 0) for s in segmentos)) + ARQUIVOS_LINK_TTL
+    for seg in segmentos:
+        url, _ = gerar_link(seg["sha256"], "mp3", ttl=ttl)
+        linhas += [f"#EXTINF:{seg.get('duracao', 0):.3f},", url]
+    if completo:
+        linhas.append("#EXT-X-ENDLIST")
+
+    return Response(
+        content="\n".join(linhas) + "\n",
+        media_type="application/vnd.apple.mpegurl",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.get("/pdfs/{pdf_id}/audio/segmentos/{n}", response_class=FileResponse)
+async def segmento_audio_pdf(
+    pdf_id: str,
+    n: int,
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user: UsuarioToken = Depends(get_usuario_atual),
+):
+    """
+    MP3 de um segmento da playlist (um bloco de TTS).
+    """
+    pdf = await db.pdfs.find_one(
+        {"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO},
+        projection={"status": 1, "segmentos": 1, "blocos": 1, "audio_sha256": 1, "indice_audio.audio_sha256": 1},
+    )
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF não encontrado")
 
-    if not caminho.exists():
+    segmentos, _ = _segmentos_atuais(pdf)
+    if not 0 <= n < len(segmentos):
+        raise HTTPException(status_code=404, detail="Segmento ainda não disponível.")
+
+    sha = segmentos[n]["sha256"]
+    return _resposta_audio(request, blob_path(sha, "mp3"), sha)
+
+
+@router.get("/pdfs/{pdf_id}/audio/link")
+async def link_audio_pdf(
+    pdf_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user: UsuarioToken = Depends(get_usuario_atual),
+):
+    """
+    Emite uma URL assinada e de curta duração para o MP3 do PDF. A entrega
+    (/api/arquivos/...) não consulta o Mongo e pode ser feita pelo nginx (offload).
+    """
+    pdf = await db.pdfs.find_one(
+        {"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO},
+        projection={"filename": 1, "audio_sha256": 1},
+    )
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF não encontrado")
+    if not pdf.get("audio_sha256"):
         raise HTTPException(status_code=404, detail="Áudio ainda não foi gerado para este PDF.")
 
-    filename = caminho.name
-    safe_name = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    url, exp = gerar_link(pdf["audio_sha256"], "mp3", nome=f"{Path(pdf.get('filename') or pdf_id).stem}.mp3")
+    return {"url": url, "expira_em": exp, "etag": etag_forte(pdf["audio_sha256"])}
 
-    headers = {}
-    if download:
-        headers["Content-Disposition"] = f'attachment; filename="{safe_name}"'
 
-    return FileResponse(
-        path=str(caminho),
-        filename=safe_name,
-        media_type="audio/mpeg",
-        headers=headers
+@router.get("/pdfs/{pdf_id}/link")
+async def link_pdf(
+    pdf_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user: UsuarioToken = Depends(get_usuario_atual),
+):
+    """
+    Emite uma URL assinada e de curta duração para o PDF original.
+    """
+    pdf = await db.pdfs.find_one(
+        {"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO},
+        projection={"filename": 1, "sha256": 1},
+    )
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF não encontrado")
+    if not pdf.get("sha256"):
+        raise HTTPException(status_code=404, detail="PDF sem versão endereçável; reenvie o arquivo.")
+
+    url, exp = gerar_link(pdf["sha256"], "pdf", nome=pdf.get("filename"))
+    return {"url": url, "expira_em": exp, "etag": etag_forte(pdf["sha256"])}
+
+
+@router.get("/pdfs/{pdf_id}/audio/posicao")
+async def posicao_audio_pdf(
+    pdf_id: str,
+    pagina: int = Query(..., ge=1),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user: UsuarioToken = Depends(get_usuario_atual),
+):
+    """
+    Resolve uma página para o byte/instante onde ela começa no áudio completo.
+    O player pode pedir direto `Range: bytes=<byte>-` em /pdfs/{pdf_id}/audio.
+    """
+    pdf = await db.pdfs.find_one(
+        {"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO},
+        projection={"audio_sha256": 1, "indice_audio": 1},
+    )
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF não encontrado")
+
+    indice = pdf.get("indice_audio")
+    # O índice só vale para o áudio a partir do qual foi montado (ex.: não para o Edge manual)
+    if not indice or indice.get("audio_sha256") != pdf.get("audio_sha256"):
+        raise HTTPException(status_code=404, detail="Índice de navegação indisponível para este áudio.")
+
+    posicao = localizar_pagina(indice, pagina)
+    if not posicao:
+        raise HTTPException(status_code=404, detail="Página sem áudio correspondente.")
+
+    return {
+        "pagina": pagina,
+        **posicao,
+        "total_bytes": indice["total_bytes"],
+        "range": f"bytes={posicao['byte']}-",
+    }
+
+
+@router.post("/pdfs/{pdf_id}/audio/paginas", status_code=202)
+@rastreio.rastreado("gerar_audio_intervalo")
+async def gerar_audio_intervalo(
+    pdf_id: str,
+    inicio: int = Query(..., ge=1),
+    fim: int = Query(..., ge=1),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user: UsuarioToken = Depends(get_usuario_atual),
+):
+    """
+    Gera (no worker) e guarda o áudio só das páginas [inicio, fim] do PDF.
+    Intervalos já gerados respondem 200 na hora; blocos em comum com outros intervalos
+    ou com o áudio completo são reaproveitados.
+    """
+    if fim < inicio:
+        raise HTTPException(status_code=422, detail="'fim' deve ser maior ou igual a 'inicio'")
+
+    chave = f"{inicio}-{fim}"
+    pdf = await db.pdfs.find_one(
+        {"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO},
+        projection={"paginas": 1, f"intervalos.{chave}": 1},
+    )
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF não encontrado")
+
+    total = len(pdf.get("paginas") or [])
+    if total and fim > total:
+        raise HTTPException(status_code=422, detail=f"O PDF tem {total} páginas")
+
+    atual = (pdf.get("intervalos") or {}).get(chave) or {}
+    if atual.get("status") == "concluido":
+        return JSONResponse(status_code=200, content={"status": "concluido", "inicio": inicio, "fim": fim})
+
+    # Reserva atômica: só enfileira se ninguém estiver processando este intervalo (ou se travou)
+    agora = datetime.utcnow()
+    reservado = await db.pdfs.update_one(
+        {
+            "_id": ObjectId(pdf_id),
+            "$or": [
+                {f"intervalos.{chave}.status": {"$ne": "processando"}},
+                {f"intervalos.{chave}.solicitado_em": {"$lt": agora - INTERVALO_TIMEOUT}},
+            ],
+        },
+        {"$set": {
+            f"intervalos.{chave}.status": "processando",
+            f"intervalos.{chave}.inicio": inicio,
+            f"intervalos.{chave}.fim": fim,
+            f"intervalos.{chave}.solicitado_em": agora,
+        }},
+    )
+    if reservado.modified_count:
+        gerar_audio_intervalo_task.delay(pdf_id, inicio, fim)
+    return {"status": "processando", "inicio": inicio, "fim": fim}
+
+
+@router.get("/pdfs/{pdf_id}/audio/paginas", response_class=FileResponse)
+async def baixar_audio_intervalo(
+    pdf_id: str,
+    request: Request,
+    inicio: int = Query(..., ge=1),
+    fim: int = Query(..., ge=1),
+    download: bool = False,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    user: UsuarioToken = Depends(get_usuario_atual),
+):
+    """
+    Toca ou baixa o áudio de um intervalo de páginas já gerado.
+    """
+    chave = f"{inicio}-{fim}"
+    pdf = await db.pdfs.find_one(
+        {"_id": ObjectId(pdf_id), "usuario_id": user.id, **VIVO},
+        projection={"filename": 1, f"intervalos.{chave}": 1},
+    )
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF não encontrado")
+
+    intervalo = (pdf.get("intervalos") or {}).get(chave) or {}
+    if intervalo.get("status") != "concluido" or not intervalo.get("audio_path"):
+        raise HTTPException(status_code=404, detail="Áudio deste intervalo ainda não foi gerado.")
+
+    caminho = Path(intervalo["audio_path"])
+    return _resposta_audio(
+        request, caminho, intervalo.get("audio_sha256"),
+        filename=f"{Path(pdf.get('filename') or caminho.name).stem}_p{chave}.mp3",
+        download=download,
     )
 
 # =====================================================================================
 # EXCLUSÕES (com verificação de posse)
 # =====================================================================================
+# Só marcam `excluido_em` (PDFs, aulas e matéria em cascata), avisam os jobs em andamento
+# (flag de cancelamento no Redis) e respondem na hora. Arquivos, blobs e documentos saem
+# em lote na task `purgar_exclusoes_task`.
 
 @router.delete("/pdfs/{pdf_id}")
 async def excluir_pdf(
@@ -269,23 +693,12 @@ async def excluir_pdf(
     """
     Exclui um PDF do usuário.
     """
-    pdf = await db.pdfs.find_one({"_id": ObjectId(pdf_id), "usuario_id": user.id})
-    if not pdf:
+    if not await marcar_pdf(db, ObjectId(pdf_id), user.id):
         raise HTTPException(status_code=404, detail="PDF não encontrado")
 
-    aula_id = pdf["aula_id"]
-    caminho_pdf = Path(pdf.get("caminho") or pdf_path(str(user.id), aula_id, pdf_id))
-    caminho_audio = Path(pdf.get("audio_path") or audio_path(str(user.id), aula_id, pdf_id, ext="mp3"))
-
-    # Best-effort removal
-    for p in (caminho_pdf, caminho_audio):
-        try:
-            if p.exists():
-                p.unlink(missing_ok=True)
-        except Exception:
-            pass
-
-    await db.pdfs.delete_one({"_id": ObjectId(pdf_id)})
+    await sinalizar_cancelamento([pdf_id])
+    await invalidar_usuario(user.id)
+    agendar_purga()
     return {"mensagem": "PDF excluído com sucesso"}
 
 
@@ -298,30 +711,13 @@ async def excluir_aula(
     """
     Exclui uma aula do usuário e todos os seus PDFs.
     """
-    aula = await db.aulas.find_one({"_id": ObjectId(aula_id), "usuario_id": user.id})
-    if not aula:
-        raise HTTPException(status_code=404, detail="Aula não encontrada")
-
-    # Exclui PDFs da aula (e arquivos físicos de forma best-effort)
-    cursor = db.pdfs.find({"usuario_id": user.id, "aula_id": aula_id})
-    async for pdf in cursor:
-        try:
-            aid = pdf["aula_id"]
-            p_pdf = Path(pdf.get("caminho") or pdf_path(str(user.id), aid, str(pdf["_id"])))
-            p_audio = Path(pdf.get("audio_path") or audio_path(str(user.id), aid, str(pdf["_id"]), ext="mp3"))
-            if p_pdf.exists():
-                p_pdf.unlink(missing_ok=True)
-            if p_audio.exists():
-                p_audio.unlink(missing_ok=True)
-        except Exception:
-            pass
-
-    await db.pdfs.delete_many({"usuario_id": user.id, "aula_id": aula_id})
-    resultado = await db.aulas.delete_one({"_id": ObjectId(aula_id), "usuario_id": user.id})
-
-    if resultado.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Aula não encontrada")
+    await assert_do_usuario(
+        db, "aulas", ObjectId(aula_id), user.id, detail="Aula não encontrada", projection={"_id": 1}
+    )
 
+    await sinalizar_cancelamento(await marcar_aulas(db, [aula_id], user.id))
+    await invalidar_usuario(user.id)
+    agendar_purga()
     return {"mensagem": "Aula e seus PDFs excluídos com sucesso"}
 
 
@@ -334,31 +730,11 @@ async def excluir_materia(
     """
     Exclui uma matéria do usuário, suas aulas e PDFs.
     """
-    materia = await db.materias.find_one({"_id": ObjectId(materia_id), "usuario_id": user.id})
-    if not materia:
+    pdf_ids = await marcar_materia(db, ObjectId(materia_id), user.id)
+    if pdf_ids is None:
         raise HTTPException(status_code=404, detail="Matéria não encontrada")
 
-    # Aulas da matéria (do usuário)
-    aulas = await db.aulas.find({"usuario_id": user.id, "materia_id": materia_id}).to_list(length=None)
-    aula_ids = [str(a["_id"]) for a in aulas]
-
-    if aula_ids:
-        # PDFs das aulas da matéria
-        cursor = db.pdfs.find({"usuario_id": user.id, "aula_id": {"$in": aula_ids}})
-        async for pdf in cursor:
-            try:
-                aid = pdf["aula_id"]
-                p_pdf = Path(pdf.get("caminho") or pdf_path(str(user.id), aid, str(pdf["_id"])))
-                p_audio = Path(pdf.get("audio_path") or audio_path(str(user.id), aid, str(pdf["_id"]), ext="mp3"))
-                if p_pdf.exists():
-                    p_pdf.unlink(missing_ok=True)
-                if p_audio.exists():
-                    p_audio.unlink(missing_ok=True)
-            except Exception:
-                pass
-        await db.pdfs.delete_many({"usuario_id": user.id, "aula_id": {"$in": aula_ids}})
-
-    await db.aulas.delete_many({"usuario_id": user.id, "materia_id": materia_id})
-    await db.materias.delete_one({"_id": ObjectId(materia_id), "usuario_id": user.id})
-
+    await sinalizar_cancelamento(pdf_ids)
+    await invalidar_usuario(user.id)
+    agendar_purga()
     return {"mensagem": "Matéria, aulas e PDFs relacionados excluídos com sucesso"}
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta, timezone
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from bson import ObjectId
+from pymongo import ReturnDocument
 from pymongo.errors import OperationFailure
 import os, secrets
 
@@ -11,8 +12,8 @@ from app.models.usuario import (
     UsuarioCreate, UsuarioLogin, UsuarioInDB,
     cpf_valido, limpar_cpf
 )
-from app.auth.hash_handler import gerar_hash, verificar_hash
-from app.auth.jwt_handler import criar_token, decodificar_token
+from app.auth.hash_handler import gerar_hash_async, verificar_hash_async, HashOcupado
+from app.auth.jwt_handler import criar_token, decodificar_token_cache, CacheAteExpirar
 from app.db.mongo import get_db
 
 router = APIRouter()
@@ -32,6 +33,37 @@ def _now():
 def _new_refresh_id():
     return secrets.token_urlsafe(32)
 
+# Campos que `_claims` lê: o /refresh busca só eles
+_CAMPOS_CLAIMS = {"email": 1, "cpf": 1, "nome": 1, "roles": 1}
+
+def _claims(user: dict) -> dict:
+    """Dados do usuário que vão no access token (relidos a cada /refresh)."""
+    return {
+        "sub": str(user["_id"]),
+        "email": user["email"],
+        "cpf": user["cpf"],
+        "name": user.get("nome", ""),
+        "roles": user.get("roles", []),
+    }
+
+def _set_refresh_cookie(response: Response, refresh_id: str) -> None:
+    response.set_cookie(
+        key=COOKIE_NAME,
+        value=refresh_id,
+        httponly=True,
+        secure=COOKIE_SECURE,
+        samesite=COOKIE_SAMESITE,  # "lax" geralmente é ok
+        max_age=REFRESH_TTL_DAYS * 24 * 3600,
+        path=COOKIE_PATH,
+    )
+
+def _servidor_ocupado() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, tente novamente em instantes",
+        headers={"Retry-After": "1"},
+    )
+
 # ---------- Cadastro ----------
 @router.post("/register", response_model=UsuarioInDB, status_code=status.HTTP_201_CREATED)
 async def registrar_usuario(
@@ -51,11 +83,16 @@ async def registrar_usuario(
             raise HTTPException(status_code=409, detail="E-mail já cadastrado")
         raise HTTPException(status_code=409, detail="CPF já cadastrado")
 
+    try:
+        senha_hash = await gerar_hash_async(usuario.senha)
+    except HashOcupado:
+        raise _servidor_ocupado()
+
     doc = {
         "nome": usuario.nome,
         "email": email,
         "cpf": cpf_num,
-        "senha_hash": gerar_hash(usuario.senha),
+        "senha_hash": senha_hash,
         "roles": [],
         "criado_em": _now(),
     }
@@ -86,19 +123,18 @@ async def login_usuario(
             raise HTTPException(status_code=400, detail="CPF inválido")
         user = await db.usuarios.find_one({"cpf": ident})
 
-    if not user or not verificar_hash(body.senha, user["senha_hash"]):
+    try:
+        senha_ok = bool(user) and await verificar_hash_async(body.senha, user["senha_hash"])
+    except HashOcupado:
+        raise _servidor_ocupado()
+    if not senha_ok:
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
 
     # Access token (curto)
-    token = criar_token({
-        "sub": str(user["_id"]),
-        "email": user["email"],
-        "cpf": user["cpf"],
-        "name": user.get("nome", ""),
-        "roles": user.get("roles", []),
-    }, minutes=ACCESS_TTL_MIN)
+    claims = _claims(user)
+    token = criar_token(claims, minutes=ACCESS_TTL_MIN)
 
-    # Refresh token (longo) – salvo no Mongo + cookie httpOnly
+    # Refresh token (longo) – salvo no Mongo + cookie httpOnly.
     refresh_id = _new_refresh_id()
     expires_at = _now() + timedelta(days=REFRESH_TTL_DAYS)
     await db.refresh_tokens.insert_one({
@@ -109,15 +145,7 @@ async def login_usuario(
         "created_at": _now(),
     })
 
-    response.set_cookie(
-        key=COOKIE_NAME,
-        value=refresh_id,
-        httponly=True,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,  # "lax" geralmente é ok
-        max_age=REFRESH_TTL_DAYS * 24 * 3600,
-        path=COOKIE_PATH,
-    )
+    _set_refresh_cookie(response, refresh_id)
 
     return {"access_token": token, "token_type": "bearer", "expires_in": ACCESS_TTL_MIN * 60}
 
@@ -128,52 +156,40 @@ async def refresh_token(
     response: Response,
     db: AsyncIOMotorDatabase = Depends(get_db),
 ):
+    """
+    Rotação atômica: o find_one_and_update troca o `refresh_id` do próprio documento só se
+    o atual ainda for válido. Dois refreshes simultâneos com o mesmo cookie: só um casa o
+    filtro, o outro recebe 401. As claims saem do usuário atual (busca por _id, só os campos
+    delas): usuário apagado encerra a sessão, e papéis/e-mail novos valem no próximo access.
+    """
     rtid = request.cookies.get(COOKIE_NAME)
     if not rtid:
         raise HTTPException(status_code=401, detail="Sem refresh token")
 
-    doc = await db.refresh_tokens.find_one({"refresh_id": rtid})
-    if not doc or doc.get("revoked"):
-        raise HTTPException(status_code=401, detail="Refresh inválido")
-
-    if doc["expires_at"] < _now():
-        raise HTTPException(status_code=401, detail="Refresh expirado")
+    agora = _now()
+    new_id = _new_refresh_id()
+    doc = await db.refresh_tokens.find_one_and_update(
+        {"refresh_id": rtid, "revoked": False, "expires_at": {"$gt": agora}},
+        {"$set": {
+            "refresh_id": new_id,
+            "rotated_from": rtid,
+            "rotated_at": agora,
+            "expires_at": agora + timedelta(days=REFRESH_TTL_DAYS),
+        }},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not doc:
+        raise HTTPException(status_code=401, detail="Refresh inválido ou expirado")
 
-    user = await db.usuarios.find_one({"_id": ObjectId(doc["user_id"])})
+    user = await db.usuarios.find_one({"_id": ObjectId(doc["user_id"])}, _CAMPOS_CLAIMS)
     if not user:
+        await db.refresh_tokens.update_one({"_id": doc["_id"]}, {"$set": {"revoked": True, "revoked_at": agora}})
         raise HTTPException(status_code=401, detail="Usuário não encontrado")
 
-    # Rotação: revoga o atual e cria um novo
-    await db.refresh_tokens.update_one({"_id": doc["_id"]}, {"$set": {"revoked": True, "revoked_at": _now()}})
-    new_id = _new_refresh_id()
-    new_exp = _now() + timedelta(days=REFRESH_TTL_DAYS)
-    await db.refresh_tokens.insert_one({
-        "user_id": str(user["_id"]),
-        "refresh_id": new_id,
-        "expires_at": new_exp,
-        "revoked": False,
-        "created_at": _now(),
-        "rotated_from": doc["refresh_id"],
-    })
-
-    response.set_cookie(
-        key=COOKIE_NAME,
-        value=new_id,
-        httponly=True,
-        secure=COOKIE_SECURE,
-        samesite=COOKIE_SAMESITE,
-        max_age=REFRESH_TTL_DAYS * 24 * 3600,
-        path=COOKIE_PATH,
-    )
+    _set_refresh_cookie(response, new_id)
 
     # Novo access
-    access = criar_token({
-        "sub": str(user["_id"]),
-        "email": user["email"],
-        "cpf": user["cpf"],
-        "name": user.get("nome", ""),
-        "roles": user.get("roles", []),
-    }, minutes=ACCESS_TTL_MIN)
+    access = criar_token(_claims(user), minutes=ACCESS_TTL_MIN)
 
     return {"access_token": access, "token_type": "bearer", "expires_in": ACCESS_TTL_MIN * 60}
 
@@ -191,21 +207,30 @@ async def logout(
     return {"ok": True}
 
 # ---------- Proteção com JWT ----------
+# Usuário já resolvido por token, válido até o `exp` do JWT: rotas protegidas não vão ao Mongo.
+# Usuário apagado ou alterado continua valendo com esse token por até ACCESS_TTL_MIN; o
+# /refresh relê `usuarios`, então a sessão não passa disso. Cada chamada recebe uma cópia.
+_usuarios_por_token = CacheAteExpirar()
+
 async def get_current_user(
     cred: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncIOMotorDatabase = Depends(get_db),
 ):
+    user = _usuarios_por_token.get(cred.credentials)
+    if user is not None:
+        return dict(user)
     try:
-        payload = decodificar_token(cred.credentials)
+        payload = decodificar_token_cache(cred.credentials)
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Token inválido")
-        user = await db.usuarios.find_one({"_id": ObjectId(user_id)})
+        user = await db.usuarios.find_one({"_id": ObjectId(user_id)}, {"senha_hash": 0})
         if not user:
             raise HTTPException(status_code=401, detail="Usuário não encontrado")
-        return user
     except Exception:
         raise HTTPException(status_code=401, detail="Token inválido ou expirado")
+    _usuarios_por_token.put(cred.credentials, payload.get("exp", 0), user)
+    return dict(user)
 
 @router.get("/me")
 async def me(usuario = Depends(get_current_user)):
@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.sse.event_queue import publicar_evento_sse
 from app.db.mongo import get_db
+from app.core import rastreio
+from app.services.cache_respostas import invalidar_progresso, invalidar_usuario
 
 router = APIRouter()
 
+STATUS_FINAIS = {"concluido", "erro", "cancelado"}
+
 class EventoPdfAudioIn(BaseModel):
     pdf_id: str
-    status: str  # ex.: "processando" | "concluido" | "erro"
+    status: str  # ex.: "processando" | "concluido" | "erro" | "cancelado"
     erro: str | None = None
+    resumo: dict | None = None  # ex.: páginas/blocos reaproveitados do cache
+    progresso: float | None = None  # 0..1, enviado durante o processamento
 
 @router.post("/eventos/pdf-audio")
 async def receber_evento_pdf_audio(
     payload: EventoPdfAudioIn,
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_db),
 ):
     # valida/casta o id
@@ -28,19 +35,35 @@ async def receber_evento_pdf_audio(
         )
 
     try:
-        # Atualiza o status no Mongo
-        await db.pdfs.update_one(
-            {"_id": oid},
-            {"$set": {"status": payload.status}}
-        )
+        # Continua o trace do job (o worker manda o traceparent no header)
+        with rastreio.span("evento_pdf_audio", contexto=rastreio.extrair(request.headers),
+                           pdf_id=payload.pdf_id, status=payload.status):
+            # Atualiza o status no Mongo
+            campos = {"status": payload.status}
+            if payload.progresso is not None:
+                campos["progresso"] = payload.progresso
+            elif payload.status == "concluido":
+                campos["progresso"] = 1.0
+            pdf = await db.pdfs.find_one_and_update(
+                {"_id": oid},
+                {"$set": campos},
+                projection={"usuario_id": 1},
+            )
+            # Fim do job muda o que as listagens mostram (áudio pronto); progresso só aparece
+            # em /pdfs/status e /arvore, que têm uma versão própria
+            if pdf and payload.status in STATUS_FINAIS:
+                await invalidar_usuario(pdf["usuario_id"])
+            elif pdf:
+                await invalidar_progresso(pdf["usuario_id"])
 
-        # Publica via SSE
-        await publicar_evento_sse(
-            f"pdf_audio_{payload.status}",
-            {"pdf_id": payload.pdf_id, "status": payload.status, "erro": payload.erro}
-        )
+            # Publica via SSE
+            await publicar_evento_sse(
+                f"pdf_audio_{payload.status}",
+                {"pdf_id": payload.pdf_id, "status": payload.status, "erro": payload.erro,
+                 "resumo": payload.resumo, "progresso": payload.progresso}
+            )
 
-        return {"mensagem": "Evento registrado com sucesso"}
+            return {"mensagem": "Evento registrado com sucesso"}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from bson import ObjectId
 from datetime import datetime
 from typing import List
@@ -7,9 +7,14 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.mongo import get_db
 from app.models.materia import MateriaCreate, MateriaInDB
 from app.deps.auth import get_usuario_atual, UsuarioToken  # <<< importa dependência
+from app.services.exclusao import VIVO
+from app.core.respostas import linhas, projecao
+from app.services.cache_respostas import invalidar_usuario, resposta_em_cache
 
 router = APIRouter()
 
+CAMPOS_MATERIA = tuple(MateriaInDB.model_fields)
+
 @router.post("/materias/", response_model=MateriaInDB)
 async def criar_materia(
     materia: MateriaCreate,
@@ -25,24 +30,25 @@ async def criar_materia(
 
     result = await db.materias.insert_one(materia_dict)
     materia_dict["id"] = str(result.inserted_id)
+    await invalidar_usuario(user.id)
 
     return MateriaInDB(**materia_dict)
 
 @router.get("/materias/", response_model=List[MateriaInDB])
 async def listar_materias(
+    request: Request,
     db: AsyncIOMotorDatabase = Depends(get_db),
     user: UsuarioToken = Depends(get_usuario_atual),
 ):
     """
     Lista as matérias do usuário logado.
     """
-    materias: List[MateriaInDB] = []
-    cursor = (
-        db.materias
-        .find({"usuario_id": user.id})              
-        .sort("data_criacao", -1)                    
-    )
-    async for m in cursor:
-        m["id"] = str(m.pop("_id"))
-        materias.append(MateriaInDB(**m))
-    return materias
\ No newline at end of file
+    async def gerar():
+        cursor = (
+            db.materias
+            .find({"usuario_id": user.id, **VIVO}, projecao(CAMPOS_MATERIA))
+            .sort("data_criacao", -1)
+        )
+        return await linhas(cursor, CAMPOS_MATERIA)
+
+    return await resposta_em_cache(request, user.id, gerar)
\ No newline at end of file
@@ -4,9 +4,12 @@ from google.cloud import texttospeech
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import Callable, Optional
+from app.core import metricas
+from app.core.metricas import medir
+from app.services import hedge, limitador
+from app.services.limitador import ProvedorIndisponivel
 from app.utils.tratar_texto import dividir_texto_em_blocos, limpar_texto_para_tts
-from pydub import AudioSegment  # Requer instalação: pip install pydub
-from uuid import uuid4
 
 # Carrega o .env do ambiente
 env = os.getenv("APP_ENV", "dev")
@@ -22,50 +25,137 @@ os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = google_credentials
 
 print("[DEBUG] GOOGLE_APPLICATION_CREDENTIALS:", google_credentials)
 
+# Configurações de síntese usadas pelo pipeline. Também identificam o áudio gerado:
+# PDFs idênticos (mesmo SHA-256) com a mesma config reaproveitam transcrição e áudio.
+TTS_CONFIG_GOOGLE = {"engine": "google", "voz": "pt-BR-Wavenet-A", "pausas": True}
+TTS_CONFIG_EDGE = {"engine": "edge", "voz": "pt-BR-AntonioNeural"}
+
+
+def _alternativa(var: str) -> Optional[dict]:
+    """
+    Config da chamada de hedge (`engine:voz`, ex. `edge:pt-BR-AntonioNeural`). Vazio = repete
+    a mesma chamada. Uma voz diferente muda a voz daquele bloco no áudio final.
+    """
+    valor = os.getenv(var, "").strip()
+    if not valor:
+        return None
+    engine, _, voz = valor.partition(":")
+    base = TTS_CONFIG_GOOGLE if engine == "google" else TTS_CONFIG_EDGE
+    return {**base, "voz": voz or base["voz"]}
+
+
+HEDGE_ALTERNATIVA_GOOGLE = _alternativa("HEDGE_ALTERNATIVA_GOOGLE")
+HEDGE_ALTERNATIVA_EDGE = _alternativa("HEDGE_ALTERNATIVA_EDGE")
 
 
 # Função com edge-tts (Microsoft)
-async def gerar_audio_edge(texto: str, caminho_saida: str, voz: str = "pt-BR-AntonioNeural"):
+async def sintetizar_bloco_edge(bloco: str, voz: str = "pt-BR-AntonioNeural") -> bytes:
+    """Sintetiza um único bloco com o Edge TTS e retorna o MP3 (sem arquivo temporário)."""
+    async def _stream() -> bytes:
+        partes = []
+        async for chunk in edge_tts.Communicate(bloco, voice=voz).stream():
+            if chunk["type"] == "audio":
+                partes.append(chunk["data"])
+        return b"".join(partes)
+
+    return await limitador.chamar_async("edge_tts", _stream)
+
+
+async def gerar_audio_edge(
+    texto: str,
+    caminho_saida: str,
+    voz: str = "pt-BR-AntonioNeural",
+    progresso: Optional[Callable[[int, int], None]] = None,
+):
+    """
+    Gera o MP3 bloco a bloco. Os blocos saem no mesmo formato MP3 e são só concatenados
+    (como no Google), sem decodificar/recodificar com pydub. `progresso(feitos, total)`
+    é chamado após cada bloco.
+    """
     texto_limpo = limpar_texto_para_tts(texto)
     blocos = dividir_texto_em_blocos(texto_limpo)
 
     print(f"[DEBUG] Total de blocos: {len(blocos)}")
 
-    pasta_temp = Path("temp_audios")
-    pasta_temp.mkdir(exist_ok=True)
+    with open(caminho_saida, "wb") as out:
+        for i, bloco in enumerate(blocos):
+            print(f"[Edge TTS] Gerando bloco {i+1}/{len(blocos)}...")
+            try:
+                with medir("tts_bloco"):
+                    dados, _ = await hedge.executar_async(
+                        "edge_tts", len(bloco), lambda: sintetizar_bloco_edge(bloco, voz=voz),
+                        _reserva_async(bloco, HEDGE_ALTERNATIVA_EDGE),
+                    )
+                metricas.BYTES_AUDIO.inc(len(dados))
+                out.write(dados)
+            except ProvedorIndisponivel:
+                raise  # sem o bloco o áudio sai com um buraco: o job falha e pode ser refeito
+            except Exception as e:
+                print(f"[Edge TTS] Erro no bloco {i+1}: {e}")
+            if progresso:
+                progresso(i + 1, len(blocos))
 
-    arquivos_temp = []
+    print(f"[Edge TTS] Áudio final gerado em {caminho_saida}")
 
-    for i, bloco in enumerate(blocos):
-        arquivo_temp = pasta_temp / f"{uuid4().hex}.mp3"
-        arquivos_temp.append(str(arquivo_temp))
 
-        print(f"[Edge TTS] Gerando bloco {i+1}/{len(blocos)}...")
+def _reserva_async(bloco: str, config: Optional[dict]):
+    if config is None:
+        return None
+    if config["engine"] == "edge":
+        return lambda: sintetizar_bloco_edge(bloco, voz=config["voz"])
+    return lambda: asyncio.to_thread(sintetizar_bloco, bloco, config)
 
-        try:
-            communicate = edge_tts.Communicate(bloco, voice=voz)
-            await communicate.save(str(arquivo_temp))
-        except Exception as e:
-            print(f"[Edge TTS] Erro no bloco {i+1}: {e}")
 
-    # Junta todos os MP3s
-    audio_final = AudioSegment.empty()
-    for arquivo in arquivos_temp:
-        audio_final += AudioSegment.from_file(arquivo, format="mp3")
+_google_client = None
 
-    audio_final.export(caminho_saida, format="mp3")
+def _cliente_google() -> "texttospeech.TextToSpeechClient":
+    """Cliente do Google TTS reaproveitado entre blocos e tasks do mesmo processo."""
+    global _google_client
+    if _google_client is None:
+        _google_client = texttospeech.TextToSpeechClient()
+    return _google_client
 
-    # Limpa arquivos temporários
-    for arquivo in arquivos_temp:
-        os.remove(arquivo)
-    pasta_temp.rmdir()
 
-    print(f"[Edge TTS] Áudio final gerado em {caminho_saida}")
+def sintetizar_bloco_google(bloco: str, voz: str = "pt-BR-Wavenet-A", pausas: bool = True) -> bytes:
+    """Sintetiza um único bloco (<= 5000 bytes de SSML) e retorna o MP3."""
+    if pausas:
+        ssml = "<speak>" + bloco.replace(".", '.<break time="500ms"/>').replace("\n", "<break time=\"700ms\"/>") + "</speak>"
+        input_data = texttospeech.SynthesisInput(ssml=ssml)
+    else:
+        input_data = texttospeech.SynthesisInput(text=bloco)
+
+    voice_params = texttospeech.VoiceSelectionParams(
+        language_code="pt-BR",
+        name=voz,
+        ssml_gender=texttospeech.SsmlVoiceGender.MALE
+    )
+
+    audio_config = texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding.MP3,
+        speaking_rate=1.0,
+        pitch=0.0
+    )
+
+    response = limitador.chamar(
+        "google_tts", _cliente_google().synthesize_speech,
+        input=input_data,
+        voice=voice_params,
+        audio_config=audio_config,
+        timeout=hedge.prazo("google_tts", len(bloco)),  # sem prazo, uma chamada pendurada segura a thread
+        chave_api=google_credentials,  # cota por conta de serviço
+    )
+    return response.audio_content
+
+
+def sintetizar_bloco(bloco: str, config: dict) -> bytes:
+    """Sintetiza um bloco com a engine/voz de `config` (síncrona; o Edge roda num loop próprio)."""
+    if config["engine"] == "edge":
+        return asyncio.run(sintetizar_bloco_edge(bloco, voz=config["voz"]))
+    return sintetizar_bloco_google(bloco, voz=config["voz"], pausas=config.get("pausas", True))
 
 
 def gerar_audio_google(texto: str, caminho_saida: str, voz: str = "pt-BR-Wavenet-A", pausas: bool = True):
 
-    client = texttospeech.TextToSpeechClient()
     texto_limpo = limpar_texto_para_tts(texto)
     blocos = dividir_texto_em_blocos(texto_limpo)    
 
@@ -76,30 +166,9 @@ def gerar_audio_google(texto: str, caminho_saida: str, voz: str = "pt-BR-Wavenet
     with open(caminho_saida, "wb") as out:
         for i, bloco in enumerate(blocos):
             try:
-                if pausas:
-                    ssml = "<speak>" + bloco.replace(".", '.<break time="500ms"/>').replace("\n", "<break time=\"700ms\"/>") + "</speak>"
-                    input_data = texttospeech.SynthesisInput(ssml=ssml)
-                else:
-                    input_data = texttospeech.SynthesisInput(text=bloco)
-
-                voice_params = texttospeech.VoiceSelectionParams(
-                    language_code="pt-BR",
-                    name=voz,
-                    ssml_gender=texttospeech.SsmlVoiceGender.MALE
-                )
-
-                audio_config = texttospeech.AudioConfig(
-                    audio_encoding=texttospeech.AudioEncoding.MP3,
-                    speaking_rate=1.0,
-                    pitch=0.0
-                )
-
-                response = client.synthesize_speech(
-                    input=input_data,
-                    voice=voice_params,
-                    audio_config=audio_config
-                )
-                out.write(response.audio_content)
+                out.write(sintetizar_bloco_google(bloco, voz=voz, pausas=pausas))
                 print(f"[Google TTS] Bloco {i+1}/{len(blocos)} gerado com sucesso.")
+            except ProvedorIndisponivel:
+                raise
             except Exception as e:
                 print(f"[Google TTS] Erro no bloco {i+1}: {e}")
\ No newline at end of file
@@ -0,0 +1,200 @@
+# app/services/blob_store.py
+"""
+Armazenamento endereçado por conteúdo (SHA-256) com contagem de referências.
+
+Os bytes ficam em data/blobs/<aa>/<bb>/<sha256>.<ext> (ver `app.core.paths.blob_path`)
+e a coleção `blobs` guarda {_id: sha256, caminho, tamanho, refs}. Cada documento que
+aponta para um blob segura uma referência; o arquivo só é apagado quando a última
+referência é liberada. A API usa as versões async (Motor) e o worker as `_sync` (pymongo).
+
+Conteúdo novo entra por `guardar_blob`/`guardar_arquivo_sync`: a referência é retida antes
+de olhar o arquivo, que é (re)gravado se não estiver lá. Ver o arquivo primeiro e reter
+depois deixava uma janela em que uma liberação concorrente apagava registro e arquivo, e
+o `reter` seguinte falhava no `stat` ou criava um registro apontando para o nada.
+"""
+import hashlib
+import os
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+from pymongo import ReturnDocument
+
+from app.core.paths import blob_path
+
+_CHUNK = 1 << 20  # 1 MiB
+
+
+def sha256_bytes(dados: bytes) -> str:
+    return hashlib.sha256(dados).hexdigest()
+
+
+def sha256_arquivo(caminho: Path) -> str:
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def gravar_blob(dados: bytes, ext: str) -> tuple[str, Path]:
+    """Grava `dados` no store (se ainda não existir) e retorna (sha256, caminho)."""
+    sha = sha256_bytes(dados)
+    destino = blob_path(sha, ext)
+    if not destino.exists():
+        tmp = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(dados)
+        os.replace(tmp, destino)  # atômico: leitores nunca veem arquivo pela metade
+    return sha, destino
+
+
+def importar_arquivo(origem: Path, ext: str) -> tuple[str, Path]:
+    """Move um arquivo já gerado para dentro do store e retorna (sha256, caminho)."""
+    sha = sha256_arquivo(origem)
+    destino = blob_path(sha, ext)
+    if destino.exists():
+        origem.unlink(missing_ok=True)
+    else:
+        os.replace(origem, destino)
+    return sha, destino
+
+
+def _reter_update(caminho: Path, extra: dict, tamanho: int | None = None) -> dict:
+    return {
+        "$inc": {"refs": 1},
+        "$setOnInsert": {
+            "caminho": str(caminho),
+            "tamanho": caminho.stat().st_size if tamanho is None else tamanho,
+            "criado_em": datetime.utcnow(),
+            **extra,
+        },
+    }
+
+
+def _incs(contagem: Counter, sinal: int) -> list[tuple[dict, dict]]:
+    """
+    (filtro, update) para update_many: blobs com o mesmo número de ocorrências vão juntos,
+    então o caso comum (cada hash uma vez) é um único $inc com $in.
+    """
+    por_n: dict[int, list[str]] = {}
+    for sha, n in contagem.items():
+        por_n.setdefault(n, []).append(sha)
+    return [({"_id": {"$in": shas}}, {"$inc": {"refs": sinal * n}}) for n, shas in por_n.items()]
+
+
+# ---------- API (Motor) ----------
+
+async def reter_blob(db, sha: str, caminho: Path, **extra) -> None:
+    """Soma uma referência ao blob (cria o registro na primeira vez)."""
+    await db.blobs.update_one({"_id": sha}, _reter_update(caminho, extra), upsert=True)
+
+
+async def guardar_blob(db, dados: bytes, ext: str, **extra) -> tuple[str, Path]:
+    """Retém e grava `dados` (nessa ordem); retorna (sha256, caminho)."""
+    sha = sha256_bytes(dados)
+    destino = blob_path(sha, ext)
+    await db.blobs.update_one({"_id": sha}, _reter_update(destino, extra, len(dados)), upsert=True)
+    gravar_blob(dados, ext)  # recria o arquivo se uma liberação concorrente o apagou
+    return sha, destino
+
+
+async def liberar_blob(db, sha: str) -> bool:
+    """Remove uma referência; apaga o arquivo quando ninguém mais aponta para ele."""
+    doc = await db.blobs.find_one_and_update(
+        {"_id": sha}, {"$inc": {"refs": -1}}, return_document=ReturnDocument.AFTER
+    )
+    if not doc or doc.get("refs", 0) > 0:
+        return False
+    res = await db.blobs.delete_one({"_id": sha, "refs": {"$lte": 0}})
+    if res.deleted_count:
+        Path(doc["caminho"]).unlink(missing_ok=True)
+        return True
+    return False
+
+
+async def reter_blobs(db, shas: Iterable[str]) -> None:
+    """Soma uma referência a cada blob existente da lista (um update_many por multiplicidade)."""
+    for filtro, update in _incs(Counter(shas), +1):
+        await db.blobs.update_many(filtro, update)
+
+
+async def liberar_blobs(db, shas: Iterable[str]) -> int:
+    """Versão em lote de `liberar_blob`; retorna quantos arquivos foram apagados."""
+    contagem = Counter(shas)
+    if not contagem:
+        return 0
+    for filtro, update in _incs(contagem, -1):
+        await db.blobs.update_many(filtro, update)
+    ids = list(contagem)
+    mortos = await db.blobs.find({"_id": {"$in": ids}, "refs": {"$lte": 0}}, {"caminho": 1}).to_list(length=None)
+    apagados = 0
+    for m in mortos:
+        # Um por um: um `reter_blob` entre o find e o delete mantém o registro, e aí o arquivo fica
+        res = await db.blobs.delete_one({"_id": m["_id"], "refs": {"$lte": 0}})
+        if res.deleted_count == 1:
+            Path(m["caminho"]).unlink(missing_ok=True)
+            apagados += 1
+    return apagados
+
+
+# ---------- Worker (pymongo) ----------
+
+def reter_blob_sync(db, sha: str, caminho: Path, **extra) -> None:
+    db.blobs.update_one({"_id": sha}, _reter_update(caminho, extra), upsert=True)
+
+
+def guardar_blob_sync(db, dados: bytes, ext: str, **extra) -> tuple[str, Path]:
+    sha = sha256_bytes(dados)
+    destino = blob_path(sha, ext)
+    db.blobs.update_one({"_id": sha}, _reter_update(destino, extra, len(dados)), upsert=True)
+    gravar_blob(dados, ext)
+    return sha, destino
+
+
+def guardar_arquivo_sync(db, origem: Path, ext: str, **extra) -> tuple[str, Path]:
+    """Como `importar_arquivo`, mas retendo a referência antes de mover o arquivo para o store."""
+    sha = sha256_arquivo(origem)
+    destino = blob_path(sha, ext)
+    db.blobs.update_one({"_id": sha}, _reter_update(destino, extra, origem.stat().st_size), upsert=True)
+    if destino.exists():
+        origem.unlink(missing_ok=True)
+    else:
+        os.replace(origem, destino)
+    return sha, destino
+
+
+def liberar_blob_sync(db, sha: str) -> bool:
+    doc = db.blobs.find_one_and_update(
+        {"_id": sha}, {"$inc": {"refs": -1}}, return_document=ReturnDocument.AFTER
+    )
+    if not doc or doc.get("refs", 0) > 0:
+        return False
+    res = db.blobs.delete_one({"_id": sha, "refs": {"$lte": 0}})
+    if res.deleted_count:
+        Path(doc["caminho"]).unlink(missing_ok=True)
+        return True
+    return False
+
+
+def reter_blobs_sync(db, shas: Iterable[str]) -> None:
+    for filtro, update in _incs(Counter(shas), +1):
+        db.blobs.update_many(filtro, update)
+
+
+def liberar_blobs_sync(db, shas: Iterable[str]) -> int:
+    contagem = Counter(shas)
+    if not contagem:
+        return 0
+    for filtro, update in _incs(contagem, -1):
+        db.blobs.update_many(filtro, update)
+    ids = list(contagem)
+    mortos = list(db.blobs.find({"_id": {"$in": ids}, "refs": {"$lte": 0}}, {"caminho": 1}))
+    apagados = 0
+    for m in mortos:
+        # Um por um: um `reter_blob` entre o find e o delete mantém o registro, e aí o arquivo fica
+        res = db.blobs.delete_one({"_id": m["_id"], "refs": {"$lte": 0}})
+        if res.deleted_count == 1:
+            Path(m["caminho"]).unlink(missing_ok=True)
+            apagados += 1
+    return apagados
@@ -0,0 +1,159 @@
+# app/services/cache_respostas.py
+"""
+Cache de respostas das listagens, por usuário. Cada usuário tem um contador de versão;
+qualquer escrita que mude o que ele vê (criar, upload, excluir, fim de um job) chama
+`invalidar_usuario`, que incrementa o contador. A chave do cache e o ETag incluem a versão,
+então nada precisa ser apagado: entradas antigas só deixam de ser lidas (e expiram).
+
+O progresso dos jobs (um evento por página/bloco) tem um contador à parte, que só as
+respostas com status/progresso usam (`/pdfs/status`, `/arvore`): `invalidar_progresso`
+não derruba o cache de /materias, /aulas e /aulas/{id}/pdfs a cada poucos segundos.
+`invalidar_usuario` incrementa os dois.
+
+Backend em `CACHE_RESPOSTAS`: "redis" (padrão, compartilhado entre processos da API),
+"memoria" (um processo só / testes) ou "desligado".
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from fastapi import Request, Response
+
+from app.core.http_cache import CACHE_REVALIDAR, nao_modificado
+from app.core.redis import redis_async
+from app.core.respostas import RespostaJSON
+
+CACHE_RESPOSTAS = os.getenv("CACHE_RESPOSTAS", "redis").lower()
+CACHE_RESPOSTAS_TTL = int(os.getenv("CACHE_RESPOSTAS_TTL", "300"))
+CACHE_RESPOSTAS_MAX = int(os.getenv("CACHE_RESPOSTAS_MAX", "2048"))  # só no backend em memória
+
+
+def _versao_inicial() -> int:
+    # Começa do relógio (ms): se o contador sumir (restart/eviction), não volta a uma versão
+    # que um cliente ainda tenha no If-None-Match.
+    return int(time.time() * 1000)
+
+
+class _CacheMemoria:
+    def __init__(self):
+        self._versoes: dict[str, int] = {}
+        self._corpos: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def versao(self, chave: str) -> int:
+        return self._versoes.setdefault(chave, _versao_inicial())
+
+    async def incrementar(self, *chaves: str) -> None:
+        for chave in chaves:
+            self._versoes[chave] = self._versoes.get(chave, _versao_inicial()) + 1
+
+    async def ler(self, chave: str) -> bytes | None:
+        item = self._corpos.get(chave)
+        if item is None or item[0] <= time.monotonic():
+            self._corpos.pop(chave, None)
+            return None
+        self._corpos.move_to_end(chave)
+        return item[1]
+
+    async def gravar(self, chave: str, corpo: bytes) -> None:
+        self._corpos[chave] = (time.monotonic() + CACHE_RESPOSTAS_TTL, corpo)
+        self._corpos.move_to_end(chave)
+        while len(self._corpos) > CACHE_RESPOSTAS_MAX:
+            self._corpos.popitem(last=False)
+
+
+class _CacheRedis:
+    async def versao(self, chave: str) -> int:
+        chave = f"versao:{chave}"
+        async with redis_async().pipeline(transaction=False) as pipe:
+            pipe.set(chave, _versao_inicial(), nx=True)
+            pipe.get(chave)
+            _, valor = await pipe.execute()
+        return int(valor)
+
+    async def incrementar(self, *chaves: str) -> None:
+        async with redis_async().pipeline(transaction=False) as pipe:
+            for chave in chaves:
+                pipe.set(f"versao:{chave}", _versao_inicial(), nx=True)
+                pipe.incr(f"versao:{chave}")
+            await pipe.execute()
+
+    async def ler(self, chave: str) -> str | None:
+        return await redis_async().get(f"resp:{chave}")  # JSON UTF-8 (cliente com decode)
+
+    async def gravar(self, chave: str, corpo: bytes) -> None:
+        await redis_async().set(f"resp:{chave}", corpo, ex=CACHE_RESPOSTAS_TTL)
+
+
+_backend = {"redis": _CacheRedis, "memoria": _CacheMemoria}.get(CACHE_RESPOSTAS, lambda: None)()
+
+
+def _chave_versao(usuario_id, progresso: bool) -> str:
+    return f"{'progresso' if progresso else 'usuario'}:{usuario_id}"
+
+
+async def _incrementar(usuario_id, *chaves: str) -> None:
+    if _backend is None:
+        return
+    try:
+        await _backend.incrementar(*chaves)
+    except Exception as e:
+        print(f"[cache] Falha ao invalidar usuário {usuario_id}: {e}")
+
+
+async def invalidar_usuario(usuario_id) -> None:
+    """Nova versão para o usuário: as próximas leituras refazem a consulta."""
+    await _incrementar(usuario_id, _chave_versao(usuario_id, False), _chave_versao(usuario_id, True))
+
+
+async def invalidar_progresso(usuario_id) -> None:
+    """Só o progresso de um job mudou: renova `/pdfs/status` e `/arvore`, não as listagens."""
+    await _incrementar(usuario_id, _chave_versao(usuario_id, True))
+
+
+async def versao_usuario(usuario_id, progresso: bool = False) -> int | None:
+    """
+    Versão atual dos dados do usuário (com `progresso`, a que também muda a cada evento de
+    progresso); None sem backend (ou com ele fora do ar).
+    """
+    if _backend is None:
+        return None
+    try:
+        return await _backend.versao(_chave_versao(usuario_id, progresso))
+    except Exception as e:
+        print(f"[cache] Backend indisponível, respondendo sem cache: {e}")
+        return None
+
+
+async def resposta_em_cache(
+    request: Request, usuario_id, gerar: Callable[[], Awaitable[Any]], progresso: bool = False,
+) -> Response:
+    """
+    Devolve a listagem do cache (ou 304 se o ETag do cliente ainda vale). Em miss, roda
+    `gerar()` (consulta + checagens de posse) e guarda o JSON. Sem backend, só roda `gerar`.
+    `progresso=True` para respostas que mostram status/progresso dos jobs.
+    """
+    usuario = str(usuario_id)
+    rota = f"{request.url.path}?{request.url.query}"
+    versao = await versao_usuario(usuario, progresso)
+    if versao is None:
+        return RespostaJSON(await gerar())
+
+    assinatura = hashlib.sha1(f"{usuario}:{rota}".encode()).hexdigest()[:16]
+    headers = {"ETag": f'"{versao}-{assinatura}"', "Cache-Control": CACHE_REVALIDAR}
+    if nao_modificado(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    chave = f"{usuario}:{versao}:{assinatura}"
+    try:
+        corpo = await _backend.ler(chave)
+    except Exception:
+        corpo = None
+    if corpo is None:
+        corpo = RespostaJSON(await gerar()).body
+        try:
+            await _backend.gravar(chave, corpo)
+        except Exception as e:
+            print(f"[cache] Falha ao gravar resposta: {e}")
+    return Response(content=corpo, media_type="application/json", headers=headers)
@@ -0,0 +1,59 @@
+# app/services/cancelamento.py
+"""
+Cancelamento cooperativo de jobs por `pdf_id`. A API liga uma flag no Redis
+(`cancelar:pdf:<id>`) quando o PDF, a aula ou a matéria é excluída; o worker consulta a
+flag entre páginas, blocos e trechos de TTS e, se ligada, interrompe com `JobCancelado`.
+"""
+import time
+from typing import Iterable
+
+from app.core.redis import redis_async, redis_sync
+
+CANCELAMENTO_TTL = 24 * 3600  # maior que qualquer job; a flag some sozinha depois
+_PAUSA_SEM_REDIS = 30.0  # com o Redis fora, o worker para de perguntar por um tempo
+
+_redis_fora_ate = 0.0
+
+
+class JobCancelado(Exception):
+    """O PDF foi excluído durante o processamento. `tts_desperdicadas` conta as sínteses perdidas."""
+
+    def __init__(self, pdf_id: str):
+        super().__init__(f"Job do PDF {pdf_id} cancelado")
+        self.pdf_id = pdf_id
+        self.tts_desperdicadas = 0
+
+
+def _chave(pdf_id) -> str:
+    return f"cancelar:pdf:{pdf_id}"
+
+
+async def sinalizar_cancelamento(pdf_ids: Iterable) -> None:
+    """Liga a flag para cada PDF (um pipeline). Best-effort: sem Redis, a purga ainda resolve."""
+    chaves = [_chave(p) for p in pdf_ids]
+    if not chaves:
+        return
+    try:
+        async with redis_async().pipeline(transaction=False) as pipe:
+            for chave in chaves:
+                pipe.set(chave, 1, ex=CANCELAMENTO_TTL)
+            await pipe.execute()
+    except Exception as e:
+        print(f"[cancelamento] Falha ao sinalizar {len(chaves)} PDF(s): {e}")
+
+
+def cancelado(pdf_id) -> bool:
+    global _redis_fora_ate
+    if time.monotonic() < _redis_fora_ate:
+        return False
+    try:
+        return bool(redis_sync().exists(_chave(pdf_id)))
+    except Exception as e:
+        print(f"[cancelamento] Redis indisponível, seguindo sem checar: {e}")
+        _redis_fora_ate = time.monotonic() + _PAUSA_SEM_REDIS
+        return False
+
+
+def verificar_cancelamento(pdf_id) -> None:
+    if cancelado(pdf_id):
+        raise JobCancelado(str(pdf_id))
@@ -0,0 +1,66 @@
+# app/services/exclusao.py
+"""
+Exclusão em duas fases: a API só marca `excluido_em` (tombstone) em matéria/aula/PDFs e
+responde na hora; a task `purgar_exclusoes_task` (worker) apaga diretórios, libera blobs e
+remove os documentos em lote. Toda consulta de leitura filtra com `VIVO`.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+# {"excluido_em": None} casa tanto com campo ausente quanto nulo
+VIVO = {"excluido_em": None}
+
+
+def shas_do_pdf(pdf: dict) -> list[str]:
+    """Todos os blobs referenciados por um documento de PDF (arquivo, áudio, blocos, intervalos)."""
+    shas = [s for s in (pdf.get("sha256"), pdf.get("audio_sha256")) if s]
+    shas += [b["sha256"] for b in pdf.get("blocos") or []]
+    for intervalo in (pdf.get("intervalos") or {}).values():
+        shas += [b["sha256"] for b in intervalo.get("blocos") or []]
+        if intervalo.get("audio_sha256"):
+            shas.append(intervalo["audio_sha256"])
+    return shas
+
+
+async def marcar_pdf(db: AsyncIOMotorDatabase, pdf_id: ObjectId, usuario_id) -> bool:
+    res = await db.pdfs.update_one(
+        {"_id": pdf_id, "usuario_id": usuario_id, **VIVO},
+        {"$set": {"excluido_em": datetime.utcnow()}},
+    )
+    return res.matched_count > 0
+
+
+async def marcar_aulas(db: AsyncIOMotorDatabase, aula_ids: Iterable[str], usuario_id) -> list[ObjectId]:
+    """Marca as aulas e os PDFs delas (PDFs guardam `aula_id` como string); retorna os PDFs marcados."""
+    aula_ids = list(aula_ids)
+    if not aula_ids:
+        return []
+    agora = datetime.utcnow()
+    await db.aulas.update_many(
+        {"_id": {"$in": [ObjectId(a) for a in aula_ids]}, "usuario_id": usuario_id, **VIVO},
+        {"$set": {"excluido_em": agora}},
+    )
+    pdfs = await db.pdfs.find(
+        {"usuario_id": usuario_id, "aula_id": {"$in": aula_ids}, **VIVO}, {"_id": 1}
+    ).to_list(length=None)
+    pdf_ids = [p["_id"] for p in pdfs]
+    if pdf_ids:
+        await db.pdfs.update_many({"_id": {"$in": pdf_ids}}, {"$set": {"excluido_em": agora}})
+    return pdf_ids
+
+
+async def marcar_materia(db: AsyncIOMotorDatabase, materia_id: ObjectId, usuario_id) -> Optional[list[ObjectId]]:
+    """Marca a matéria, suas aulas e PDFs; None se a matéria não existe (ou não é do usuário)."""
+    res = await db.materias.update_one(
+        {"_id": materia_id, "usuario_id": usuario_id, **VIVO},
+        {"$set": {"excluido_em": datetime.utcnow()}},
+    )
+    if not res.matched_count:
+        return None
+    aulas = await db.aulas.find(
+        {"usuario_id": usuario_id, "materia_id": str(materia_id), **VIVO}, {"_id": 1}
+    ).to_list(length=None)
+    return await marcar_aulas(db, [str(a["_id"]) for a in aulas], usuario_id)
@@ -0,0 +1,220 @@
+# app/services/hedge.py
+"""
+Hedge de blocos de TTS: se a chamada passar do p95 de latência dos blocos do mesmo tamanho,
+dispara uma segunda (a mesma chamada ou a alternativa configurada) e fica com a primeira
+que responder. Um bloco lento (ou uma conexão do Edge pendurada) deixa de segurar a aula.
+
+- Latência: janela das últimas `HEDGE_JANELA` chamadas bem-sucedidas por provedor e faixa
+  de tamanho (<500, <1000, <2000, <4000, >=4000 caracteres), por processo. Sem
+  `HEDGE_AMOSTRAS_MIN` amostras na faixa, não há hedge (a chamada roda direto).
+- Orçamento: hedges <= `HEDGE_ORCAMENTO` (fração, padrão 5%) das últimas `HEDGE_JANELA`
+  chamadas do provedor; `HEDGE_ORCAMENTO=0` desliga.
+- Síncrono (Google): com a faixa aquecida, as duas chamadas rodam num pool de threads; a
+  perdedora não tem como ser interrompida e termina em segundo plano (o resultado é
+  descartado). Por isso cada chamada tem prazo (`prazo`: `HEDGE_PRAZO_FATOR` x p95 da
+  faixa, mínimo `HEDGE_PRAZO_MIN`; `HEDGE_PRAZO_PADRAO` sem amostras) e o pool é largo
+  (`HEDGE_THREADS`, threads só sobem sob demanda). Com o pool todo ocupado, a chamada roda
+  direto na thread de quem chamou, sem hedge: nunca fica na fila atrás de perdedoras
+  penduradas. Async (Edge): a perdedora é cancelada.
+
+As duas chamadas passam pelo limitador, então o hedge nunca fura a cota; o p95 inclui a
+espera por vaga e sobe junto quando o provedor está saturado.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from app.core.metricas import HEDGES
+
+T = TypeVar("T")
+
+HEDGE_ORCAMENTO = float(os.getenv("HEDGE_ORCAMENTO", "0.05"))
+HEDGE_AMOSTRAS_MIN = int(os.getenv("HEDGE_AMOSTRAS_MIN", "20"))
+HEDGE_JANELA = int(os.getenv("HEDGE_JANELA", "500"))
+HEDGE_THREADS = int(os.getenv("HEDGE_THREADS", "32"))
+HEDGE_PRAZO_FATOR = float(os.getenv("HEDGE_PRAZO_FATOR", "4"))
+HEDGE_PRAZO_MIN = float(os.getenv("HEDGE_PRAZO_MIN", "10"))  # s
+HEDGE_PRAZO_PADRAO = float(os.getenv("HEDGE_PRAZO_PADRAO", "60"))  # s, faixa sem amostras
+
+_pool = ThreadPoolExecutor(max_workers=HEDGE_THREADS, thread_name_prefix="hedge")
+_lock = threading.Lock()
+_em_voo = 0  # tarefas no pool (rodando ou penduradas)
+
+
+def faixa(caracteres: int) -> int:
+    return min(4, (caracteres // 500).bit_length())
+
+
+class Latencias:
+    """Janela de latências (s) por (provedor, faixa); `limiar` é o p95 da faixa."""
+
+    def __init__(self, janela: int = HEDGE_JANELA, minimo: int = HEDGE_AMOSTRAS_MIN):
+        self.janela, self.minimo = janela, minimo
+        self._amostras: dict[tuple[str, int], deque] = {}
+
+    def registrar(self, provedor: str, caracteres: int, segundos: float) -> None:
+        with _lock:
+            self._amostras.setdefault((provedor, faixa(caracteres)), deque(maxlen=self.janela)).append(segundos)
+
+    def limiar(self, provedor: str, caracteres: int) -> Optional[float]:
+        with _lock:
+            amostras = sorted(self._amostras.get((provedor, faixa(caracteres)), ()))
+        if len(amostras) < self.minimo:
+            return None
+        return amostras[min(len(amostras) - 1, int(0.95 * len(amostras)))]
+
+
+class Orcamento:
+    """Quantos hedges cabem: uma fração das últimas `janela` chamadas do provedor."""
+
+    def __init__(self, fracao: float = HEDGE_ORCAMENTO, janela: int = HEDGE_JANELA):
+        self.fracao = fracao
+        self._chamadas: deque = deque(maxlen=janela)  # 1 se a chamada teve hedge
+        self._hedges = 0
+
+    def contar(self) -> None:
+        with _lock:
+            if len(self._chamadas) == self._chamadas.maxlen:
+                self._hedges -= self._chamadas[0]
+            self._chamadas.append(0)
+
+    def permitir(self) -> bool:
+        """Reserva um hedge para a chamada mais recente, se couber no orçamento."""
+        with _lock:
+            if not self._chamadas or self._hedges + 1 > self.fracao * len(self._chamadas):
+                return False
+            self._chamadas[-1] = 1
+            self._hedges += 1
+            return True
+
+
+LATENCIAS = Latencias()
+_orcamentos: dict[str, Orcamento] = {}
+
+
+def _orcamento(provedor: str) -> Orcamento:
+    with _lock:
+        return _orcamentos.setdefault(provedor, Orcamento())
+
+
+def prazo(provedor: str, caracteres: int) -> float:
+    """Timeout (s) de uma chamada: perdedora pendurada não segura uma thread indefinidamente."""
+    limiar = LATENCIAS.limiar(provedor, caracteres)
+    if limiar is None:
+        return HEDGE_PRAZO_PADRAO
+    return max(HEDGE_PRAZO_MIN, HEDGE_PRAZO_FATOR * limiar)
+
+
+def _submeter(fn: Callable[[], T]) -> Optional[Future]:
+    """Põe `fn` no pool se houver thread livre; None com o pool todo ocupado."""
+    global _em_voo
+    with _lock:
+        if _em_voo >= HEDGE_THREADS:
+            return None
+        _em_voo += 1
+    futuro = _pool.submit(fn)
+    futuro.add_done_callback(_saiu_do_pool)
+    return futuro
+
+
+def _saiu_do_pool(_f) -> None:
+    global _em_voo
+    with _lock:
+        _em_voo -= 1
+
+
+def _registrar_ao_terminar(provedor: str, caracteres: int, t0: float):
+    def _cb(f) -> None:
+        if not f.cancelled() and f.exception() is None:
+            LATENCIAS.registrar(provedor, caracteres, time.monotonic() - t0)
+    return _cb
+
+
+def _hedge_cabe(provedor: str, limiar: Optional[float]) -> bool:
+    if limiar is None or HEDGE_ORCAMENTO <= 0:
+        return False
+    if _orcamento(provedor).permitir():
+        return True
+    HEDGES.labels(provedor, "sem_orcamento").inc()
+    return False
+
+
+def executar(
+    provedor: str, caracteres: int, primaria: Callable[[], T], reserva: Optional[Callable[[], T]] = None,
+) -> tuple[T, bool]:
+    """Roda `primaria` com hedge (`reserva`, ou a própria `primaria`); retorna (resultado, veio da reserva)."""
+    _orcamento(provedor).contar()
+    limiar = LATENCIAS.limiar(provedor, caracteres) if HEDGE_ORCAMENTO > 0 else None
+    t0 = time.monotonic()
+    principal = _submeter(primaria) if limiar is not None else None
+    if principal is None:  # sem amostras (ou pool ocupado): chamada direta, sem hedge
+        resultado = primaria()
+        LATENCIAS.registrar(provedor, caracteres, time.monotonic() - t0)
+        return resultado, False
+
+    principal.add_done_callback(_registrar_ao_terminar(provedor, caracteres, t0))
+    try:
+        return principal.result(timeout=limiar), False
+    except FuturesTimeout:
+        pass
+    if not _hedge_cabe(provedor, limiar):
+        return principal.result(), False
+    extra = _submeter(reserva or primaria)
+    if extra is None:
+        HEDGES.labels(provedor, "pool_cheio").inc()
+        return principal.result(), False
+    HEDGES.labels(provedor, "disparado").inc()
+    if reserva is None:  # mesma chamada: a latência dela também vale para a faixa
+        extra.add_done_callback(_registrar_ao_terminar(provedor, caracteres, time.monotonic()))
+    pendentes: set[Future] = {principal, extra}
+    while pendentes:
+        prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+        for f in prontos:
+            if f.exception() is None:
+                if f is extra:
+                    HEDGES.labels(provedor, "venceu").inc()
+                return f.result(), f is extra and reserva is not None
+    return principal.result(), False  # as duas falharam: vale o erro da principal
+
+
+async def executar_async(
+    provedor: str, caracteres: int,
+    primaria: Callable[[], Awaitable[T]], reserva: Optional[Callable[[], Awaitable[T]]] = None,
+) -> tuple[T, bool]:
+    """Versão async: mesma política; a chamada perdedora é cancelada."""
+    _orcamento(provedor).contar()
+    limiar = LATENCIAS.limiar(provedor, caracteres) if HEDGE_ORCAMENTO > 0 else None
+    t0 = time.monotonic()
+    if limiar is None:
+        resultado = await primaria()
+        LATENCIAS.registrar(provedor, caracteres, time.monotonic() - t0)
+        return resultado, False
+
+    principal = asyncio.ensure_future(primaria())
+    principal.add_done_callback(_registrar_ao_terminar(provedor, caracteres, t0))
+    prontos, _ = await asyncio.wait({principal}, timeout=limiar)
+    if prontos or not _hedge_cabe(provedor, limiar):
+        return await principal, False
+
+    extra = asyncio.ensure_future((reserva or primaria)())
+    HEDGES.labels(provedor, "disparado").inc()
+    if reserva is None:
+        extra.add_done_callback(_registrar_ao_terminar(provedor, caracteres, time.monotonic()))
+    pendentes = {principal, extra}
+    try:
+        while pendentes:
+            prontos, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+            for f in prontos:
+                if f.exception() is None:
+                    if f is extra:
+                        HEDGES.labels(provedor, "venceu").inc()
+                    return f.result(), f is extra and reserva is not None
+        return await principal, False
+    finally:
+        for f in pendentes:
+            f.cancel()
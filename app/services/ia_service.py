@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 from pathlib import Path
 import google.generativeai as genai
 
+from app.services import limitador
+
 # Carrega o .env do ambiente apropriado
 env = os.getenv("APP_ENV", "dev")
 dotenv_path = Path(f".env.{env}") if Path(f".env.{env}").exists() else Path(".env")
@@ -34,12 +36,13 @@ Sua tarefa é:
 Retorne o resultado final como um **texto corrido organizado**, que possa ser lido como um resumo de estudo ou apostila, com as mesmas informações da transcrição original.
 """
 
-        response = model.generate_content([
+        # 429/5xx são repetidos pelo limitador; o texto original só volta se a cota não abrir
+        response = limitador.chamar("gemini", model.generate_content, [
             {"role": "user", "parts": [
                 {"text": prompt},
                 {"text": texto}
             ]}
-        ])
+        ], chave_api=GEMINI_API_KEY)
         return response.text  # Também funciona: response.candidates[0].content.parts[0].text
     except Exception as e:
         print(f"[Gemini] Erro ao melhorar pontuação: {e}")
@@ -0,0 +1,42 @@
+# app/services/indice_audio.py
+"""
+Índice de navegação do áudio final: para cada bloco de TTS, as páginas de origem,
+o byte e o instante (ms) onde ele começa no MP3 concatenado. Guardado no documento
+do PDF como listas paralelas (compacto) e consultado por página pela API, para o
+player pedir um único `Range: bytes=<byte>-` direto na posição.
+"""
+from bisect import bisect_left
+from typing import Optional
+
+
+def montar_indice(blocos: list[dict], audio_sha256: str) -> dict:
+    """`blocos`: [{"pagina", "bytes", "duracao"}] na ordem em que foram concatenados."""
+    indice = {"audio_sha256": audio_sha256, "pagina_inicio": [], "pagina_fim": [], "byte": [], "ms": []}
+    byte, ms = 0, 0
+    for b in blocos:
+        indice["pagina_inicio"].append(b.get("pagina_inicio", b["pagina"]))
+        indice["pagina_fim"].append(b.get("pagina_fim", b["pagina"]))
+        indice["byte"].append(byte)
+        indice["ms"].append(ms)
+        byte += b["bytes"]
+        ms += round(b.get("duracao", 0.0) * 1000)
+    indice["total_bytes"] = byte
+    indice["total_ms"] = ms
+    return indice
+
+
+def localizar_pagina(indice: dict, pagina: int) -> Optional[dict]:
+    """
+    Primeiro bloco que cobre `pagina`; se a página não tiver texto, o próximo bloco.
+    Retorna None se a página estiver depois do último bloco.
+    """
+    i = bisect_left(indice["pagina_fim"], pagina)
+    if i >= len(indice["byte"]):
+        return None
+    return {
+        "bloco": i,
+        "pagina_inicio": indice["pagina_inicio"][i],
+        "pagina_fim": indice["pagina_fim"][i],
+        "byte": indice["byte"][i],
+        "segundos": indice["ms"][i] / 1000,
+    }
@@ -0,0 +1,284 @@
+# app/services/limitador.py
+"""
+Limite de uso das APIs externas (Google TTS, Gemini, Edge TTS) compartilhado por todos os
+workers via Redis, por provedor e por chave de API (só o hash da chave vai para o Redis):
+
+- Token bucket: `LIMITE_<PROVEDOR>_RPM` chamadas por minuto (rajada de até 1 s de cota).
+- Concorrência adaptativa (AIMD): uma janela de chamadas simultâneas que cresce ~1 a cada
+  janela de sucessos e cai pela metade num 429/5xx (no máximo um corte por
+  `CORTE_INTERVALO_MS`, para uma rajada de erros não derrubar a janela a zero). Um 429
+  também esvazia o balde, pausando todos os workers até a próxima ficha.
+
+Cada vaga é um lease com TTL num sorted set: worker que morre no meio da chamada não
+prende a vaga. `chamar`/`chamar_async` esperam a vaga, chamam e repetem 429/5xx e erros
+de conexão com backoff exponencial (jitter) até `LIMITADOR_TENTATIVAS`; esgotadas,
+levantam `ProvedorIndisponivel`. Sem Redis (ou `LIMITADOR=desligado`), seguem só com as
+repetições, sem limite compartilhado.
+
+Os scripts Lua rodam por EVALSHA (`register_script`: o redis-py manda o corpo só se o Redis
+não o tiver em cache). `chamar_async` fala com o Redis num pool de threads próprio: a espera
+por vaga não bloqueia o event loop, e o cliente síncrono não fica preso a um loop (o worker
+do Edge abre um `asyncio.run` por task). Chamada cancelada (a perdedora de um hedge) ou
+interrompida solta a vaga como "neutro", sem esperar o TTL do lease.
+"""
+import asyncio
+import hashlib
+import itertools
+import os
+import random
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from app.core.metricas import LIMITADOR_ESPERA, PROVEDOR_CHAMADAS
+from app.core.redis import redis_sync
+
+T = TypeVar("T")
+
+LIMITADOR = os.getenv("LIMITADOR", "redis").lower()  # redis | desligado
+LIMITADOR_TENTATIVAS = int(os.getenv("LIMITADOR_TENTATIVAS", "6"))
+BACKOFF_BASE = float(os.getenv("LIMITADOR_BACKOFF_BASE", "1.0"))  # s; dobra a cada tentativa
+BACKOFF_MAX = 30.0
+LEASE_TTL_MS = 120_000  # maior que qualquer chamada; vaga de worker morto expira sozinha
+CORTE_INTERVALO_MS = 1000
+_ESPERA_VAGA = 0.05  # sem vaga de concorrência: pergunta de novo (com jitter)
+_PAUSA_SEM_REDIS = 30.0
+
+_redis_fora_ate = 0.0
+_scripts_por_cliente: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_pool_redis = ThreadPoolExecutor(max_workers=4, thread_name_prefix="limitador")  # idas ao Redis do async
+
+
+@dataclass(frozen=True)
+class Limites:
+    rpm: float
+    concorrencia_inicial: float
+    concorrencia_max: float
+    concorrencia_min: float = 1.0
+
+
+def _limites(provedor: str, rpm: float, inicial: float, maximo: float) -> Limites:
+    prefixo = f"LIMITE_{provedor.upper()}"
+    maximo = float(os.getenv(f"{prefixo}_CONCORRENCIA", maximo))
+    return Limites(
+        rpm=float(os.getenv(f"{prefixo}_RPM", rpm)),
+        concorrencia_inicial=min(inicial, maximo),
+        concorrencia_max=maximo,
+    )
+
+
+# Padrões abaixo das cotas usuais dos projetos; ajuste pela cota real da conta
+LIMITES = {
+    "google_tts": _limites("google_tts", rpm=900, inicial=8, maximo=32),
+    "gemini": _limites("gemini", rpm=300, inicial=4, maximo=16),
+    "edge_tts": _limites("edge_tts", rpm=120, inicial=2, maximo=8),
+}
+
+
+class ProvedorIndisponivel(Exception):
+    """429/5xx persistente: as tentativas acabaram. O job deve falhar (ou degradar), não pular."""
+
+    def __init__(self, provedor: str, erro: Exception):
+        super().__init__(f"{provedor} indisponível após {LIMITADOR_TENTATIVAS} tentativas: {erro}")
+        self.provedor = provedor
+        self.erro = erro
+
+
+def classificar(erro: Exception) -> Optional[str]:
+    """"limite" (429), "erro" (5xx, timeout, conexão) ou None (erro do pedido: não repete)."""
+    codigo = getattr(erro, "code", None)
+    if not isinstance(codigo, int):
+        codigo = getattr(erro, "status", None) or getattr(erro, "status_code", None)
+    if isinstance(codigo, int):
+        if codigo == 429:
+            return "limite"
+        if 500 <= codigo < 600:
+            return "erro"
+        return None
+    if isinstance(erro, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return "erro"
+    return None
+
+
+# KEYS: balde, janela, vagas | ARGV: rpm, limite_inicial, lease, lease_ttl_ms
+# Retorna {1, 0} com a vaga ou {0, ms_para_tentar_de_novo}
+_ADQUIRIR = """
+local t = redis.call('TIME')
+local agora = t[1] * 1000 + math.floor(t[2] / 1000)
+local taxa = tonumber(ARGV[1]) / 60000
+local capacidade = math.max(1, tonumber(ARGV[1]) / 60)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', agora)
+local limite = tonumber(redis.call('HGET', KEYS[2], 'limite') or ARGV[2])
+if redis.call('ZCARD', KEYS[3]) >= math.floor(limite) then
+  return {0, -1}
+end
+
+local balde = redis.call('HMGET', KEYS[1], 'fichas', 'ts')
+local fichas = tonumber(balde[1]) or capacidade
+local ts = tonumber(balde[2]) or agora
+fichas = math.min(capacidade, fichas + (agora - ts) * taxa)
+if fichas < 1 then
+  redis.call('HSET', KEYS[1], 'fichas', fichas, 'ts', agora)
+  return {0, math.ceil((1 - fichas) / taxa)}
+end
+redis.call('HSET', KEYS[1], 'fichas', fichas - 1, 'ts', agora)
+redis.call('PEXPIRE', KEYS[1], 3600000)
+redis.call('ZADD', KEYS[3], agora + tonumber(ARGV[4]), ARGV[3])
+redis.call('PEXPIRE', KEYS[3], tonumber(ARGV[4]))
+return {1, 0}
+"""
+
+# KEYS: balde, janela, vagas | ARGV: lease, resultado, inicial, min, max, corte_intervalo_ms
+# Solta a vaga e ajusta a janela (AIMD); retorna o limite novo (string)
+_LIBERAR = """
+local t = redis.call('TIME')
+local agora = t[1] * 1000 + math.floor(t[2] / 1000)
+redis.call('ZREM', KEYS[3], ARGV[1])
+
+local limite = tonumber(redis.call('HGET', KEYS[2], 'limite') or ARGV[3])
+local resultado = ARGV[2]
+if resultado == 'ok' then
+  limite = math.min(tonumber(ARGV[5]), limite + 1 / limite)
+elseif resultado == 'limite' or resultado == 'erro' then
+  local corte = tonumber(redis.call('HGET', KEYS[2], 'corte') or 0)
+  if agora - corte >= tonumber(ARGV[6]) then
+    limite = math.max(tonumber(ARGV[4]), limite / 2)
+    redis.call('HSET', KEYS[2], 'corte', agora)
+  end
+  if resultado == 'limite' then
+    redis.call('HSET', KEYS[1], 'fichas', 0, 'ts', agora)
+  end
+end
+redis.call('HSET', KEYS[2], 'limite', limite)
+redis.call('PEXPIRE', KEYS[2], 86400000)
+return tostring(limite)
+"""
+
+
+def _chaves(provedor: str, chave_api: Optional[str]) -> list[str]:
+    ident = hashlib.sha256((chave_api or "").encode()).hexdigest()[:12]
+    base = f"limite:{provedor}:{ident}"
+    return [f"{base}:balde", f"{base}:janela", f"{base}:vagas"]
+
+
+def _redis():
+    """Cliente do Redis, ou None se desligado/fora do ar (aí só valem as repetições locais)."""
+    if LIMITADOR == "desligado" or time.monotonic() < _redis_fora_ate:
+        return None
+    return redis_sync()
+
+
+def _scripts(r) -> dict:
+    """`_ADQUIRIR`/`_LIBERAR` registrados no cliente (chamados por EVALSHA)."""
+    scripts = _scripts_por_cliente.get(r)
+    if scripts is None:
+        scripts = _scripts_por_cliente[r] = {
+            "adquirir": r.register_script(_ADQUIRIR),
+            "liberar": r.register_script(_LIBERAR),
+        }
+    return scripts
+
+
+def _redis_falhou(e: Exception) -> None:
+    global _redis_fora_ate
+    print(f"[limitador] Redis indisponível, seguindo sem limite compartilhado: {e}")
+    _redis_fora_ate = time.monotonic() + _PAUSA_SEM_REDIS
+
+
+def _tentar_vaga(provedor: str, chaves: list[str], lease: str) -> float:
+    """Uma ida ao Redis: 0 se pegou a vaga, senão quantos segundos esperar."""
+    r = _redis()
+    if r is None:
+        return 0.0
+    lim = LIMITES[provedor]
+    try:
+        ok, espera_ms = _scripts(r)["adquirir"](chaves, [lim.rpm, lim.concorrencia_inicial, lease, LEASE_TTL_MS])
+    except Exception as e:
+        _redis_falhou(e)
+        return 0.0
+    if ok:
+        return 0.0
+    espera = _ESPERA_VAGA if espera_ms < 0 else espera_ms / 1000
+    return espera * random.uniform(1.0, 1.5)  # jitter: workers não acordam juntos
+
+
+def _liberar(provedor: str, chaves: list[str], lease: str, resultado: str) -> None:
+    r = _redis()
+    if r is None:
+        return
+    lim = LIMITES[provedor]
+    try:
+        _scripts(r)["liberar"](chaves, [lease, resultado, lim.concorrencia_inicial,
+                                        lim.concorrencia_min, lim.concorrencia_max, CORTE_INTERVALO_MS])
+    except Exception as e:
+        _redis_falhou(e)
+
+
+def _backoff(tentativa: int) -> float:
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** tentativa))  # full jitter
+
+
+def _desfecho(provedor: str, chaves: list[str], lease: str, erro: Optional[Exception], tentativa: int) -> Optional[float]:
+    """Solta a vaga e diz se repete (segundos de espera) ou None (sucesso ou erro definitivo)."""
+    motivo = "ok" if erro is None else classificar(erro)
+    _liberar(provedor, chaves, lease, motivo or "neutro")
+    PROVEDOR_CHAMADAS.labels(provedor, motivo or "falha").inc()
+    if erro is None:
+        return None
+    if motivo is None:
+        raise erro
+    if tentativa + 1 >= LIMITADOR_TENTATIVAS:
+        raise ProvedorIndisponivel(provedor, erro) from erro
+    espera = _backoff(tentativa)
+    print(f"[limitador] {provedor}: {erro} ({motivo}); nova tentativa em {espera:.1f}s")
+    return espera
+
+
+def chamar(provedor: str, fn: Callable[..., T], *args, chave_api: Optional[str] = None, **kwargs) -> T:
+    """`fn(*args, **kwargs)` dentro do limite de `provedor`, repetindo 429/5xx."""
+    chaves = _chaves(provedor, chave_api)
+    for tentativa in itertools.count():
+        lease, t0 = uuid.uuid4().hex, time.monotonic()
+        try:
+            while (espera := _tentar_vaga(provedor, chaves, lease)) > 0:
+                time.sleep(espera)
+            LIMITADOR_ESPERA.labels(provedor).observe(time.monotonic() - t0)
+            resultado = fn(*args, **kwargs)
+        except Exception as e:
+            time.sleep(_desfecho(provedor, chaves, lease, e, tentativa))  # levanta na última
+            continue
+        except BaseException:
+            _liberar(provedor, chaves, lease, "neutro")  # interrompida: a vaga não espera o TTL
+            raise
+        _desfecho(provedor, chaves, lease, None, tentativa)
+        return resultado
+
+
+async def chamar_async(provedor: str, fn: Callable[[], Awaitable[T]], chave_api: Optional[str] = None) -> T:
+    """Versão async (Edge TTS): `fn()` cria a corrotina a cada tentativa."""
+    chaves = _chaves(provedor, chave_api)
+    for tentativa in itertools.count():
+        lease, t0 = uuid.uuid4().hex, time.monotonic()
+        try:
+            while True:
+                pedido = _pool_redis.submit(_tentar_vaga, provedor, chaves, lease)
+                if (espera := await asyncio.wrap_future(pedido)) <= 0:
+                    break
+                await asyncio.sleep(espera)
+            LIMITADOR_ESPERA.labels(provedor).observe(time.monotonic() - t0)
+            resultado = await fn()
+        except Exception as e:
+            desfecho = _pool_redis.submit(_desfecho, provedor, chaves, lease, e, tentativa)
+            await asyncio.sleep(await asyncio.wrap_future(desfecho))  # levanta na última
+            continue
+        except BaseException:
+            # Cancelada (ex.: perdedora do hedge): solta depois da ida ao Redis em curso, que pode
+            # ainda estar pegando a vaga, e sem bloquear o loop
+            pedido.add_done_callback(lambda _: _pool_redis.submit(_liberar, provedor, chaves, lease, "neutro"))
+            raise
+        await asyncio.wrap_future(_pool_redis.submit(_desfecho, provedor, chaves, lease, None, tentativa))
+        return resultado
@@ -2,8 +2,13 @@ from fastapi import HTTPException, status
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
-async def assert_do_usuario(db: AsyncIOMotorDatabase, coll: str, _id: ObjectId, usuario_id: ObjectId):
-    doc = await db[coll].find_one({"_id": _id, "usuario_id": usuario_id})
+from app.services.exclusao import VIVO
+
+async def assert_do_usuario(
+    db: AsyncIOMotorDatabase, coll: str, _id: ObjectId, usuario_id: ObjectId,
+    *, detail: str = "Recurso não encontrado", projection: dict | None = None,
+):
+    doc = await db[coll].find_one({"_id": _id, "usuario_id": usuario_id, **VIVO}, projection)
     if not doc:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurso não encontrado")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
     return doc
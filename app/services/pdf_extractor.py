@@ -1,3 +1,6 @@
+import hashlib
+from typing import Iterable, Optional
+
 import fitz  # PyMuPDF
 
 def extrair_texto_pdf(caminho_pdf: str) -> str:
@@ -10,3 +13,23 @@ def extrair_texto_pdf(caminho_pdf: str) -> str:
     except Exception as e:
         print(f"Erro ao extrair texto do PDF: {e}")
         return ""
+
+def extrair_paginas_pdf(caminho_pdf: str, paginas: Optional[Iterable[int]] = None) -> list[dict]:
+    """
+    Extrai o texto página a página (números a partir de 1), com o hash do conteúdo:
+    [{"pagina": 1, "sha256": "...", "texto": "..."}, ...]
+    `paginas` limita a extração a um subconjunto (fora do intervalo é ignorado).
+    """
+    resultado = []
+    with fitz.open(caminho_pdf) as doc:
+        numeros = range(1, doc.page_count + 1) if paginas is None else sorted(set(paginas))
+        for n in numeros:
+            if not 1 <= n <= doc.page_count:
+                continue
+            texto = doc.load_page(n - 1).get_text()
+            resultado.append({
+                "pagina": n,
+                "sha256": hashlib.sha256(texto.encode("utf-8")).hexdigest(),
+                "texto": texto,
+            })
+    return resultado
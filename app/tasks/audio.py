@@ -2,17 +2,40 @@
 from app.tasks.celery_app import celery_app
 
 import os
+import json
+import math
+import time
+import asyncio
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 import requests
 from bson import ObjectId
+from celery import current_task
 from pymongo import MongoClient
 
+from app.core import metricas, rastreio
+from app.core.perfil import perfil_da_task
+from app.core.metricas import medir
 from app.core.paths import audio_path
-from app.services.pdf_extractor import extrair_texto_pdf
+from app.services.pdf_extractor import extrair_paginas_pdf
 from app.services.text_cleaner import limpar_transcricao
 from app.services.ia_service import melhorar_pontuacao_com_gemini
-from app.services.audio_generator import gerar_audio_google  # síncrona
+from app.services.audio_generator import sintetizar_bloco_google, TTS_CONFIG_GOOGLE  # síncrona
+from app.services.audio_generator import sintetizar_bloco, HEDGE_ALTERNATIVA_GOOGLE
+from app.services.audio_generator import gerar_audio_edge, TTS_CONFIG_EDGE  # async (roda com asyncio.run)
+from app.services.blob_store import (
+    guardar_arquivo_sync, guardar_blob_sync,
+    liberar_blob_sync, liberar_blobs_sync,
+)
+from app.services.indice_audio import montar_indice
+from app.services import hedge
+from app.services.cancelamento import JobCancelado, verificar_cancelamento
+from app.services.limitador import ProvedorIndisponivel
+from app.utils.tratar_texto import dividir_texto_em_blocos, limpar_texto_para_tts
+from app.utils.mp3 import duracao_mp3
 
 # ---- ENV ----
 # Usa a mesma MONGO_URI que a API (vinda do .env). Não force outro DB aqui.
@@ -21,35 +44,267 @@ DB_NAME = os.getenv("DB_NAME", "projeto_t_db")
 
 BACKEND_URL = (os.getenv("BACKEND_URL", "http://api:8001/api") or "").rstrip("/")
 DATA_DIR = os.getenv("DATA_DIR", "data")
+# Fala estimada por caractere (s), folgada: fixa o #EXT-X-TARGETDURATION da playlist HLS antes
+# da síntese, e o alvo não pode mudar depois que o player o leu
+HLS_SEGUNDOS_POR_CARACTERE = float(os.getenv("HLS_SEGUNDOS_POR_CARACTERE", "0.1"))
 
 def _log(msg: str):
     print(f"[task.audio] {msg}", flush=True)
 
+def _contar_resultado(resultado: str) -> None:
+    metricas.TASKS.labels(current_task.name if current_task else "desconhecida", resultado).inc()
+
+def _extrair(caminho: Path, paginas=None) -> list[dict]:
+    with medir("extracao"):
+        extraidas = extrair_paginas_pdf(str(caminho), paginas)
+    metricas.PAGINAS_PROCESSADAS.inc(len(extraidas))
+    metricas.BYTES_PDF.inc(caminho.stat().st_size)
+    return extraidas
+
 def _get_db():
     client = MongoClient(MONGO_URI)
     db = client.get_default_database()  # vai funcionar porque tua URI inclui /projeto_t_db
     return client, db
 
-def _post_evento(*, status: str, pdf_id: str, erro: Optional[str] = None) -> None:
+def _post_evento(
+    *, status: str, pdf_id: str, erro: Optional[str] = None,
+    resumo: Optional[dict] = None, progresso: Optional[float] = None,
+) -> None:
+    if status in ("concluido", "erro", "cancelado"):
+        _contar_resultado(status)
     if not BACKEND_URL:
         _log("BACKEND_URL vazio; pulando POST de evento")
         return
     try:
         url = f"{BACKEND_URL}/eventos/pdf-audio"
-        r = requests.post(url, json={"pdf_id": pdf_id, "status": status, "erro": erro}, timeout=10)
-        r.raise_for_status()
+        payload = {"pdf_id": pdf_id, "status": status, "erro": erro, "resumo": resumo, "progresso": progresso}
+        with rastreio.span("post_evento", status=status):
+            # O traceparent volta para a API: o evento entra no mesmo trace do job
+            r = requests.post(url, json=payload, headers=rastreio.injetar(), timeout=10)
+            r.raise_for_status()
     except Exception as e:
         _log(f"Falha ao notificar backend: {e}")
 
+# ---- Pipeline por página ----
+# Cada página é transcrita (limpeza + Gemini) e quebrada em blocos de TTS sem atravessar
+# a fronteira da página. Assim, num re-upload com poucas páginas alteradas, as páginas
+# iguais (mesmo hash) reaproveitam a transcrição da coleção `paginas` (por usuário) e os
+# blocos iguais reaproveitam o MP3 já sintetizado (blob com a mesma `chave`).
+
+def _transcrever_paginas(
+    db, usuario_id, extraidas: list[dict], checar: Optional[Callable[[], None]] = None,
+) -> tuple[list[dict], int]:
+    """
+    Retorna ([{"pagina", "sha256", "transcricao"}], páginas reaproveitadas do cache).
+    Páginas sem texto entram com transcrição vazia e não contam como reaproveitadas.
+    `checar` roda antes de cada chamada à IA (cancelamento).
+    """
+    hashes = list({p["sha256"] for p in extraidas if p["texto"].strip()})
+    cache = {
+        c["sha256"]: c["transcricao"]
+        for c in db.paginas.find(
+            {"usuario_id": usuario_id, "sha256": {"$in": hashes}},
+            {"sha256": 1, "transcricao": 1},
+        )
+    }
+    if cache:
+        # Renova o TTL das páginas que continuam em uso
+        db.paginas.update_many(
+            {"usuario_id": usuario_id, "sha256": {"$in": list(cache)}},
+            {"$set": {"atualizado_em": datetime.utcnow()}},
+        )
+
+    paginas, reusadas = [], 0
+    for p in extraidas:
+        sha, texto_cru = p["sha256"], p["texto"]
+        if not texto_cru.strip():
+            transcricao = ""
+        elif sha in cache:
+            transcricao = cache[sha]
+            reusadas += 1
+        else:
+            if checar:
+                checar()
+            with medir("limpeza"):
+                texto_limpo = limpar_transcricao(texto_cru) or texto_cru
+            try:
+                with medir("gemini"):
+                    transcricao = melhorar_pontuacao_com_gemini(texto_limpo) or texto_limpo
+            except Exception as e:
+                _log(f"Falha na IA de pontuação na página {p['pagina']} (seguindo com texto limpo): {e}")
+                transcricao = texto_limpo
+            # Se a IA falhou (devolveu o texto de entrada), não congela o resultado no cache
+            if transcricao != texto_limpo:
+                db.paginas.update_one(
+                    {"usuario_id": usuario_id, "sha256": sha},
+                    {"$set": {"texto": texto_cru, "transcricao": transcricao, "atualizado_em": datetime.utcnow()}},
+                    upsert=True,
+                )
+            cache[sha] = transcricao
+        paginas.append({"pagina": p["pagina"], "sha256": sha, "transcricao": transcricao})
+    return paginas, reusadas
+
+
+def _dividir_paginas(paginas: list[dict]) -> list[dict]:
+    """Quebra a transcrição de cada página em blocos de TTS: [{"pagina", "texto"}]."""
+    blocos = []
+    for p in paginas:
+        if not p["transcricao"]:
+            continue
+        for bloco in dividir_texto_em_blocos(limpar_texto_para_tts(p["transcricao"])):
+            if bloco:
+                blocos.append({"pagina": p["pagina"], "texto": bloco})
+    return blocos
+
+
+def _alvo_hls(blocos: list[dict]) -> int:
+    """TARGETDURATION (s) da playlist: o maior bloco pela estimativa de fala mais as pausas do SSML."""
+    return max([1] + [
+        math.ceil(len(b["texto"]) * HLS_SEGUNDOS_POR_CARACTERE + 0.5 * b["texto"].count(".") + 0.7 * b["texto"].count("\n"))
+        for b in blocos
+    ])
+
+
+def _chave_bloco(config: dict, texto: str) -> str:
+    """Identifica o áudio de um bloco: mesmo texto + mesma config => mesmo MP3."""
+    bruto = json.dumps(config, sort_keys=True) + "\n" + texto
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+
+def _sintetizar_com_hedge(texto: str, config: dict) -> tuple[bytes, dict]:
+    """Sintetiza o bloco com hedge (ver `hedge`); retorna o MP3 e a config que o gerou."""
+    alternativa = HEDGE_ALTERNATIVA_GOOGLE
+    with medir("tts_bloco"):
+        dados, da_reserva = hedge.executar(
+            "google_tts", len(texto),
+            lambda: sintetizar_bloco_google(texto, voz=config["voz"], pausas=config["pausas"]),
+            (lambda: sintetizar_bloco(texto, alternativa)) if alternativa else None,
+        )
+    return dados, alternativa if da_reserva else config
+
+
+def _sintetizar_blocos(
+    db, blocos: list[dict], config: dict, destino: Path,
+    publicar: Optional[Callable[[dict], None]] = None,
+    checar: Optional[Callable[[], None]] = None,
+) -> tuple[list[dict], int]:
+    """
+    Sintetiza (ou reaproveita) cada bloco e grava a concatenação em `destino`.
+    Cada bloco vira um blob retido pelo PDF; `publicar` é chamado com o registro de cada
+    bloco assim que ele fica pronto (em ordem). Retorna
+    ([{"pagina", "sha256", "bytes", "duracao"}], reaproveitados).
+    Qualquer exceção que escape (`JobCancelado` de `checar` entre blocos, `ProvedorIndisponivel`
+    de cota/5xx que não passou nas repetições, falha no Mongo/disco) solta os blobs já retidos,
+    apaga o arquivo parcial e se propaga; `JobCancelado` leva o número de sínteses desperdiçadas.
+    Bloco em cache cujo arquivo sumiu é sintetizado de novo.
+    """
+    registros, reusados, escrita = [], 0, 0.0
+    try:
+        with open(destino, "wb") as out:
+            for i, bloco in enumerate(blocos):
+                if checar:
+                    checar()
+                chave, usada = _chave_bloco(config, bloco["texto"]), config
+                cache = db.blobs.find_one({"chave": chave}, {"caminho": 1})
+                dados = None
+                if cache:
+                    try:
+                        dados = Path(cache["caminho"]).read_bytes()
+                    except OSError:
+                        pass  # liberado no meio do caminho: sintetiza de novo
+                if dados is not None:
+                    # Retém pelos bytes lidos: se o arquivo sumir depois da leitura, volta a ser gravado
+                    sha, caminho = guardar_blob_sync(db, dados, "mp3", chave=chave)
+                    reusados += 1
+                else:
+                    try:
+                        dados, usada = _sintetizar_com_hedge(bloco["texto"], config)
+                        metricas.BYTES_AUDIO.inc(len(dados))
+                        print(f"[Google TTS] Bloco {i+1}/{len(blocos)} gerado com sucesso.")
+                    except ProvedorIndisponivel:
+                        raise  # 429/5xx persistente: melhor falhar o job que pular o bloco
+                    except Exception as e:
+                        print(f"[Google TTS] Erro no bloco {i+1}: {e}")
+                        continue
+                    if usada is not config:
+                        # Venceu o hedge com outra voz: o cache guarda o bloco sob a config que o gerou
+                        chave = _chave_bloco(usada, bloco["texto"])
+                    sha, caminho = guardar_blob_sync(db, dados, "mp3", chave=chave)
+                t_escrita = time.perf_counter()
+                out.write(dados)
+                escrita += time.perf_counter() - t_escrita
+                registros.append({
+                    "pagina": bloco["pagina"],
+                    "sha256": sha,
+                    "bytes": len(dados),
+                    "duracao": round(duracao_mp3(dados), 3),
+                })
+                if usada is not config:
+                    registros[-1]["tts_config"] = usada  # bloco com a voz alternativa do hedge
+                if publicar:
+                    publicar(registros[-1])
+    except BaseException as e:
+        liberar_blobs_sync(db, [r["sha256"] for r in registros])
+        destino.unlink(missing_ok=True)
+        if isinstance(e, JobCancelado):
+            e.tts_desperdicadas += len(registros) - reusados
+        raise
+    metricas.ETAPA["concatenacao"].observe(escrita)
+    return registros, reusados
+
+
+@contextmanager
+def _retidos(db, shas: list[str]):
+    """Solta `shas` (blobs retidos pelo job) se o bloco falhar antes de o documento apontar para eles."""
+    try:
+        yield shas
+    except BaseException:
+        liberar_blobs_sync(db, shas)
+        raise
+
+
+def _publicador_segmentos(db, pdf_id: str, inicio: float) -> tuple[Callable[[dict], None], dict]:
+    """
+    Publica cada bloco pronto em `pdfs.segmentos` (lidos pela playlist HLS), para o usuário
+    ouvir enquanto a síntese continua. Também mede o tempo até o primeiro áudio.
+    """
+    medidas: dict = {}
+
+    def publicar(registro: dict) -> None:
+        db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$push": {"segmentos": registro}})
+        medidas.setdefault("tempo_primeiro_audio", round(time.monotonic() - inicio, 3))
+
+    return publicar, medidas
+
+
+def _encerrar_cancelado(db, pdf_id: str, e: JobCancelado, update: dict) -> None:
+    """Registra o cancelamento (o que foi desperdiçado) no log, no documento e no evento."""
+    desperdicio = {"tts_desperdicadas": e.tts_desperdicadas}
+    _log(f"CANCELADO pdf_id={pdf_id}: {desperdicio}")
+    try:
+        update.setdefault("$set", {})["cancelamento"] = desperdicio
+        db.pdfs.update_one({"_id": ObjectId(pdf_id)}, update)
+    except Exception:
+        pass
+    _post_evento(status="cancelado", pdf_id=pdf_id, resumo=desperdicio)
+
+
 @celery_app.task(name="app.tasks.audio.gerar_audio_google_task")
-def gerar_audio_google_task(pdf_id: str):
+def gerar_audio_google_task(pdf_id: str, perfilar: bool = False):
+    """Pipeline completo do PDF; `perfilar` (ou a amostragem PERFIL_AMOSTRAGEM) grava um perfil do job."""
+    with perfil_da_task(pdf_id, perfilar):
+        _gerar_audio_google(pdf_id)
+
+
+def _gerar_audio_google(pdf_id: str):
     client, db = _get_db()
+    t0 = time.monotonic()
     _log(f"INICIO pdf_id={pdf_id} DATA_DIR={DATA_DIR} MONGO_URI={MONGO_URI} DB={db.name}")
 
     try:
-        doc = db.pdfs.find_one({"_id": ObjectId(pdf_id)})
+        doc = db.pdfs.find_one({"_id": ObjectId(pdf_id), "excluido_em": None})
         if not doc:
-            _log(f"PDF {pdf_id} não encontrado no Mongo")
+            _log(f"PDF {pdf_id} não encontrado no Mongo (ou excluído)")
             _post_evento(status="erro", pdf_id=pdf_id, erro="PDF não encontrado")
             return
 
@@ -70,57 +325,112 @@ def gerar_audio_google_task(pdf_id: str):
             _post_evento(status="erro", pdf_id=pdf_id, erro="Arquivo PDF inexistente no worker")
             return
 
-        db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {"status": "processando"}})
+        db.pdfs.update_one(
+            {"_id": ObjectId(pdf_id)},
+            {"$set": {"status": "processando", "segmentos": [], "job_id": gerar_audio_google_task.request.id},
+             "$unset": {"hls_target": ""}},
+        )
 
-        texto = doc.get("transcricao")
-        if not texto:
-            _log("Extraindo texto do PDF...")
+        def checar() -> None:
+            verificar_cancelamento(pdf_id)
+
+        if doc.get("transcricao") and not doc.get("paginas"):
+            # Documento antigo, transcrito antes do pipeline por página: trata como uma unidade só
+            _log("Transcrição já existe. Pulando extração.")
+            paginas = [{"pagina": 1, "sha256": None, "transcricao": doc["transcricao"]}]
+            paginas_reusadas = 1
+        else:
+            _log("Extraindo texto do PDF por página...")
             try:
-                texto_cru = extrair_texto_pdf(str(pdf_path_fs))
+                extraidas = _extrair(pdf_path_fs)
             except Exception as e:
                 _log(f"Falha ao extrair texto: {e}")
                 db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {"status": "erro"}})
                 _post_evento(status="erro", pdf_id=pdf_id, erro=f"Falha ao extrair texto: {e}")
                 return
 
-            if not texto_cru or not texto_cru.strip():
+            if not any(p["texto"].strip() for p in extraidas):
                 _log("Texto extraído vazio")
                 db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {"status": "erro"}})
                 _post_evento(status="erro", pdf_id=pdf_id, erro="Texto vazio após extração")
                 return
 
-            _log("Limpando transcrição...")
-            texto_limpo = limpar_transcricao(texto_cru) or texto_cru
-
-            try:
-                _log("Melhorando pontuação com IA...")
-                texto = melhorar_pontuacao_com_gemini(texto_limpo) or texto_limpo
-            except Exception as e:
-                _log(f"Falha na IA de pontuação (seguindo com texto limpo): {e}")
-                texto = texto_limpo
-
-            db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {"transcricao": texto}})
-        else:
-            _log("Transcrição já existe. Pulando extração.")
+            checar()
+            _log(f"Transcrevendo {len(extraidas)} páginas (limpeza + IA, com cache por página)...")
+            paginas, paginas_reusadas = _transcrever_paginas(db, doc["usuario_id"], extraidas, checar)
+            texto = "\n\n".join(p["transcricao"] for p in paginas if p["transcricao"])
+            db.pdfs.update_one(
+                {"_id": ObjectId(pdf_id)},
+                {"$set": {
+                    "transcricao": texto,
+                    "paginas": [{"pagina": p["pagina"], "sha256": p["sha256"]} for p in paginas],
+                }},
+            )
 
         dest_audio = audio_path(user_id, aula_id, pdf_id, ext="mp3")
         dest_audio.parent.mkdir(parents=True, exist_ok=True)
-        _log(f"Gerando áudio em: {dest_audio}")
+        blocos = _dividir_paginas(paginas)
+        _log(f"Gerando áudio ({len(blocos)} blocos) em: {dest_audio}")
+        # Antes do primeiro segmento: a playlist só é servida com o alvo já fixado
+        db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {"hls_target": _alvo_hls(blocos)}})
+        publicar, medidas = _publicador_segmentos(db, pdf_id, t0)
         try:
-            gerar_audio_google(texto, str(dest_audio))
+            registros, blocos_reusados = _sintetizar_blocos(db, blocos, TTS_CONFIG_GOOGLE, dest_audio, publicar, checar)
+        except JobCancelado:
+            raise
         except Exception as e:
             _log(f"Falha ao gerar áudio: {e}")
             db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {"status": "erro"}})
             _post_evento(status="erro", pdf_id=pdf_id, erro=f"Falha ao gerar áudio: {e}")
             return
 
-        db.pdfs.update_one(
-            {"_id": ObjectId(pdf_id)},
-            {"$set": {"audio_path": str(dest_audio), "status": "concluido"}}
-        )
-        _post_evento(status="concluido", pdf_id=pdf_id)
+        com_texto = sum(1 for p in paginas if p["transcricao"])
+        resumo = {
+            "paginas": len(paginas),
+            "paginas_reusadas": paginas_reusadas,
+            "reuso_paginas": round(paginas_reusadas / com_texto, 3) if com_texto else 0.0,
+            "blocos": len(blocos),
+            "blocos_reusados": blocos_reusados,
+            "tempo_primeiro_audio": medidas.get("tempo_primeiro_audio"),
+            "tempo_total": round(time.monotonic() - t0, 3),
+        }
+
+        # Finaliza: os segmentos viram o MP3 único, movido para o store endereçado por conteúdo
+        with _retidos(db, [r["sha256"] for r in registros]) as retidos:
+            with medir("armazenamento"):
+                audio_sha, caminho_audio = guardar_arquivo_sync(db, dest_audio, "mp3")
+            retidos.append(audio_sha)
+            res = db.pdfs.update_one(
+                {"_id": ObjectId(pdf_id), "excluido_em": None},
+                {"$unset": {"segmentos": ""}, "$set": {
+                    "audio_path": str(caminho_audio),
+                    "audio_sha256": audio_sha,
+                    "tts_config": TTS_CONFIG_GOOGLE,
+                    # Algum bloco saiu com a voz alternativa: o áudio não é uma síntese pura da
+                    # config e fica fora do reaproveitamento de uploads idênticos
+                    "hedge_alternativo": any("tts_config" in r for r in registros),
+                    "blocos": registros,
+                    "indice_audio": montar_indice(registros, audio_sha),
+                    "resumo": resumo,
+                    "status": "concluido",
+                }}
+            )
+            if res.matched_count == 0:
+                # Excluído no finzinho: ninguém vai apontar para o que acabou de ser retido
+                cancelado = JobCancelado(pdf_id)
+                cancelado.tts_desperdicadas = len(registros) - blocos_reusados
+                raise cancelado
+        # Só agora solta o áudio/blocos anteriores: os que se repetem já foram retidos acima
+        if doc.get("audio_sha256"):
+            liberar_blob_sync(db, doc["audio_sha256"])
+        liberar_blobs_sync(db, [b["sha256"] for b in doc.get("blocos") or []])
+        _log(f"Resumo: {resumo}")
+
+        _post_evento(status="concluido", pdf_id=pdf_id, resumo=resumo)
         _log("SUCESSO: áudio gerado e documento atualizado")
 
+    except JobCancelado as e:
+        _encerrar_cancelado(db, pdf_id, e, {"$unset": {"segmentos": ""}, "$set": {"status": "cancelado"}})
     except Exception as e:
         _log(f"ERRO geral na task: {e}")
         try:
@@ -130,3 +440,163 @@ def gerar_audio_google_task(pdf_id: str):
         _post_evento(status="erro", pdf_id=pdf_id, erro=str(e))
     finally:
         client.close()
+
+
+@celery_app.task(name="app.tasks.audio.gerar_audio_intervalo_task")
+def gerar_audio_intervalo_task(pdf_id: str, inicio: int, fim: int):
+    """
+    Gera o áudio só das páginas [inicio, fim]. Extrai, transcreve e sintetiza apenas essas
+    páginas; blocos já produzidos (pelo PDF inteiro ou por outro intervalo) vêm do cache.
+    """
+    client, db = _get_db()
+    chave = f"{inicio}-{fim}"
+    campo = f"intervalos.{chave}"
+    _log(f"INICIO intervalo pdf_id={pdf_id} paginas={chave}")
+
+    try:
+        doc = db.pdfs.find_one({"_id": ObjectId(pdf_id), "excluido_em": None})
+        if not doc:
+            _log(f"PDF {pdf_id} não encontrado no Mongo (ou excluído)")
+            return
+
+        pdf_path_fs = Path(doc.get("caminho") or "")
+        if not doc.get("caminho") or not pdf_path_fs.exists():
+            _log(f"PDF não existe no worker: {pdf_path_fs}")
+            db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {f"{campo}.status": "erro"}})
+            _contar_resultado("erro")
+            return
+
+        def checar() -> None:
+            verificar_cancelamento(pdf_id)
+
+        extraidas = _extrair(pdf_path_fs, range(inicio, fim + 1))
+        paginas, paginas_reusadas = _transcrever_paginas(db, doc["usuario_id"], extraidas, checar)
+        blocos = _dividir_paginas(paginas)
+        if not blocos:
+            _log(f"Intervalo {chave} sem texto")
+            db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {f"{campo}.status": "erro"}})
+            _contar_resultado("erro")
+            return
+
+        dest_audio = audio_path(str(doc["usuario_id"]), doc["aula_id"], f"{pdf_id}_p{chave}", ext="mp3")
+        registros, blocos_reusados = _sintetizar_blocos(db, blocos, TTS_CONFIG_GOOGLE, dest_audio, checar=checar)
+        resumo = {
+            "paginas": len(paginas),
+            "paginas_reusadas": paginas_reusadas,
+            "blocos": len(blocos),
+            "blocos_reusados": blocos_reusados,
+        }
+        with _retidos(db, [r["sha256"] for r in registros]) as retidos:
+            with medir("armazenamento"):
+                audio_sha, caminho_audio = guardar_arquivo_sync(db, dest_audio, "mp3")
+            retidos.append(audio_sha)
+            res = db.pdfs.update_one(
+                {"_id": ObjectId(pdf_id), "excluido_em": None},
+                {"$set": {campo: {
+                    "inicio": inicio,
+                    "fim": fim,
+                    "status": "concluido",
+                    "audio_path": str(caminho_audio),
+                    "audio_sha256": audio_sha,
+                    "blocos": registros,
+                    "resumo": resumo,
+                }}},
+            )
+        # Solta o que ficou sem dono: o resultado anterior do intervalo, ou tudo se o PDF sumiu
+        anterior = doc.get("intervalos", {}).get(chave) or {}
+        if res.matched_count == 0:
+            anterior = {"audio_sha256": audio_sha, "blocos": registros}
+        if anterior.get("audio_sha256"):
+            liberar_blob_sync(db, anterior["audio_sha256"])
+        liberar_blobs_sync(db, [b["sha256"] for b in anterior.get("blocos") or []])
+        _log(f"SUCESSO intervalo {chave}: {resumo}")
+        _contar_resultado("concluido")
+
+    except JobCancelado as e:
+        _log(f"CANCELADO intervalo {chave}: tts_desperdicadas={e.tts_desperdicadas}")
+        _contar_resultado("cancelado")
+        try:
+            db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {f"{campo}.status": "cancelado"}})
+        except Exception:
+            pass
+    except Exception as e:
+        _log(f"ERRO no intervalo {chave}: {e}")
+        _contar_resultado("erro")
+        try:
+            db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {f"{campo}.status": "erro"}})
+        except Exception:
+            pass
+    finally:
+        client.close()
+
+
+@celery_app.task(name="app.tasks.audio.gerar_audio_edge_task")
+def gerar_audio_edge_task(pdf_id: str):
+    """
+    (Manual) Gera o áudio com Edge TTS a partir da transcrição já existente.
+    Roda no worker para não prender a requisição nem o event loop da API; o progresso
+    sai pelos mesmos eventos de status (com `progresso` de 0 a 1).
+    """
+    client, db = _get_db()
+    _log(f"INICIO edge pdf_id={pdf_id}")
+
+    try:
+        doc = db.pdfs.find_one({"_id": ObjectId(pdf_id), "excluido_em": None})
+        if not doc or not doc.get("transcricao"):
+            _log(f"PDF {pdf_id} inexistente ou sem transcrição")
+            _post_evento(status="erro", pdf_id=pdf_id, erro="PDF sem transcrição")
+            return
+
+        dest_audio = audio_path(str(doc["usuario_id"]), doc["aula_id"], pdf_id, ext="mp3")
+        dest_audio.parent.mkdir(parents=True, exist_ok=True)
+
+        sintetizados = 0
+
+        def _progresso(feitos: int, total: int) -> None:
+            nonlocal sintetizados
+            sintetizados = feitos
+            verificar_cancelamento(pdf_id)  # entre blocos: interrompe o gerar_audio_edge
+            _post_evento(status="processando", pdf_id=pdf_id, progresso=round(feitos / total, 3))
+
+        try:
+            verificar_cancelamento(pdf_id)
+            asyncio.run(gerar_audio_edge(doc["transcricao"], str(dest_audio), voz=TTS_CONFIG_EDGE["voz"], progresso=_progresso))
+        except JobCancelado as e:
+            dest_audio.unlink(missing_ok=True)
+            e.tts_desperdicadas = sintetizados
+            raise
+
+        with _retidos(db, []) as retidos:
+            with medir("armazenamento"):
+                audio_sha, caminho_audio = guardar_arquivo_sync(db, dest_audio, "mp3")
+            retidos.append(audio_sha)
+            res = db.pdfs.update_one(
+                {"_id": ObjectId(pdf_id), "excluido_em": None},
+                {"$set": {
+                    "audio_path": str(caminho_audio),
+                    "audio_sha256": audio_sha,
+                    "tts_config": TTS_CONFIG_EDGE,
+                    "status": "concluido",
+                }},
+            )
+            if res.matched_count == 0:
+                cancelado = JobCancelado(pdf_id)
+                cancelado.tts_desperdicadas = sintetizados
+                raise cancelado
+        if doc.get("audio_sha256"):
+            liberar_blob_sync(db, doc["audio_sha256"])
+
+        _post_evento(status="concluido", pdf_id=pdf_id)
+        _log("SUCESSO edge: áudio gerado e documento atualizado")
+
+    except JobCancelado as e:
+        _encerrar_cancelado(db, pdf_id, e, {"$set": {"status": "cancelado"}})
+    except Exception as e:
+        _log(f"ERRO na task edge: {e}")
+        try:
+            db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {"status": "erro"}})
+        except Exception:
+            pass
+        _post_evento(status="erro", pdf_id=pdf_id, erro=f"Erro ao gerar áudio: {e}")
+    finally:
+        client.close()
@@ -1,6 +1,10 @@
 import os
+import time
 from dotenv import load_dotenv
 from celery import Celery
+from celery.signals import before_task_publish, task_prerun, task_postrun, worker_init
+
+from app.core import metricas, monitor, rastreio
 
 load_dotenv() 
 
@@ -20,6 +24,53 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Passada periódica da purga de exclusões (worker com -B ou um `celery beat` à parte)
+    beat_schedule={
+        "purgar-exclusoes": {
+            "task": "app.tasks.limpeza.purgar_exclusoes_task",
+            "schedule": float(os.getenv("PURGA_INTERVALO", "600")),
+        },
+    },
 )
 
+
+# ---- Métricas e rastreamento: espera na fila, resultado, span da task, exportador ----
+
+def _cabecalho(task, nome: str):
+    # Headers extras da mensagem viram atributos do request (ou ficam em `headers`)
+    return task.request.get(nome) or (task.request.headers or {}).get(nome)
+
+
+@before_task_publish.connect
+def _marcar_enfileiramento(headers=None, **_):
+    if headers is not None:
+        headers["enfileirado_em"] = time.time()
+        rastreio.injetar(headers)  # traceparent de quem enfileirou (ex.: upload_pdf)
+
+
+@task_prerun.connect
+def _iniciar_task(task_id=None, task=None, **_):
+    enfileirado_em = _cabecalho(task, "enfileirado_em")
+    if enfileirado_em:
+        metricas.FILA_ESPERA.labels(task.name).observe(max(0.0, time.time() - enfileirado_em))
+    rastreio.abrir_span_task(task_id, task.name, {"traceparent": _cabecalho(task, "traceparent") or ""})
+
+
+@task_postrun.connect
+def _encerrar_task(task_id=None, task=None, state=None, **_):
+    # Resultados do pipeline (concluido/erro/cancelado) são contados pela própria task;
+    # aqui só o que escapou dela
+    if state and state != "SUCCESS":
+        metricas.TASKS.labels(task.name, state.lower()).inc()
+    rastreio.fechar_span_task(task_id, state)
+
+
+@worker_init.connect
+def _iniciar_worker(**_):
+    rastreio.configurar("transcrissor-worker")
+    metricas.iniciar_exportador()
+    monitor.instalar_ouvinte_mongo()  # comandos lentos do pymongo no log e nas métricas
+
+
 from app.tasks import audio  # Isso importa e registra a task corretamente
+from app.tasks import limpeza
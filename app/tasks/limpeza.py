@@ -0,0 +1,136 @@
+# app/tasks/limpeza.py
+from app.tasks.celery_app import celery_app
+
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+from app.core.paths import DATA_DIR
+from app.services.blob_store import liberar_blobs_sync
+from app.services.exclusao import shas_do_pdf
+from app.tasks import audio  # import circular com celery_app: só usar dentro das funções
+
+# PDFs removidos por passada do loop (cada lote = poucas operações em massa, não uma por PDF)
+PURGA_LOTE = int(os.getenv("PURGA_LOTE", "500"))
+# Lote reivindicado por um purgador que morreu volta a ficar livre depois disso
+PURGA_TIMEOUT = timedelta(minutes=int(os.getenv("PURGA_TIMEOUT_MIN", "30")))
+
+_PROJECAO = {
+    "usuario_id": 1, "aula_id": 1, "job_id": 1, "caminho": 1, "audio_path": 1,
+    "sha256": 1, "audio_sha256": 1, "blocos.sha256": 1, "intervalos": 1,
+}
+
+
+def _log(msg: str):
+    print(f"[task.limpeza] {msg}", flush=True)
+
+
+def _get_db():
+    return audio._get_db()
+
+
+def _propagar(db) -> None:
+    """Completa a cascata caso a API tenha caído entre marcar o pai e os filhos."""
+    for m in db.materias.find({"excluido_em": {"$exists": True}}, {"_id": 1, "excluido_em": 1}):
+        db.aulas.update_many(
+            {"materia_id": str(m["_id"]), "excluido_em": None}, {"$set": {"excluido_em": m["excluido_em"]}}
+        )
+    for a in db.aulas.find({"excluido_em": {"$exists": True}}, {"_id": 1, "usuario_id": 1, "excluido_em": 1}):
+        db.pdfs.update_many(
+            {"usuario_id": a["usuario_id"], "aula_id": str(a["_id"]), "excluido_em": None},
+            {"$set": {"excluido_em": a["excluido_em"]}},
+        )
+
+
+def _reivindicar_lote(db, token: str) -> list[dict]:
+    """
+    Reserva até PURGA_LOTE PDFs marcados para este purgador. Dois purgadores simultâneos
+    nunca pegam o mesmo documento, então nenhum blob é liberado duas vezes.
+    """
+    agora = datetime.utcnow()
+    livres = {
+        "excluido_em": {"$exists": True},
+        "$or": [{"purga": None}, {"purga.em": {"$lt": agora - PURGA_TIMEOUT}}],
+    }
+    ids = [d["_id"] for d in db.pdfs.find(livres, {"_id": 1}).limit(PURGA_LOTE)]
+    if not ids:
+        return []
+    db.pdfs.update_many({"_id": {"$in": ids}, **livres}, {"$set": {"purga": {"token": token, "em": agora}}})
+    return list(db.pdfs.find({"purga.token": token}, _PROJECAO))
+
+
+def _revogar_jobs(job_ids: list[str]) -> None:
+    """Tira da fila os jobs que ainda não começaram (os em execução param sozinhos ao não achar o PDF)."""
+    if not job_ids:
+        return
+    try:
+        celery_app.control.revoke(job_ids)
+    except Exception as e:
+        _log(f"Falha ao revogar jobs {job_ids}: {e}")
+
+
+def _remover_legado(pdf: dict) -> None:
+    """Documentos anteriores ao store por hash apontam para arquivos próprios."""
+    if not pdf.get("sha256") and pdf.get("caminho"):
+        Path(pdf["caminho"]).unlink(missing_ok=True)
+    if not pdf.get("audio_sha256") and pdf.get("audio_path"):
+        Path(pdf["audio_path"]).unlink(missing_ok=True)
+
+
+@celery_app.task(name="app.tasks.limpeza.purgar_exclusoes_task")
+def purgar_exclusoes_task():
+    """
+    Remove de fato o que a API marcou com `excluido_em`: PDFs em lotes (documentos num
+    delete_many, depois os blobs liberados com update_many), depois as pastas inteiras das aulas
+    (data/pdfs/<usuario>/<aula> e data/audios/<usuario>/<aula>) e por fim aulas e matérias.
+    Idempotente: roda a cada exclusão e periodicamente (beat) para pegar sobras.
+    """
+    client, db = _get_db()
+    token = uuid4().hex
+    totais = {"pdfs": 0, "blobs_apagados": 0, "aulas": 0, "materias": 0}
+    try:
+        _propagar(db)
+
+        while lote := _reivindicar_lote(db, token):
+            _revogar_jobs([p["job_id"] for p in lote if p.get("job_id")])
+            shas = []
+            for pdf in lote:
+                shas += shas_do_pdf(pdf)
+                try:
+                    _remover_legado(pdf)
+                except OSError as e:
+                    _log(f"Falha ao remover arquivo legado de {pdf['_id']}: {e}")
+            ids = [p["_id"] for p in lote]
+            db.sessoes_escuta.delete_many({"pdf_id": {"$in": [str(i) for i in ids]}})
+            # Apaga antes de liberar: se o purgador morrer no meio, sobra referência (o arquivo
+            # fica), mas quem reivindicar o lote depois nunca libera os mesmos blobs de novo
+            apagados = db.pdfs.delete_many({"_id": {"$in": ids}, "purga.token": token}).deleted_count
+            totais["pdfs"] += apagados
+            if apagados == len(lote):
+                totais["blobs_apagados"] += liberar_blobs_sync(db, shas)
+            else:
+                # Parte do lote expirou e foi reivindicada por outro purgador, que libera o que apagar
+                _log(f"Lote {token} reivindicado por outro purgador: blobs de {apagados} PDFs não liberados")
+
+        aulas = list(db.aulas.find({"excluido_em": {"$exists": True}}, {"_id": 1, "usuario_id": 1}))
+        for a in aulas:
+            for raiz in ("pdfs", "audios"):
+                shutil.rmtree(DATA_DIR / raiz / str(a["usuario_id"]) / str(a["_id"]), ignore_errors=True)
+        if aulas:
+            totais["aulas"] = db.aulas.delete_many({"_id": {"$in": [a["_id"] for a in aulas]}}).deleted_count
+
+        totais["materias"] = db.materias.delete_many({"excluido_em": {"$exists": True}}).deleted_count
+        _log(f"Purga concluída: {totais}")
+        return totais
+    finally:
+        client.close()
+
+
+def agendar_purga() -> None:
+    """Enfileira uma purga; se o broker estiver fora, a passada periódica resolve depois."""
+    try:
+        purgar_exclusoes_task.delay()
+    except Exception as e:
+        _log(f"Não foi possível enfileirar a purga: {e}")
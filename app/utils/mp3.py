@@ -0,0 +1,49 @@
+# Leitura mínima de cabeçalhos MPEG Layer III, sem decodificar o áudio (sem ffmpeg/pydub).
+
+# Bitrates (kbps) por índice: MPEG-1 e MPEG-2/2.5, Layer III
+_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+# Taxas de amostragem por versão (bits 19-20 do cabeçalho): 2.5, reservado, 2, 1
+_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+
+def _pular_id3(dados: bytes) -> int:
+    """Retorna o offset logo após uma tag ID3v2 (0 se não houver)."""
+    if len(dados) >= 10 and dados[:3] == b"ID3":
+        tamanho = (dados[6] << 21) | (dados[7] << 14) | (dados[8] << 7) | dados[9]
+        return 10 + tamanho + (10 if dados[5] & 0x10 else 0)
+    return 0
+
+
+def duracao_mp3(dados: bytes) -> float:
+    """
+    Duração em segundos de um MP3 (Layer III), somando os frames.
+    Bytes que não formam um cabeçalho válido são pulados até o próximo sync.
+    """
+    i = _pular_id3(dados)
+    n = len(dados)
+    segundos = 0.0
+    while i + 4 <= n:
+        b1, b2 = dados[i + 1], dados[i + 2]
+        versao = (b1 >> 3) & 0x03
+        layer = (b1 >> 1) & 0x03
+        br_idx = (b2 >> 4) & 0x0F
+        sr_idx = (b2 >> 2) & 0x03
+        if (
+            dados[i] != 0xFF or (b1 & 0xE0) != 0xE0
+            or versao == 1 or layer != 1  # 01 = Layer III
+            or br_idx in (0, 15) or sr_idx == 3
+        ):
+            i += 1
+            continue
+        taxa = _SAMPLE_RATES[versao][sr_idx]
+        padding = (b2 >> 1) & 0x01
+        if versao == 3:
+            bitrate = _BITRATES_V1[br_idx] * 1000
+            tamanho, amostras = 144 * bitrate // taxa + padding, 1152
+        else:
+            bitrate = _BITRATES_V2[br_idx] * 1000
+            tamanho, amostras = 72 * bitrate // taxa + padding, 576
+        segundos += amostras / taxa
+        i += tamanho
+    return segundos
@@ -0,0 +1,179 @@
+# benchmarks/bench_cpu.py
+"""
+Etapas de CPU do pipeline (sem rede) sobre PDFs sintéticos gerados com PyMuPDF:
+`extrair_texto_pdf`, `limpar_transcricao`, `limpar_texto_para_tts` e
+`dividir_texto_em_blocos`. Para cada tamanho mede o melhor tempo e a mediana de
+`--repeticoes`, a vazão (páginas/s e MB/s de texto de entrada) e o pico de memória Python
+(tracemalloc, numa rodada à parte; as alocações internas do MuPDF ficam de fora).
+
+    python benchmarks/bench_cpu.py --paginas 10 100 1000
+    python benchmarks/bench_cpu.py --comparar benchmarks/resultados/cpu-<commit>.json
+
+O resultado vai para `benchmarks/resultados/cpu-<commit>.json` (ou `--saida`); com
+`--comparar` imprime a razão novo/antigo por etapa e tamanho e marca o que piorou mais
+que `--tolerancia`. Os prints de debug das funções são descartados, mas o custo deles
+conta (é o que o worker paga).
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+from app.services.pdf_extractor import extrair_texto_pdf
+from app.services.text_cleaner import limpar_transcricao
+from app.utils.tratar_texto import dividir_texto_em_blocos, limpar_texto_para_tts
+
+RESULTADOS = Path(__file__).parent / "resultados"
+
+# Texto de aula com o que o pipeline limpa: cabeçalhos, bullets, negrito, quebras no meio da frase
+_PARAGRAFOS = [
+    "## Tópico {n}: Revisão de conceitos",
+    "• A **derivada** mede a taxa de variação instantânea de uma função em um ponto;",
+    "quando o limite existe, dizemos que a função é diferenciável naquele ponto.",
+    "- Exemplo: para f(x) = x², a derivada é f'(x) = 2x, obtida pela regra da potência.",
+    "Observe que a reta tangente ao gráfico tem inclinação igual ao valor da derivada,",
+    "o que permite aproximar a função localmente por uma função afim (linearização).",
+    "* Exercício {n}: calcule a derivada de g(x) = 3x³ − 5x + 7 e interprete o resultado.",
+    "",
+    "Na próxima aula veremos a regra da cadeia e aplicações em problemas de otimização.",
+]
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return "desconhecido"
+
+
+def gerar_pdf(paginas: int, destino: Path) -> Path:
+    """PDF de `paginas` páginas A4 com ~40 linhas de texto cada (determinístico)."""
+    if destino.exists():
+        return destino
+    doc = fitz.open()
+    for n in range(1, paginas + 1):
+        pagina = doc.new_page()
+        texto = "\n".join(l.format(n=n) for l in _PARAGRAFOS * 4)
+        pagina.insert_textbox(fitz.Rect(50, 50, 545, 800), texto, fontsize=10)
+    doc.save(destino)
+    doc.close()
+    return destino
+
+
+def _medir(fn, arg, repeticoes: int) -> tuple[list[float], object]:
+    tempos, saida = [], None
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            saida = fn(arg)
+            tempos.append(time.perf_counter() - t0)
+    return tempos, saida
+
+
+def _pico_mb(fn, arg) -> float:
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        tracemalloc.start()
+        try:
+            fn(arg)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return round(pico / 2**20, 3)
+
+
+def rodar(paginas: int, pasta: Path, repeticoes: int) -> list[dict]:
+    pdf = gerar_pdf(paginas, pasta / f"sintetico_{paginas}.pdf")
+    texto = extrair_texto_pdf(str(pdf))
+    # Entrada do dividir com quebras de linha, como sai da IA (a limpeza junta as linhas)
+    texto_tts = limpar_texto_para_tts(texto)
+    etapas = [
+        ("extrair_texto_pdf", extrair_texto_pdf, str(pdf), pdf.stat().st_size),
+        ("limpar_transcricao", limpar_transcricao, texto, len(texto.encode())),
+        ("limpar_texto_para_tts", limpar_texto_para_tts, texto, len(texto.encode())),
+        ("dividir_texto_em_blocos", dividir_texto_em_blocos, texto_tts, len(texto_tts.encode())),
+    ]
+    resultados = []
+    for nome, fn, arg, entrada in etapas:
+        tempos, saida = _medir(fn, arg, repeticoes)
+        melhor = min(tempos)
+        resultados.append({
+            "etapa": nome,
+            "paginas": paginas,
+            "entrada_bytes": entrada,
+            "melhor_ms": round(melhor * 1000, 3),
+            "mediana_ms": round(statistics.median(tempos) * 1000, 3),
+            "paginas_por_s": round(paginas / melhor, 1) if melhor else None,
+            "mb_por_s": round(entrada / 2**20 / melhor, 2) if melhor else None,
+            "pico_mb": _pico_mb(fn, arg),
+            "blocos": len(saida) if nome == "dividir_texto_em_blocos" else None,
+        })
+        print(f"{nome:>24} {paginas:>5} pág  {resultados[-1]['melhor_ms']:>10.2f} ms  "
+              f"{resultados[-1]['pico_mb']:>8.2f} MB", file=sys.stderr)
+    return resultados
+
+
+def comparar(novo: dict, antigo: dict, tolerancia: float) -> list[dict]:
+    base = {(r["etapa"], r["paginas"]): r for r in antigo["resultados"]}
+    linhas = []
+    for r in novo["resultados"]:
+        a = base.get((r["etapa"], r["paginas"]))
+        if not a:
+            continue
+        razao = r["melhor_ms"] / a["melhor_ms"] if a["melhor_ms"] else None
+        linhas.append({
+            "etapa": r["etapa"], "paginas": r["paginas"],
+            "antigo_ms": a["melhor_ms"], "novo_ms": r["melhor_ms"],
+            "razao_tempo": round(razao, 3) if razao else None,
+            "razao_memoria": round(r["pico_mb"] / a["pico_mb"], 3) if a["pico_mb"] else None,
+            "regressao": bool(razao and razao > 1 + tolerancia),
+        })
+    return linhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--pasta-pdfs", type=Path, help="reaproveita os PDFs gerados entre execuções")
+    parser.add_argument("--saida", type=Path)
+    parser.add_argument("--comparar", type=Path, help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="piora relativa aceita (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    pasta = args.pasta_pdfs or Path(tempfile.mkdtemp(prefix="bench-cpu-"))
+    pasta.mkdir(parents=True, exist_ok=True)
+    commit = _commit()
+    relatorio = {
+        "commit": commit,
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "repeticoes": args.repeticoes,
+        "resultados": [r for n in args.paginas for r in rodar(n, pasta, args.repeticoes)],
+    }
+    saida = args.saida or RESULTADOS / f"cpu-{commit}.json"
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados em {saida}", file=sys.stderr)
+
+    if args.comparar:
+        linhas = comparar(relatorio, json.loads(args.comparar.read_text(encoding="utf-8")), args.tolerancia)
+        print(json.dumps(linhas, indent=2))
+        sys.exit(1 if any(l["regressao"] for l in linhas) else 0)
+    print(json.dumps(relatorio["resultados"], indent=2))
@@ -0,0 +1,79 @@
+# benchmarks/bench_json.py
+"""
+Serialização de listagens: caminho antigo (um PdfInDB por documento, revalidação do
+response_model e json.dumps do FastAPI) contra o caminho rápido de app.core.respostas
+(dicts no formato do modelo + orjson). Roda em processo, sem Mongo:
+
+    python benchmarks/bench_json.py --linhas 1000 10000 --repeticoes 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from app.core.respostas import RespostaJSON
+from app.models.pdf import PdfInDB
+
+CAMPOS = tuple(PdfInDB.model_fields)
+
+
+def _docs(n: int) -> list[dict]:
+    usuario, agora = ObjectId(), datetime.utcnow()
+    return [{
+        "_id": ObjectId(), "usuario_id": usuario, "aula_id": str(ObjectId()),
+        "filename": f"aula_{i}.pdf", "descricao": None, "caminho": f"/data/blobs/aa/bb/{i:064x}.pdf",
+        "transcricao": "texto " * 50, "audio_path": None, "audio_sha256": f"{i:064x}",
+        "data_upload": agora - timedelta(minutes=i),
+    } for i in range(n)]
+
+
+def antigo(docs: list[dict]) -> bytes:
+    modelos = []
+    for d in docs:
+        d = dict(d)
+        d["id"] = str(d.pop("_id"))
+        modelos.append(PdfInDB(**d))
+    adaptador = TypeAdapter(List[PdfInDB])  # o FastAPI valida de novo contra o response_model
+    conteudo = adaptador.dump_python(adaptador.validate_python(modelos), mode="json")
+    return json.dumps(conteudo, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def rapido(docs: list[dict]) -> bytes:
+    linhas = []
+    for d in docs:
+        linha = {c: d.get(c) for c in CAMPOS}
+        linha["id"] = str(d["_id"])
+        linhas.append(linha)
+    return RespostaJSON(linhas).body
+
+
+def _medir(fn, docs, repeticoes: int) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn(docs)
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args()
+
+    resultados = []
+    for n in args.linhas:
+        docs = _docs(n)
+        assert json.loads(antigo(docs)) == json.loads(rapido(docs))
+        a, r = _medir(antigo, docs, args.repeticoes), _medir(rapido, docs, args.repeticoes)
+        resultados.append({"linhas": n, "antigo_ms": round(a, 2), "rapido_ms": round(r, 2), "ganho": round(a / r, 1)})
+    print(json.dumps(resultados, indent=2))
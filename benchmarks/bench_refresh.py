@@ -0,0 +1,71 @@
+# benchmarks/bench_refresh.py
+"""
+Latência do `POST /auth/refresh` (p50/p95/p99) contra um servidor rodando.
+
+Cada cliente faz login e encadeia `--n` refreshes (cada um usa o cookie devolvido pelo
+anterior), com `--clientes` cadeias em paralelo. Rodar antes/depois da mudança e comparar:
+
+    python benchmarks/bench_refresh.py --base http://localhost:8000/api \\
+        --email aluno@exemplo.com --senha segredo123 --n 500 --clientes 8
+
+O cookie de refresh é Secure; em http local ele é reenviado manualmente no header.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+COOKIE = "rtid"
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))] if ordenados else 0.0
+
+
+def _cookie(resp: httpx.Response) -> str:
+    return resp.headers["set-cookie"].split(";", 1)[0]
+
+
+async def _cadeia(cliente: httpx.AsyncClient, args, amostras: list[float], falhas: list[int]) -> None:
+    resp = await cliente.post("/auth/login", json={"identificador": args.email, "senha": args.senha})
+    resp.raise_for_status()
+    cookie = _cookie(resp)
+    for _ in range(args.n):
+        t0 = time.perf_counter()
+        resp = await cliente.post("/auth/refresh", headers={"Cookie": cookie})
+        amostras.append((time.perf_counter() - t0) * 1000)
+        if resp.status_code != 200:
+            falhas.append(resp.status_code)
+            return
+        cookie = _cookie(resp)
+
+
+async def main(args) -> dict:
+    amostras: list[float] = []
+    falhas: list[int] = []
+    async with httpx.AsyncClient(base_url=args.base, timeout=None) as cliente:
+        t0 = time.perf_counter()
+        await asyncio.gather(*[_cadeia(cliente, args, amostras, falhas) for _ in range(args.clientes)])
+        total = time.perf_counter() - t0
+    return {
+        "refreshes": len(amostras),
+        "falhas": falhas,
+        "por_segundo": round(len(amostras) / total, 1) if total else 0.0,
+        "p50_ms": round(statistics.median(amostras), 2) if amostras else 0.0,
+        "p95_ms": round(_percentil(amostras, 95), 2),
+        "p99_ms": round(_percentil(amostras, 99), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base", default="http://localhost:8000/api")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--senha", required=True)
+    parser.add_argument("--n", type=int, default=200, help="refreshes por cliente")
+    parser.add_argument("--clientes", type=int, default=4)
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,138 @@
+# benchmarks/bench_status.py
+"""
+Custo de polling com muitos clientes: cada cliente acompanha as aulas de um usuário e,
+a cada rodada, pede (a) `GET /aulas/{id}/pdfs` de cada aula com o cache de listagens
+desligado (payload completo, transcrição inclusa), (b) `POST /pdfs/status` com todos os
+ids e (c) o mesmo status reenviando o token (caso comum: nada mudou). Roda em processo
+(ASGI), então mede o custo da API e o volume de bytes, não a rede. O mongomock não tem
+índices (o `$in` por _id vira varredura), então para latência realista use `--mongo`:
+
+    python benchmarks/bench_status.py --clientes 1000 --aulas 3 --pdfs 10 --rodadas 3 \\
+        --mongo mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_TMP = tempfile.mkdtemp(prefix="bench-status-")
+os.environ.setdefault("DATA_DIR", _TMP)
+os.environ["CACHE_RESPOSTAS"] = "memoria"
+if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):  # o import do app exige o arquivo; nada chama o Google aqui
+    with open(os.path.join(_TMP, "gcp.json"), "w") as f:
+        f.write("{}")
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.join(_TMP, "gcp.json")
+
+from bson import ObjectId
+from fastapi import Request
+from httpx import ASGITransport, AsyncClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.db.mongo import get_db
+from app.deps.auth import UsuarioToken, get_usuario_atual
+from app.main import app
+from app.services import cache_respostas
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))] if ordenados else 0.0
+
+
+async def _popular(db, usuario: ObjectId, aulas: int, pdfs: int) -> dict[str, list[str]]:
+    por_aula = {}
+    for _ in range(aulas):
+        aula_id = str(ObjectId())
+        docs = [{
+            "usuario_id": usuario, "aula_id": aula_id, "filename": f"p{i}.pdf", "descricao": None,
+            "caminho": "/data/x.pdf", "transcricao": "texto " * 2000, "status": "concluido",
+            "progresso": 1.0, "audio_sha256": f"{i:064x}", "data_upload": datetime.utcnow(),
+        } for i in range(pdfs)]
+        res = await db.pdfs.insert_many(docs)
+        await db.aulas.insert_one({"_id": ObjectId(aula_id), "usuario_id": usuario, "titulo": "A", "data_upload": datetime.utcnow()})
+        por_aula[aula_id] = [str(i) for i in res.inserted_ids]
+    return por_aula
+
+
+async def _listagens(http: AsyncClient, usuario: ObjectId, por_aula: dict, rodadas: int, medidas: list) -> None:
+    headers = {"X-Usuario": str(usuario)}
+    for _ in range(rodadas):
+        t0, total = time.perf_counter(), 0
+        for aula_id in por_aula:
+            total += len((await http.get(f"/api/aulas/{aula_id}/pdfs", headers=headers)).content)
+        medidas.append(((time.perf_counter() - t0) * 1000, total))
+
+
+async def _status(http: AsyncClient, usuario: ObjectId, por_aula: dict, rodadas: int, medidas: dict) -> None:
+    headers = {"X-Usuario": str(usuario)}
+    ids = [i for lista in por_aula.values() for i in lista]
+    for _ in range(rodadas):
+        t0 = time.perf_counter()
+        resp = await http.post("/api/pdfs/status", json={"pdf_ids": ids}, headers=headers)
+        medidas["status"].append(((time.perf_counter() - t0) * 1000, len(resp.content)))
+        token = resp.json()["token"]
+
+        t0 = time.perf_counter()
+        resp = await http.post("/api/pdfs/status", json={"pdf_ids": ids, "token": token}, headers=headers)
+        medidas["status_token"].append(((time.perf_counter() - t0) * 1000, len(resp.content)))
+        assert resp.json()["alterado"] is False
+
+
+async def main(args) -> dict:
+    if args.mongo:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        cliente = AsyncIOMotorClient(args.mongo)
+        await cliente.drop_database("bench_status")
+        db = cliente["bench_status"]
+    else:
+        db = AsyncMongoMockClient()["bench_status"]
+
+    async def _db():
+        return db
+
+    async def _usuario(request: Request):
+        return UsuarioToken(id=ObjectId(request.headers["x-usuario"]), username="bench")
+
+    app.dependency_overrides[get_db] = _db
+    app.dependency_overrides[get_usuario_atual] = _usuario
+
+    usuarios = [ObjectId() for _ in range(args.clientes)]
+    dados = [await _popular(db, u, args.aulas, args.pdfs) for u in usuarios]
+    medidas = {"listagens": [], "status": [], "status_token": []}
+    resultado = {"clientes": args.clientes, "pdfs_por_cliente": args.aulas * args.pdfs}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as http:
+        # Fase 1: listagens completas sem cache (o polling de hoje)
+        cache_respostas._backend = None
+        t0 = time.perf_counter()
+        await asyncio.gather(*[_listagens(http, u, d, args.rodadas, medidas["listagens"]) for u, d in zip(usuarios, dados)])
+        resultado["listagens_total_s"] = round(time.perf_counter() - t0, 2)
+
+        # Fase 2: status em lote; o token sai do contador de versão por usuário
+        cache_respostas._backend = cache_respostas._CacheMemoria()
+        t0 = time.perf_counter()
+        await asyncio.gather(*[_status(http, u, d, args.rodadas, medidas) for u, d in zip(usuarios, dados)])
+        resultado["status_total_s"] = round(time.perf_counter() - t0, 2)
+
+    for nome, amostras in medidas.items():
+        ms = [m for m, _ in amostras]
+        resultado[nome] = {
+            "p50_ms": round(statistics.median(ms), 2), "p95_ms": round(_percentil(ms, 95), 2),
+            "p99_ms": round(_percentil(ms, 99), 2), "bytes_por_poll": int(statistics.mean(b for _, b in amostras)),
+        }
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=1000)
+    parser.add_argument("--aulas", type=int, default=3)
+    parser.add_argument("--pdfs", type=int, default=10, help="PDFs por aula")
+    parser.add_argument("--rodadas", type=int, default=3)
+    parser.add_argument("--mongo", help="URI de um Mongo real (banco bench_status é recriado)")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,256 @@
+# benchmarks/carga_api.py
+"""
+Carga na API servida por um uvicorn local (numa thread, com o próprio event loop), com
+Mongo em memória (mongomock_motor, como nos testes) ou `--mongo`, e o Celery trocado por
+stubs: login, listagem de aulas, upload de PDF e download do áudio, cada rota isolada e em
+níveis crescentes de `--concorrencia`. Usa autenticação de verdade (o token vem do login).
+
+    python benchmarks/carga_api.py --concorrencia 1 8 32 --requisicoes 400
+    python benchmarks/carga_api.py --rotas upload audio --tamanho-upload 2048
+
+Para cada rota e nível: vazão, p50/p95/p99, códigos de status e o atraso do event loop
+do servidor, medido por uma sonda que dorme `SONDA_MS` no loop do uvicorn e anota quanto
+acordou atrasada. Chamada que trava o loop (hash/IO síncrono no handler) aparece como
+`lag_loop` alto naquela rota, e não só como latência dela: todas as outras requisições
+esperam junto. O cliente (httpx) roda em outra thread e disputa o GIL com o servidor, então
+compare rotas e níveis entre si, não com números de produção.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_TMP = Path(tempfile.mkdtemp(prefix="bench-carga-"))
+os.environ.setdefault("DATA_DIR", str(_TMP / "data"))
+os.environ["CACHE_RESPOSTAS"] = "memoria"
+if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):  # o import do app exige o arquivo; nada chama o Google aqui
+    (_TMP / "gcp.json").write_text("{}")
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str(_TMP / "gcp.json")
+
+import uvicorn
+from bson import ObjectId
+from httpx import AsyncClient, Limits
+from mongomock_motor import AsyncMongoMockClient
+
+with contextlib.redirect_stdout(sys.stderr):  # prints de debug do import; o stdout fica só com o JSON
+    from app.auth.hash_handler import gerar_hash
+    from app.db.mongo import get_db
+    from app.main import app
+    from app.services.blob_store import gravar_blob
+    from app.tasks import audio as audio_tasks, limpeza
+
+SONDA_MS = 5
+SENHA = "senha-bench"
+ROTAS = ("login", "listar", "upload", "audio")
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))] if ordenados else 0.0
+
+
+class _DelayStub:
+    """No lugar do `.delay` das tasks: só conta os enfileiramentos."""
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def __call__(self, *args, **kwargs):
+        self.chamadas += 1
+        return type("Job", (), {"id": f"bench-{self.chamadas}"})()
+
+
+async def _popular(db, usuarios: int, tamanho_audio: int) -> list[dict]:
+    """Usuários (mesmo hash de senha), uma matéria/aula cada e um PDF com áudio pronto."""
+    senha_hash = gerar_hash(SENHA)
+    sha, audio = gravar_blob(os.urandom(tamanho_audio), "mp3")
+    contas = []
+    for i in range(usuarios):
+        uid = ObjectId()
+        email = f"bench{i}@exemplo.com"
+        await db.usuarios.insert_one({"_id": uid, "email": email, "cpf": f"{i:011d}", "nome": f"Bench {i}",
+                                      "senha_hash": senha_hash, "roles": [], "criado_em": datetime.utcnow()})
+        materia = await db.materias.insert_one({"usuario_id": uid, "nome": "Cálculo", "data_criacao": datetime.utcnow()})
+        aula = await db.aulas.insert_one({"usuario_id": uid, "titulo": "Derivadas", "materia_id": str(materia.inserted_id),
+                                          "data_upload": datetime.utcnow()})
+        pdf = await db.pdfs.insert_one({
+            "usuario_id": uid, "aula_id": str(aula.inserted_id), "filename": "aula.pdf", "caminho": str(audio),
+            "status": "concluido", "audio_path": str(audio), "audio_sha256": sha, "data_upload": datetime.utcnow(),
+        })
+        contas.append({"email": email, "aula_id": str(aula.inserted_id), "pdf_id": str(pdf.inserted_id)})
+    return contas
+
+
+async def _requisicao(http: AsyncClient, rota: str, conta: dict, n: int, tamanho_upload: int):
+    headers = {"Authorization": f"Bearer {conta.get('token')}"}
+    if rota == "login":
+        return await http.post("/api/auth/login", json={"identificador": conta["email"], "senha": SENHA})
+    if rota == "listar":
+        return await http.get("/api/aulas/", headers=headers)
+    if rota == "upload":
+        # Conteúdo único por requisição: cada upload grava um blob novo
+        dados = b"%PDF-1.4\n" + n.to_bytes(8, "big") + os.urandom(tamanho_upload)
+        return await http.post(f"/api/aulas/{conta['aula_id']}/pdfs/", headers=headers,
+                               files={"file": ("aula.pdf", dados, "application/pdf")})
+    return await http.get(f"/api/pdfs/{conta['pdf_id']}/audio", headers=headers)
+
+
+async def _sonda(amostras: list[float], parar: threading.Event) -> None:
+    while not parar.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(SONDA_MS / 1000)
+        amostras.append(max(0.0, (time.perf_counter() - t0) * 1000 - SONDA_MS))
+
+
+class _Servidor:
+    """uvicorn numa thread; `no_loop` roda corrotinas no event loop dele."""
+
+    def __init__(self):
+        # Porta livre escolhida aqui, mas o bind fica com o uvicorn: com `sockets=[...]` as
+        # conexões aceitas ficam sem TCP_NODELAY e toda resposta espera ~40 ms de ACK atrasado
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            porta = s.getsockname()[1]
+        self.url = f"http://127.0.0.1:{porta}"
+        # lifespan desligado: o startup do app abre o Mongo de get_db() (o override vale só nas rotas)
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=porta, lifespan="off", log_level="warning", access_log=False,
+        ))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._rodar, name="uvicorn", daemon=True)
+
+    def _rodar(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def iniciar(self) -> None:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def no_loop(self, coro):
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def parar(self) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def _rodada(servidor: _Servidor, http: AsyncClient, rota: str, contas: list[dict], concorrencia: int, total: int, tamanho_upload: int) -> dict:
+    latencias: list[float] = []
+    status: Counter = Counter()
+    fila = iter(range(total))
+
+    async def _cliente(c: int) -> None:
+        for n in fila:
+            conta = contas[(c + n) % len(contas)]
+            t0 = time.perf_counter()
+            try:
+                resp = await _requisicao(http, rota, conta, n, tamanho_upload)
+                status[resp.status_code] += 1
+            except Exception as e:
+                status[type(e).__name__] += 1
+            latencias.append((time.perf_counter() - t0) * 1000)
+
+    lag: list[float] = []
+    parar = threading.Event()  # lido pela sonda no loop do servidor
+    sonda = servidor.no_loop(_sonda(lag, parar))
+    t0 = time.perf_counter()
+    await asyncio.gather(*[_cliente(c) for c in range(concorrencia)])
+    duracao = time.perf_counter() - t0
+    parar.set()
+    await sonda
+    return {
+        "rota": rota,
+        "concorrencia": concorrencia,
+        "requisicoes": len(latencias),
+        "req_por_s": round(len(latencias) / duracao, 1),
+        "p50_ms": round(statistics.median(latencias), 2),
+        "p95_ms": round(_percentil(latencias, 95), 2),
+        "p99_ms": round(_percentil(latencias, 99), 2),
+        "status": {str(k): v for k, v in sorted(status.items(), key=str)},
+        "lag_loop": {
+            "p50_ms": round(statistics.median(lag), 2) if lag else None,
+            "p99_ms": round(_percentil(lag, 99), 2),
+            "max_ms": round(max(lag, default=0.0), 2),
+            # Fração do tempo da rodada em que o loop ficou parado além da sonda
+            "travado_pct": round(sum(lag) / 1000 / duracao * 100, 1),
+        },
+    }
+
+
+async def _preparar_banco(uri: str | None):
+    """Roda no loop do servidor (o cliente Motor fica preso ao loop em que nasce)."""
+    if not uri:
+        return AsyncMongoMockClient()["bench_carga"]
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.db.indexes import ensure_indexes
+    from app.routes.auth_routes import ensure_indexes as ensure_indexes_auth
+    cliente = AsyncIOMotorClient(uri)
+    await cliente.drop_database("bench_carga")
+    db = cliente["bench_carga"]
+    await ensure_indexes_auth(db)
+    await ensure_indexes(db)
+    return db
+
+
+async def main(args) -> dict:
+    servidor = _Servidor()
+    servidor.iniciar()
+    db = await servidor.no_loop(_preparar_banco(args.mongo))
+
+    async def _db():
+        return db
+
+    app.dependency_overrides[get_db] = _db
+    stubs = {}
+    for t in (audio_tasks.gerar_audio_google_task, audio_tasks.gerar_audio_edge_task, limpeza.purgar_exclusoes_task):
+        t.delay = stubs[t.name] = _DelayStub()
+
+    contas = await servidor.no_loop(_popular(db, args.usuarios, args.tamanho_audio * 1024))
+    resultados = []
+    limites = Limits(max_connections=max(args.concorrencia), max_keepalive_connections=max(args.concorrencia))
+    async with AsyncClient(base_url=servidor.url, timeout=None, limits=limites) as http:
+        for conta in contas:
+            resp = await http.post("/api/auth/login", json={"identificador": conta["email"], "senha": SENHA})
+            resp.raise_for_status()
+            conta["token"] = resp.json()["access_token"]
+
+        for concorrencia in args.concorrencia:
+            for rota in args.rotas:
+                # Login custa um bcrypt por requisição: roda uma fração do total
+                total = max(concorrencia, args.requisicoes // 10) if rota == "login" else args.requisicoes
+                r = await _rodada(servidor, http, rota, contas, concorrencia, total, args.tamanho_upload * 1024)
+                resultados.append(r)
+                print(f"{rota:>7} c={concorrencia:<4} {r['req_por_s']:>8} req/s  p99 {r['p99_ms']:>8} ms  "
+                      f"lag p99 {r['lag_loop']['p99_ms']:>7} ms", file=sys.stderr)
+    servidor.parar()
+    return {
+        "usuarios": args.usuarios,
+        "mongo": "real" if args.mongo else "mongomock_motor",
+        "tasks_enfileiradas": {nome: s.chamadas for nome, s in stubs.items()},
+        "resultados": resultados,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rotas", nargs="+", choices=ROTAS, default=list(ROTAS))
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requisicoes", type=int, default=400, help="por rota e nível (login usa 1/10)")
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--tamanho-upload", type=int, default=512, help="KB por PDF enviado")
+    parser.add_argument("--tamanho-audio", type=int, default=1024, help="KB do MP3 baixado")
+    parser.add_argument("--mongo", help="URI de um Mongo real (banco bench_carga é recriado)")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
@@ -0,0 +1,164 @@
+# benchmarks/e2e_pipeline.py
+"""
+Job completo (`gerar_audio_google_task` ou `gerar_audio_edge`) com os provedores falsos de
+benchmarks/falsos: mede o tempo de parede por job, o tempo até o primeiro áudio e as
+chamadas/caracteres cobráveis por provedor, para cada nível de `--concorrencia` (jobs
+simultâneos, como processos do worker). Mongo em memória (mongomock) salvo `--mongo`.
+
+    python benchmarks/e2e_pipeline.py --jobs 8 --paginas 20 --concorrencia 1 4 8 \\
+        --config '{"escala_tempo": 0.1, "google_tts": {"erro": 0.02}}'
+    python benchmarks/e2e_pipeline.py --motor edge --jobs 8 --concorrencia 1 8
+
+Cada job usa um PDF com texto próprio (sem reaproveitamento entre jobs); `--reuso`
+repete o mesmo PDF para medir o caminho com cache de páginas e blocos.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(AQUI))
+sys.path.insert(0, os.path.join(AQUI, "falsos"))
+
+import provedores  # noqa: E402  (precisa vir antes do app)
+
+_TMP = Path(tempfile.mkdtemp(prefix="bench-e2e-"))
+os.environ.setdefault("DATA_DIR", str(_TMP / "data"))
+os.environ.setdefault("BACKEND_URL", "")  # sem API: _post_evento só loga
+if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
+    (_TMP / "gcp.json").write_text("{}")
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str(_TMP / "gcp.json")
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))] if ordenados else 0.0
+
+
+def _resumo(valores: list[float]) -> dict:
+    valores = [v for v in valores if v is not None]
+    if not valores:
+        return {"p50_s": None, "p95_s": None, "max_s": None}
+    return {"p50_s": round(statistics.median(valores), 3), "p95_s": round(_percentil(valores, 95), 3), "max_s": round(max(valores), 3)}
+
+
+def _pdf(caminho: Path, paginas: int, job: int) -> str:
+    import fitz
+    with fitz.open() as doc:
+        for n in range(1, paginas + 1):
+            linhas = [
+                f"Aula {job}, página {n}. A derivada mede a taxa de variação instantânea de uma função;",
+                f"o exemplo {job}.{n} aplica a regra da potência e interpreta a reta tangente.",
+            ] * 12
+            doc.new_page().insert_textbox(fitz.Rect(50, 50, 545, 800), "\n".join(linhas), fontsize=10)
+        doc.save(caminho)
+    return str(caminho)
+
+
+def _job_google(audio_tasks, db, caminho: str) -> dict:
+    from bson import ObjectId
+    pdf_id = db.pdfs.insert_one({"usuario_id": ObjectId(), "aula_id": "bench", "caminho": caminho}).inserted_id
+    t0 = time.perf_counter()
+    audio_tasks.gerar_audio_google_task(str(pdf_id))
+    doc = db.pdfs.find_one({"_id": pdf_id}, {"status": 1, "resumo": 1})
+    return {
+        "status": doc.get("status"),
+        "parede": time.perf_counter() - t0,
+        "primeiro_audio": (doc.get("resumo") or {}).get("tempo_primeiro_audio"),
+    }
+
+
+def _job_edge(audio_generator, caminho: str) -> dict:
+    from app.services.pdf_extractor import extrair_texto_pdf
+    texto = extrair_texto_pdf(caminho)
+    t0, primeiro = time.perf_counter(), []
+
+    def progresso(feitos: int, total: int) -> None:
+        if not primeiro:
+            primeiro.append(time.perf_counter() - t0)
+
+    asyncio.run(audio_generator.gerar_audio_edge(texto, caminho + ".mp3", progresso=progresso))
+    return {"status": "concluido", "parede": time.perf_counter() - t0, "primeiro_audio": primeiro[0] if primeiro else None}
+
+
+def _hedges() -> dict:
+    """Totais de `transcrissor_hedges_total` por provedor/desfecho (acumulados no processo)."""
+    from app.core.metricas import HEDGES
+    return {
+        f"{a.labels['provedor']}:{a.labels['desfecho']}": int(a.value)
+        for familia in HEDGES.collect() for a in familia.samples if a.name.endswith("_total")
+    }
+
+
+def main(args) -> dict:
+    config = provedores.instalar(json.loads(args.config))
+
+    import mongomock
+    from pymongo import MongoClient
+    with contextlib.redirect_stdout(sys.stderr):
+        from app.services import audio_generator
+        from app.tasks import audio as audio_tasks
+
+    cliente = MongoClient(args.mongo) if args.mongo else mongomock.MongoClient()
+    db = cliente.get_database("bench_e2e")
+    if args.mongo:
+        cliente.drop_database("bench_e2e")
+    # O job fecha o cliente ao final; o banco compartilhado entre os jobs fica aberto
+    audio_tasks._get_db = lambda: (types.SimpleNamespace(close=lambda: None), db)
+    audio_tasks.verificar_cancelamento = lambda pdf_id: None  # sem Redis no benchmark
+    audio_tasks.celery_app.finalize(auto=True)  # o proxy da task finaliza o app sem lock entre threads
+
+    pasta = _TMP / "pdfs"
+    pasta.mkdir(parents=True, exist_ok=True)
+    resultado = {"motor": args.motor, "jobs": args.jobs, "paginas": args.paginas, "config": config, "rodadas": []}
+    for concorrencia in args.concorrencia:
+        rodada = len(resultado["rodadas"])
+        pdfs = [
+            _pdf(pasta / f"r{rodada}_j{0 if args.reuso else j}.pdf", args.paginas, 0 if args.reuso else rodada * 1000 + j)
+            for j in range(args.jobs)
+        ]
+        if args.motor == "google":
+            executar = lambda c: _job_google(audio_tasks, db, c)
+        else:
+            executar = lambda c: _job_edge(audio_generator, c)
+
+        provedores.zerar_contadores()
+        hedges_antes = _hedges()
+        t0 = time.perf_counter()
+        # Os logs do pipeline vão para o stderr; o stdout fica só com o JSON
+        with contextlib.redirect_stdout(sys.stderr), ThreadPoolExecutor(max_workers=concorrencia) as pool:
+            jobs = list(pool.map(executar, pdfs))
+        total = time.perf_counter() - t0
+        resultado["rodadas"].append({
+            "concorrencia": concorrencia,
+            "tempo_total_s": round(total, 3),
+            "jobs_por_min": round(len(jobs) / total * 60, 2),
+            "concluidos": sum(1 for j in jobs if j["status"] == "concluido"),
+            "tempo_job": _resumo([j["parede"] for j in jobs]),
+            "primeiro_audio": _resumo([j["primeiro_audio"] for j in jobs]),
+            "provedores": provedores.zerar_contadores(),
+            "hedges": {k: v - hedges_antes.get(k, 0) for k, v in _hedges().items() if v - hedges_antes.get(k, 0)},
+        })
+        print(f"concorrência {concorrencia}: {total:.1f}s", file=sys.stderr)
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--motor", choices=("google", "edge"), default="google")
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--paginas", type=int, default=10)
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--config", default='{"escala_tempo": 0.1}', help="JSON mesclado sobre provedores.PADRAO")
+    parser.add_argument("--reuso", action="store_true", help="todos os jobs com o mesmo PDF")
+    parser.add_argument("--mongo", help="URI de um Mongo real (banco bench_e2e é recriado)")
+    print(json.dumps(main(parser.parse_args()), indent=2, ensure_ascii=False))
@@ -0,0 +1,198 @@
+# benchmarks/falsos/provedores.py
+"""
+Provedores falsos para medir o pipeline sem Google/Edge/Gemini: módulos que imitam
+`google.cloud.texttospeech`, `edge_tts` e `google.generativeai` (só a superfície usada
+pelo app) e entram em `sys.modules` antes do import do app — nenhum código do app muda.
+
+Cada provedor tem latência lognormal (`mediana` em segundos, `sigma`), taxa de erro (503),
+cota opcional (`cota_rps`: acima dela responde 429, como a API real) e tamanho do áudio
+(MP3 válido: frames MPEG-2 Layer III de 24 ms, `seg_por_caractere`).
+A configuração vem de `instalar(config)` ou do JSON em `PROVEDORES_FALSOS`, mesclado
+sobre `PADRAO`. `CONTADORES` guarda chamadas, caracteres cobrados e erros por provedor.
+
+Num processo à parte (ex.: worker Celery), use o sitecustomize desta pasta:
+
+    PYTHONPATH=benchmarks/falsos PROVEDORES_FALSOS='{"google_tts": {"mediana": 0.3}}' \\
+        celery -A app.tasks.celery_app.celery_app worker --pool=solo
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import types
+from collections import defaultdict
+from typing import Optional
+
+PADRAO = {
+    "google_tts": {"mediana": 0.6, "sigma": 0.4, "erro": 0.0, "cota_rps": None, "seg_por_caractere": 0.07},
+    "edge_tts": {"mediana": 0.9, "sigma": 0.5, "erro": 0.0, "cota_rps": None, "seg_por_caractere": 0.07},
+    "gemini": {"mediana": 2.5, "sigma": 0.6, "erro": 0.0, "cota_rps": None},
+    "escala_tempo": 1.0,  # < 1 acelera todas as latências (mantém as proporções)
+    "semente": None,
+}
+
+CONTADORES: dict = defaultdict(lambda: {"chamadas": 0, "caracteres": 0, "erros": 0, "cota_excedida": 0})
+_config: dict = {}
+_lock = threading.Lock()
+_rng = random.Random()
+_baldes: dict = {}  # provedor -> (fichas, instante)
+
+# Frame MPEG-2 Layer III, 32 kbps, 24 kHz, mono: 96 bytes, 576 amostras (24 ms)
+_FRAME = bytes([0xFF, 0xF3, 0x44, 0xC4]) + bytes(92)
+_SEG_FRAME = 576 / 24000
+
+
+class ErroProvedorFalso(RuntimeError):
+    """Tem `code` (HTTP) como as exceções do google.api_core."""
+
+    def __init__(self, mensagem: str, code: int):
+        super().__init__(mensagem)
+        self.code = code
+
+
+def _mesclar(base: dict, extra: dict) -> dict:
+    return {k: _mesclar(v, extra.get(k, {})) if isinstance(v, dict) else extra.get(k, v) for k, v in base.items()}
+
+
+def _cota_excedida(provedor: str, cota_rps: float) -> bool:
+    """Balde local de `cota_rps` (no tempo escalado); chame com `_lock`."""
+    agora = time.monotonic() / _config["escala_tempo"]
+    capacidade = max(1.0, cota_rps)
+    fichas, antes = _baldes.get(provedor, (capacidade, agora))
+    fichas = min(capacidade, fichas + (agora - antes) * cota_rps)
+    excedida = fichas < 1
+    _baldes[provedor] = (fichas if excedida else fichas - 1, agora)
+    return excedida
+
+
+def _chamar(provedor: str, caracteres: int) -> tuple[float, Optional[int]]:
+    """Conta a chamada e sorteia a latência e a falha: (latência, código HTTP do erro ou None)."""
+    cfg = _config[provedor]
+    with _lock:
+        CONTADORES[provedor]["chamadas"] += 1
+        if cfg["cota_rps"] and _cota_excedida(provedor, cfg["cota_rps"]):
+            CONTADORES[provedor]["cota_excedida"] += 1
+            return 0.02 * _config["escala_tempo"], 429  # recusa rápida, nada é cobrado
+        CONTADORES[provedor]["caracteres"] += caracteres
+        latencia = _rng.lognormvariate(math.log(cfg["mediana"]), cfg["sigma"]) * _config["escala_tempo"]
+        falha = 503 if _rng.random() < cfg["erro"] else None
+        if falha:
+            CONTADORES[provedor]["erros"] += 1
+    return latencia, falha
+
+
+def _mp3(caracteres: int, seg_por_caractere: float) -> bytes:
+    return _FRAME * max(1, math.ceil(caracteres * seg_por_caractere / _SEG_FRAME))
+
+
+# ---- google.cloud.texttospeech ----
+
+def _modulo_texttospeech() -> types.ModuleType:
+    m = types.ModuleType("google.cloud.texttospeech")
+
+    class _Campos:
+        def __init__(self, **kw):
+            self.__dict__.update(kw)
+
+    class TextToSpeechClient:
+        def synthesize_speech(self, input, voice, audio_config, timeout=None):
+            texto = getattr(input, "ssml", None) or getattr(input, "text", "")
+            latencia, falha = _chamar("google_tts", len(texto))
+            time.sleep(latencia)
+            if falha:
+                raise ErroProvedorFalso(f"google_tts: {falha} (falso)", falha)
+            return types.SimpleNamespace(audio_content=_mp3(len(texto), _config["google_tts"]["seg_por_caractere"]))
+
+    m.TextToSpeechClient = TextToSpeechClient
+    m.SynthesisInput = m.VoiceSelectionParams = m.AudioConfig = _Campos
+    m.SsmlVoiceGender = types.SimpleNamespace(MALE="MALE", FEMALE="FEMALE", NEUTRAL="NEUTRAL")
+    m.AudioEncoding = types.SimpleNamespace(MP3="MP3", LINEAR16="LINEAR16", OGG_OPUS="OGG_OPUS")
+    return m
+
+
+# ---- edge_tts ----
+
+def _modulo_edge_tts() -> types.ModuleType:
+    m = types.ModuleType("edge_tts")
+
+    class Communicate:
+        def __init__(self, text: str, voice: str = "", **_):
+            self.text, self.voice = text, voice
+
+        async def stream(self):
+            latencia, falha = _chamar("edge_tts", len(self.text))
+            await asyncio.sleep(latencia)
+            if falha:
+                raise ErroProvedorFalso(f"edge_tts: {falha} no handshake (falso)", falha)
+            dados = _mp3(len(self.text), _config["edge_tts"]["seg_por_caractere"])
+            for i in range(0, len(dados), 4096):
+                yield {"type": "audio", "data": dados[i:i + 4096]}
+
+    m.Communicate = Communicate
+    return m
+
+
+# ---- google.generativeai ----
+
+def _modulo_genai() -> types.ModuleType:
+    m = types.ModuleType("google.generativeai")
+
+    class GenerativeModel:
+        def __init__(self, nome: str, **_):
+            self.nome = nome
+
+        def generate_content(self, conteudo):
+            partes = [p["text"] for msg in conteudo for p in msg.get("parts", [])]
+            latencia, falha = _chamar("gemini", sum(len(p) for p in partes))
+            time.sleep(latencia)
+            if falha:
+                raise ErroProvedorFalso(f"gemini: {falha} (falso)", falha)
+            return types.SimpleNamespace(text=partes[-1] if partes else "")  # devolve o texto da aula
+
+    m.configure = lambda **_: None
+    m.GenerativeModel = GenerativeModel
+    return m
+
+
+def _pacote(nome: str) -> types.ModuleType:
+    """O pacote real (ex.: google.cloud) ou, sem ele instalado, um pacote vazio no lugar."""
+    try:
+        __import__(nome)
+    except ImportError:
+        pai, _, filho = nome.rpartition(".")
+        sys.modules[nome] = types.ModuleType(nome)
+        sys.modules[nome].__path__ = []
+        if pai:
+            setattr(_pacote(pai), filho, sys.modules[nome])
+    return sys.modules[nome]
+
+
+def instalar(config: dict | None = None) -> dict:
+    """Registra os módulos falsos; chame antes de importar qualquer coisa de `app`."""
+    extra = config if config is not None else json.loads(os.getenv("PROVEDORES_FALSOS") or "{}")
+    _config.clear()
+    _config.update(_mesclar(PADRAO, extra))
+    _rng.seed(_config["semente"])
+    _baldes.clear()
+    modulos = {
+        "google.cloud.texttospeech": _modulo_texttospeech(),
+        "edge_tts": _modulo_edge_tts(),
+        "google.generativeai": _modulo_genai(),
+    }
+    for nome, modulo in modulos.items():
+        sys.modules[nome] = modulo
+        pai, _, filho = nome.rpartition(".")
+        if pai:
+            setattr(_pacote(pai), filho, modulo)
+    return _config
+
+
+def zerar_contadores() -> dict:
+    with _lock:
+        copia = {k: dict(v) for k, v in CONTADORES.items()}
+        CONTADORES.clear()
+    return copia
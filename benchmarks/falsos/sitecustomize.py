@@ -0,0 +1,6 @@
+# benchmarks/falsos/sitecustomize.py
+# Importado automaticamente pelo Python quando esta pasta está no PYTHONPATH: instala os
+# provedores falsos (config em PROVEDORES_FALSOS) antes de qualquer import do app.
+import provedores
+
+provedores.instalar()
@@ -0,0 +1,78 @@
+# benchmarks/p99_edge.py
+"""
+Latência da API (p50/p95/p99) enquanto uma geração manual com Edge TTS está em andamento.
+
+Antes, `POST /pdfs/{id}/gerar-audio` sintetizava e concatenava o áudio dentro do handler;
+agora só enfileira o job no worker. Rodar o mesmo comando nas duas versões e comparar:
+
+    python benchmarks/p99_edge.py --base http://localhost:8000/api \\
+        --token <jwt> --pdf <pdf_id_com_transcricao> --duracao 60
+
+Um cliente dispara o gerar-audio e outros `--concorrencia` ficam batendo em `--rota`
+(padrão: /aulas). Imprime um JSON com os percentis em ms e o tempo de resposta do POST.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def _martelar(cliente: httpx.AsyncClient, rota: str, fim: float, amostras: list[float], erros: list[int]):
+    while time.perf_counter() < fim:
+        t0 = time.perf_counter()
+        try:
+            r = await cliente.get(rota)
+            if r.status_code >= 500:
+                erros.append(r.status_code)
+        except httpx.HTTPError:
+            erros.append(0)
+        amostras.append((time.perf_counter() - t0) * 1000)
+
+
+async def main(args) -> dict:
+    headers = {"Authorization": f"Bearer {args.token}"}
+    amostras: list[float] = []
+    erros: list[int] = []
+    async with httpx.AsyncClient(base_url=args.base, headers=headers, timeout=None) as cliente:
+        fim = time.perf_counter() + args.duracao
+        carga = [asyncio.create_task(_martelar(cliente, args.rota, fim, amostras, erros)) for _ in range(args.concorrencia)]
+
+        await asyncio.sleep(args.aquecimento)
+        t0 = time.perf_counter()
+        r = await cliente.post(f"/pdfs/{args.pdf}/gerar-audio")
+        post_ms = (time.perf_counter() - t0) * 1000
+
+        await asyncio.gather(*carga)
+
+    return {
+        "rota": args.rota,
+        "requisicoes": len(amostras),
+        "erros": len(erros),
+        "gerar_audio": {"status": r.status_code, "ms": round(post_ms, 1)},
+        "p50_ms": round(statistics.median(amostras), 2) if amostras else 0.0,
+        "p95_ms": round(_percentil(amostras, 95), 2),
+        "p99_ms": round(_percentil(amostras, 99), 2),
+        "max_ms": round(max(amostras, default=0.0), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base", default="http://localhost:8000/api")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--pdf", required=True, help="id de um PDF do usuário que já tenha transcrição")
+    parser.add_argument("--rota", default="/aulas")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--duracao", type=float, default=60.0, help="segundos de carga")
+    parser.add_argument("--aquecimento", type=float, default=2.0, help="segundos antes do POST")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
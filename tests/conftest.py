@@ -1,7 +1,21 @@
 # tests/conftest.py
 import os
+import tempfile
 import pytest
 from pathlib import Path
+from types import SimpleNamespace
+
+# Precisa valer antes de importar o app: app.core.paths resolve DATA_DIR no import
+# e o audio_generator exige o arquivo de credencial do Google.
+_TMP = Path(tempfile.mkdtemp(prefix="transcrissor-tests-"))
+os.environ.setdefault("DATA_DIR", str(_TMP / "data"))
+os.environ.setdefault("CACHE_RESPOSTAS", "memoria")  # sem Redis nos testes
+os.environ.setdefault("LIMITADOR", "desligado")  # test_limitador liga com fakeredis
+os.environ.setdefault("TRACING", "arquivo")  # spans em DATA_DIR/traces/spans.jsonl
+if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
+    (_TMP / "gcp.json").write_text("{}")
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str(_TMP / "gcp.json")
+
 from httpx import AsyncClient, ASGITransport
 from bson import ObjectId
 from mongomock_motor import AsyncMongoMockClient
@@ -18,10 +32,8 @@ def test_user_id_str():
     return str(TEST_USER_ID)
 
 @pytest.fixture(scope="session", autouse=True)
-def _tmp_data_dir(tmp_path_factory):
-    d = tmp_path_factory.mktemp("data_dir")
-    os.environ["DATA_DIR"] = str(d)  # força o app a salvar em tmp
-    return d
+def _tmp_data_dir():
+    return Path(os.environ["DATA_DIR"])  # o app salva em tmp (definido no topo)
 
 @pytest.fixture(scope="session")
 def db_client():
@@ -41,22 +53,32 @@ async def override_db_and_auth(db):
         return UsuarioToken(id=TEST_USER_ID, username="tester")
     app.dependency_overrides[get_usuario_atual] = _get_user_override
 
-    # Mock da task Celery: gerar_audio_google_task.delay
-    from app.tasks import audio as audio_tasks
-    original_delay = getattr(audio_tasks.gerar_audio_google_task, "delay", None)
+    # Mock das tasks Celery (.delay): não dispara nada nos testes; simulamos manualmente
+    from app.tasks import audio as audio_tasks, limpeza
+    tasks = (audio_tasks.gerar_audio_google_task, audio_tasks.gerar_audio_edge_task, limpeza.purgar_exclusoes_task)
+    originais = [getattr(t, "delay", None) for t in tasks]
 
     class _DelayMock:
-        def __call__(self, pdf_id: str):
-            # não dispara nada nos testes; simulamos manualmente
-            return None
+        def __init__(self):
+            self.chamadas = []
+
+        def __call__(self, *args, **kwargs):
+            self.chamadas.append(args + ((kwargs,) if kwargs else ()))
+            return SimpleNamespace(id=f"job-{len(self.chamadas)}")
+
+    for t in tasks:
+        t.delay = _DelayMock()
 
-    audio_tasks.gerar_audio_google_task.delay = _DelayMock()
+    # Cache de respostas zerado por teste: os testes também escrevem direto no Mongo
+    from app.services import cache_respostas
+    cache_respostas._backend = cache_respostas._CacheMemoria()
 
     yield
 
     app.dependency_overrides.clear()
-    if original_delay is not None:
-        audio_tasks.gerar_audio_google_task.delay = original_delay
+    for t, original in zip(tasks, originais):
+        if original is not None:
+            t.delay = original
 
 @pytest.fixture
 async def client():
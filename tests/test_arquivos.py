@@ -0,0 +1,56 @@
+# tests/test_arquivos.py
+import pytest
+from datetime import datetime
+
+from app.core.assinatura import gerar_link
+from app.routes import arquivos
+from app.services.blob_store import gravar_blob
+from conftest import TEST_USER_ID
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _link_audio(client, auth_headers, db) -> tuple[str, str]:
+    sha, caminho = gravar_blob(b"\xff\xf3 audio assinado", "mp3")
+    res = await db.pdfs.insert_one({
+        "usuario_id": TEST_USER_ID, "aula_id": "a1", "filename": "aula 3.pdf", "caminho": "",
+        "data_upload": datetime.utcnow(), "audio_path": str(caminho), "audio_sha256": sha,
+    })
+    resp = await client.get(f"/api/pdfs/{res.inserted_id}/audio/link", headers=auth_headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["url"], sha
+
+
+async def test_link_assinado_entrega_sem_token(client, auth_headers, db):
+    url, sha = await _link_audio(client, auth_headers, db)
+
+    resp = await client.get(url)
+    assert resp.status_code == 200
+    assert resp.content == b"\xff\xf3 audio assinado"
+    assert resp.headers["etag"] == f'"{sha}"'
+    assert 'filename="aula 3.mp3"' in resp.headers["content-disposition"]
+
+    adulterado = url.replace("nome=aula", "nome=outra")
+    assert (await client.get(adulterado)).status_code == 403
+
+
+async def test_nome_com_aspas_nao_quebra_o_content_disposition(client):
+    sha, _ = gravar_blob(b"\xff\xf3 nome estranho", "mp3")
+    url, _ = gerar_link(sha, "mp3", nome='Aula "1"\\ação.mp3')
+
+    resp = await client.get(url)
+    assert resp.status_code == 200
+    assert resp.headers["content-disposition"] == (
+        "inline; filename=\"Aula 1acao.mp3\"; filename*=utf-8''Aula%20%221%22%5Ca%C3%A7%C3%A3o.mp3"
+    )
+
+
+async def test_offload_devolve_x_accel_redirect(client, auth_headers, db, monkeypatch):
+    monkeypatch.setattr(arquivos, "ARQUIVOS_OFFLOAD_PREFIXO", "/_blobs")
+    url, sha = await _link_audio(client, auth_headers, db)
+
+    resp = await client.get(url)
+    assert resp.status_code == 200
+    assert resp.content == b""
+    assert resp.headers["x-accel-redirect"] == f"/_blobs/{sha[:2]}/{sha[2:4]}/{sha}.mp3"
+    assert resp.headers["content-type"].startswith("audio/mpeg")
@@ -0,0 +1,42 @@
+# tests/test_arvore.py
+import pytest
+
+from app.routes.arvore import pipeline_arvore
+from app.services.exclusao import VIVO
+from conftest import TEST_USER_ID
+
+
+def test_pipeline_arvore_filtra_usuario_e_exclusao_em_cada_nivel():
+    materias = pipeline_arvore(TEST_USER_ID)
+    assert [next(iter(estagio)) for estagio in materias] == ["$match", "$sort", "$lookup", "$project"]
+    aulas = materias[2]["$lookup"]
+    assert aulas["from"] == "aulas" and aulas["as"] == "aulas"
+    assert [next(iter(estagio)) for estagio in aulas["pipeline"]] == ["$match", "$sort", "$lookup", "$project"]
+    pdfs = aulas["pipeline"][2]["$lookup"]
+    assert pdfs["from"] == "pdfs" and pdfs["as"] == "pdfs"
+    assert [next(iter(estagio)) for estagio in pdfs["pipeline"]] == ["$match", "$sort", "$project"]
+
+    # Usuário e VIVO em todo $match (índices compostos e nada excluído vaza pela árvore)
+    for match in (materias[0], aulas["pipeline"][0], pdfs["pipeline"][0]):
+        assert match["$match"]["usuario_id"] == TEST_USER_ID
+        assert all(match["$match"][k] == v for k, v in VIVO.items())
+
+    projecao_pdf = pdfs["pipeline"][-1]["$project"]
+    assert projecao_pdf["_id"] == 0
+    assert not {"transcricao", "paginas", "blocos", "indice_audio", "segmentos"} & set(projecao_pdf)
+
+
+@pytest.mark.asyncio
+async def test_arvore_em_uma_agregacao(client, auth_headers):
+    resp = await client.post("/api/materias/", json={"nome": "Arvore"}, headers=auth_headers)
+    materia_id = resp.json()["id"]
+    resp = await client.post("/api/aulas/", json={"titulo": "A1", "materia_id": materia_id}, headers=auth_headers)
+    aula_id = resp.json()["id"]
+
+    try:
+        resp = await client.get("/api/arvore", headers=auth_headers)
+    except NotImplementedError as e:  # mongomock não implementa $lookup com let/pipeline
+        pytest.skip(str(e))
+    materia = next(m for m in resp.json() if m["id"] == materia_id)
+    assert [a["id"] for a in materia["aulas"]] == [aula_id]
+    assert materia["aulas"][0]["pdfs"] == []
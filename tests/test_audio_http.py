@@ -0,0 +1,61 @@
+# tests/test_audio_http.py
+import pytest
+from datetime import datetime
+
+from app.services.blob_store import gravar_blob
+from conftest import TEST_USER_ID
+
+pytestmark = pytest.mark.asyncio
+
+AUDIO = bytes(range(256)) * 4  # 1024 bytes
+
+
+async def _pdf_com_audio(db) -> tuple[str, str]:
+    sha, caminho = gravar_blob(AUDIO, "mp3")
+    res = await db.pdfs.insert_one({
+        "usuario_id": TEST_USER_ID, "aula_id": "a1", "filename": "aula.pdf", "caminho": "",
+        "data_upload": datetime.utcnow(), "status": "concluido",
+        "audio_path": str(caminho), "audio_sha256": sha,
+    })
+    return str(res.inserted_id), sha
+
+
+async def test_etag_304_e_cache_imutavel(client, auth_headers, db):
+    pdf_id, sha = await _pdf_com_audio(db)
+    url = f"/api/pdfs/{pdf_id}/audio"
+
+    resp = await client.get(url, headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.headers["etag"] == f'"{sha}"'
+    assert resp.headers["cache-control"] == "private, no-cache"
+    assert resp.headers["content-disposition"].startswith("inline")
+
+    resp = await client.get(url, headers={**auth_headers, "If-None-Match": f'"{sha}"'})
+    assert resp.status_code == 304
+    assert resp.content == b""
+
+    resp = await client.get(f"{url}?v={sha}", headers=auth_headers)
+    assert "immutable" in resp.headers["cache-control"]
+
+
+async def test_range_simples_multiplo_e_bytes_por_sessao(client, auth_headers, db):
+    pdf_id, sha = await _pdf_com_audio(db)
+    url = f"/api/pdfs/{pdf_id}/audio?sessao=s1"
+
+    resp = await client.get(url, headers={**auth_headers, "Range": "bytes=100-199"})
+    assert resp.status_code == 206
+    assert resp.headers["content-range"] == "bytes 100-199/1024"
+    assert resp.content == AUDIO[100:200]
+
+    resp = await client.get(url, headers={**auth_headers, "Range": "bytes=0-9,1000-1023"})
+    assert resp.status_code == 206
+    assert resp.headers["content-type"].startswith("multipart/byteranges")
+    assert AUDIO[0:10] in resp.content and AUDIO[1000:1024] in resp.content
+
+    resp = await client.get(url, headers={**auth_headers, "If-None-Match": f'"{sha}"'})
+    assert resp.status_code == 304
+
+    sessao = await db.sessoes_escuta.find_one({"pdf_id": pdf_id, "sessao": "s1"})
+    assert sessao["requisicoes"] == 3
+    assert sessao["respostas_304"] == 1
+    assert sessao["bytes"] >= 100 + 10 + 24
@@ -0,0 +1,51 @@
+# tests/test_auth.py
+import pytest
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth import hash_handler
+from app.routes import auth_routes
+
+pytestmark = pytest.mark.asyncio
+
+CPF = "52998224725"
+
+
+async def _registrar_e_logar(client, email: str) -> str:
+    resp = await client.post("/api/auth/register", json={
+        "nome": "Aluno", "email": email, "cpf": CPF, "senha": "segredo123",
+    })
+    assert resp.status_code == 201, resp.text
+    resp = await client.post("/api/auth/login", json={"identificador": email, "senha": "segredo123"})
+    assert resp.status_code == 200, resp.text
+    return resp.json()["access_token"]
+
+
+async def test_usuario_do_token_fica_em_cache_ate_exp(client, db):
+    token = await _registrar_e_logar(client, "cache@exemplo.com")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    resp = await client.get("/api/auth/me", headers=headers)
+    assert resp.status_code == 200 and resp.json()["email"] == "cache@exemplo.com"
+
+    # Quem recebe o usuário do cache pode mexer nele sem afetar as próximas requisições
+    cred = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    usuario = await auth_routes.get_current_user(cred, db)
+    usuario["roles"] = ["admin"]
+    assert "admin" not in (await auth_routes.get_current_user(cred, db)).get("roles", [])
+    await db.usuarios.delete_many({"cpf": CPF})
+
+    resp = await client.get("/api/auth/me", headers={"Authorization": "Bearer invalido"})
+    assert resp.status_code == 401
+
+
+async def test_pool_de_hash_cheio_responde_503(client, monkeypatch):
+    monkeypatch.setattr(hash_handler, "HASH_FILA_MAX", 0)
+    resp = await client.post("/api/auth/login", json={"identificador": "x@exemplo.com", "senha": "qualquer"})
+    assert resp.status_code == 401  # usuário inexistente nem chega ao bcrypt
+
+    resp = await client.post("/api/auth/register", json={
+        "nome": "Aluno", "email": "cheio@exemplo.com", "cpf": "11144477735", "senha": "segredo123",
+    })
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
@@ -0,0 +1,87 @@
+# tests/test_cache_respostas.py
+import pytest
+from bson import ObjectId
+
+from conftest import TEST_USER_ID
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_listagem_revalida_com_etag_e_invalida_na_escrita(client, auth_headers, db):
+    resp = await client.get("/api/materias/", headers=auth_headers)
+    assert resp.status_code == 200
+    etag = resp.headers["etag"]
+
+    resp = await client.get("/api/materias/", headers={**auth_headers, "If-None-Match": etag})
+    assert resp.status_code == 304 and resp.headers["etag"] == etag
+
+    # Escrita direta no Mongo não invalida: a resposta vem do cache
+    await db.materias.insert_one({"usuario_id": "outro", "nome": "Fora"})
+    assert (await client.get("/api/materias/", headers=auth_headers)).headers["etag"] == etag
+
+    resp = await client.post("/api/materias/", json={"nome": "Nova"}, headers=auth_headers)
+    materia_id = resp.json()["id"]
+
+    resp = await client.get("/api/materias/", headers={**auth_headers, "If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["etag"] != etag
+    assert materia_id in [m["id"] for m in resp.json()]
+
+
+async def test_evento_do_worker_invalida_o_dono(client, auth_headers, db):
+    resp = await client.post("/api/materias/", json={"nome": "M"}, headers=auth_headers)
+    resp = await client.post("/api/aulas/", json={"titulo": "A", "materia_id": resp.json()["id"]}, headers=auth_headers)
+    aula_id = resp.json()["id"]
+    resp = await client.post(
+        f"/api/aulas/{aula_id}/pdfs/", files={"file": ("a.pdf", b"%PDF-1.4 cache", "application/pdf")},
+        headers=auth_headers,
+    )
+    pdf_id = resp.json()["id"]
+
+    url = f"/api/aulas/{aula_id}/pdfs"
+    antes = await client.get(url, headers=auth_headers)
+    # O worker grava o resultado direto no Mongo e avisa a API pelo evento
+    await db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {"audio_sha256": "ab" * 32}})
+    await client.post("/api/eventos/pdf-audio", json={"pdf_id": pdf_id, "status": "concluido"})
+
+    depois = await client.get(url, headers={**auth_headers, "If-None-Match": antes.headers["etag"]})
+    assert depois.status_code == 200
+    assert depois.json()[0]["audio_sha256"] == "ab" * 32
+
+
+async def test_status_em_lote_com_token(client, auth_headers, db):
+    ids = [
+        str((await db.pdfs.insert_one({"usuario_id": TEST_USER_ID, "aula_id": "a1", "status": s, **extra})).inserted_id)
+        for s, extra in (("processando", {"progresso": 0.5}), ("concluido", {"audio_sha256": "cd" * 32}))
+    ]
+    alheio = str((await db.pdfs.insert_one({"usuario_id": ObjectId(), "aula_id": "a1", "status": "concluido"})).inserted_id)
+
+    resp = await client.post("/api/pdfs/status", json={"pdf_ids": ids + [alheio]}, headers=auth_headers)
+    corpo = resp.json()
+    assert corpo["alterado"] is True
+    assert {p["id"]: (p["status"], p["progresso"], p["audio_pronto"]) for p in corpo["pdfs"]} == {
+        ids[0]: ("processando", 0.5, False), ids[1]: ("concluido", None, True),
+    }
+
+    resp = await client.post("/api/pdfs/status", json={"pdf_ids": ids + [alheio], "token": corpo["token"]}, headers=auth_headers)
+    assert resp.json() == {"token": corpo["token"], "alterado": False}
+
+    await client.post("/api/eventos/pdf-audio", json={"pdf_id": ids[0], "status": "processando", "progresso": 0.9})
+    resp = await client.post("/api/pdfs/status", json={"pdf_ids": ids, "token": corpo["token"]}, headers=auth_headers)
+    assert resp.json()["alterado"] is True
+    assert next(p for p in resp.json()["pdfs"] if p["id"] == ids[0])["progresso"] == 0.9
+
+
+async def test_progresso_nao_invalida_as_listagens(client, auth_headers, db):
+    pdf_id = str((await db.pdfs.insert_one({"usuario_id": TEST_USER_ID, "aula_id": "a1", "status": "processando"})).inserted_id)
+    listagem = await client.get("/api/materias/", headers=auth_headers)
+    status = (await client.post("/api/pdfs/status", json={"pdf_ids": [pdf_id]}, headers=auth_headers)).json()
+
+    await client.post("/api/eventos/pdf-audio", json={"pdf_id": pdf_id, "status": "processando", "progresso": 0.3})
+    resp = await client.get("/api/materias/", headers={**auth_headers, "If-None-Match": listagem.headers["etag"]})
+    assert resp.status_code == 304
+    resp = await client.post("/api/pdfs/status", json={"pdf_ids": [pdf_id], "token": status["token"]}, headers=auth_headers)
+    assert resp.json()["alterado"] is True
+
+    await client.post("/api/eventos/pdf-audio", json={"pdf_id": pdf_id, "status": "concluido"})
+    resp = await client.get("/api/materias/", headers={**auth_headers, "If-None-Match": listagem.headers["etag"]})
+    assert resp.status_code == 200
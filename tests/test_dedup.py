@@ -0,0 +1,78 @@
+# tests/test_dedup.py
+import io
+import pytest
+from pathlib import Path
+from bson import ObjectId
+
+from app.services.blob_store import gravar_blob, reter_blob
+from app.services.audio_generator import TTS_CONFIG_GOOGLE
+
+pytestmark = pytest.mark.asyncio
+
+PDF = b"%PDF-1.4\n1 0 obj\n<<>>\nendobj\ntrailer\n<<>>\n%%EOF dedup"
+
+
+async def _nova_aula(client, auth_headers) -> str:
+    resp = await client.post("/api/materias/", json={"nome": "Redes"}, headers=auth_headers)
+    materia_id = resp.json()["id"]
+    resp = await client.post("/api/aulas/", json={"titulo": "TCP", "materia_id": materia_id}, headers=auth_headers)
+    return resp.json()["id"]
+
+
+async def _upload(client, auth_headers, aula_id, conteudo: bytes = PDF) -> dict:
+    files = {"file": ("handout.pdf", io.BytesIO(conteudo), "application/pdf")}
+    resp = await client.post(f"/api/aulas/{aula_id}/pdfs/", files=files, headers=auth_headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+async def test_upload_identico_reaproveita_resultado(client, auth_headers, db, monkeypatch):
+    from app.tasks import audio as audio_tasks
+    enfileirados = []
+    monkeypatch.setattr(audio_tasks.gerar_audio_google_task, "delay", enfileirados.append)
+
+    aula_id = await _nova_aula(client, auth_headers)
+    primeiro = await _upload(client, auth_headers, aula_id)
+    assert enfileirados == [primeiro["id"]]
+
+    # Simula o worker concluindo o primeiro processamento
+    audio_sha, audio_fs = gravar_blob(b"ID3 audio dedup", "mp3")
+    await reter_blob(db, audio_sha, audio_fs)
+    await db.pdfs.update_one(
+        {"_id": ObjectId(primeiro["id"])},
+        {"$set": {"status": "concluido", "transcricao": "texto", "audio_path": str(audio_fs),
+                  "audio_sha256": audio_sha, "tts_config": TTS_CONFIG_GOOGLE}},
+    )
+
+    segundo = await _upload(client, auth_headers, aula_id)
+    assert enfileirados == [primeiro["id"]]  # nada novo na fila
+    assert segundo["caminho"] == primeiro["caminho"]
+    assert segundo["audio_path"] == str(audio_fs)
+    assert segundo["transcricao"] == "texto"
+    assert (await db.blobs.find_one({"_id": audio_sha}))["refs"] == 2
+
+    # Excluir só marca o documento; a liberação dos blobs compartilhados é da purga (test_exclusao)
+    resp = await client.delete(f"/api/pdfs/{primeiro['id']}", headers=auth_headers)
+    assert resp.status_code == 200
+    assert Path(segundo["caminho"]).exists() and audio_fs.exists()
+    assert (await db.pdfs.find_one({"_id": ObjectId(primeiro["id"])}))["excluido_em"]
+    assert (await db.blobs.find_one({"_id": audio_sha}))["refs"] == 2
+
+
+async def test_audio_com_voz_alternativa_do_hedge_nao_e_reaproveitado(client, auth_headers, db, monkeypatch):
+    from app.tasks import audio as audio_tasks
+    enfileirados = []
+    monkeypatch.setattr(audio_tasks.gerar_audio_google_task, "delay", enfileirados.append)
+
+    aula_id = await _nova_aula(client, auth_headers)
+    primeiro = await _upload(client, auth_headers, aula_id, conteudo=b"%PDF-1.4 hedge")
+    audio_sha, audio_fs = gravar_blob(b"ID3 audio com voz mista", "mp3")
+    await db.pdfs.update_one(
+        {"_id": ObjectId(primeiro["id"])},
+        {"$set": {"status": "concluido", "audio_path": str(audio_fs), "audio_sha256": audio_sha,
+                  "tts_config": TTS_CONFIG_GOOGLE, "hedge_alternativo": True}},
+    )
+
+    segundo = await _upload(client, auth_headers, aula_id, conteudo=b"%PDF-1.4 hedge")
+    assert enfileirados == [primeiro["id"], segundo["id"]]  # processado de novo
+    assert segundo["audio_path"] is None
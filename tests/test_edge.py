@@ -0,0 +1,75 @@
+# tests/test_edge.py
+import mongomock
+import pytest
+from bson import ObjectId
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services import audio_generator
+from app.tasks import audio as audio_tasks
+from conftest import TEST_USER_ID
+
+
+@pytest.mark.asyncio
+async def test_gerar_audio_edge_responde_202_com_job(client, auth_headers, db):
+    res = await db.pdfs.insert_one({
+        "usuario_id": TEST_USER_ID, "aula_id": "a1", "filename": "aula.pdf", "caminho": "",
+        "data_upload": datetime.utcnow(), "status": "concluido", "transcricao": "Texto.",
+    })
+    pdf_id = str(res.inserted_id)
+
+    resp = await client.post(f"/api/pdfs/{pdf_id}/gerar-audio", headers=auth_headers)
+    assert resp.status_code == 202
+    corpo = resp.json()
+    assert corpo["status"] == "processando" and corpo["job_id"]
+    assert audio_tasks.gerar_audio_edge_task.delay.chamadas == [(pdf_id,)]
+
+    doc = await db.pdfs.find_one({"_id": res.inserted_id})
+    assert doc["job_id"] == corpo["job_id"] and doc["progresso"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_worker_que_termina_antes_do_delay_voltar_nao_e_sobrescrito(client, auth_headers, db, monkeypatch):
+    res = await db.pdfs.insert_one({
+        "usuario_id": TEST_USER_ID, "aula_id": "a1", "filename": "aula.pdf", "caminho": "",
+        "data_upload": datetime.utcnow(), "status": "concluido", "transcricao": "Texto.",
+    })
+    pdfs = vars(db.pdfs)["_AsyncMongoMockCollection__collection"]  # o .delay() é síncrono
+    vistos = []
+
+    def _delay_rapido(pdf_id):
+        vistos.append(pdfs.find_one({"_id": res.inserted_id})["status"])
+        pdfs.update_one({"_id": res.inserted_id}, {"$set": {"status": "concluido"}})  # o worker já acabou
+        return SimpleNamespace(id="job-rapido")
+
+    monkeypatch.setattr(audio_tasks.gerar_audio_edge_task, "delay", _delay_rapido)
+    resp = await client.post(f"/api/pdfs/{res.inserted_id}/gerar-audio", headers=auth_headers)
+    assert resp.status_code == 202
+    assert vistos == ["processando"]
+    doc = await db.pdfs.find_one({"_id": res.inserted_id})
+    assert doc["status"] == "concluido" and "job_id" not in doc
+
+
+def test_task_edge_publica_progresso(monkeypatch):
+    db = mongomock.MongoClient().db
+    eventos = []
+
+    async def _edge(bloco, voz):
+        return b"\xff\xf3" + bloco.encode()
+
+    monkeypatch.setattr(audio_tasks, "_get_db", lambda: (mongomock.MongoClient(), db))
+    monkeypatch.setattr(audio_tasks, "_post_evento", lambda **kw: eventos.append(kw))
+    monkeypatch.setattr(audio_generator, "sintetizar_bloco_edge", _edge)
+    monkeypatch.setattr(audio_tasks, "verificar_cancelamento", lambda pdf_id: None)
+
+    pdf_id = db.pdfs.insert_one({
+        "usuario_id": ObjectId(TEST_USER_ID), "aula_id": "a1", "transcricao": "Um texto curto.",
+    }).inserted_id
+    audio_tasks.gerar_audio_edge_task(str(pdf_id))
+
+    doc = db.pdfs.find_one({"_id": pdf_id})
+    assert doc["status"] == "concluido"
+    assert doc["tts_config"]["engine"] == "edge"
+    assert db.blobs.find_one({"_id": doc["audio_sha256"]})["refs"] == 1
+    assert [e.get("progresso") for e in eventos if e["status"] == "processando"][-1] == 1.0
+    assert eventos[-1]["status"] == "concluido"
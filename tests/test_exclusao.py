@@ -0,0 +1,127 @@
+# tests/test_exclusao.py
+import mongomock
+import pytest
+from bson import ObjectId
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.core.paths import DATA_DIR, pdf_path
+from app.services.blob_store import (
+    gravar_blob, guardar_blob_sync, liberar_blob_sync, liberar_blobs_sync, reter_blob_sync,
+)
+from app.tasks import limpeza
+
+USUARIO = ObjectId("66aabbccddeeff0011223344")
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    db = mongomock.MongoClient().db
+    revogados = []
+    monkeypatch.setattr(limpeza, "_get_db", lambda: (mongomock.MongoClient(), db))
+    monkeypatch.setattr(limpeza, "_revogar_jobs", revogados.extend)
+    return db, revogados
+
+
+def test_purga_remove_arvore_marcada_e_libera_blobs(worker):
+    db, revogados = worker
+    agora = datetime.utcnow()
+    materia_id = db.materias.insert_one({"usuario_id": USUARIO, "nome": "M", "excluido_em": agora}).inserted_id
+    # aula sem marca: a purga completa a cascata a partir da matéria
+    aula_id = str(db.aulas.insert_one({"usuario_id": USUARIO, "materia_id": str(materia_id)}).inserted_id)
+
+    compartilhado, caminho = gravar_blob(b"audio comum", "mp3")
+    reter_blob_sync(db, compartilhado, caminho)
+    reter_blob_sync(db, compartilhado, caminho)  # outro PDF (vivo) também usa
+    exclusivo, caminho_exclusivo = gravar_blob(b"audio so deste", "mp3")
+    reter_blob_sync(db, exclusivo, caminho_exclusivo)
+    legado = pdf_path(str(USUARIO), aula_id, "antigo")
+    legado.write_bytes(b"%PDF")
+
+    ids = db.pdfs.insert_many([
+        {"usuario_id": USUARIO, "aula_id": aula_id, "audio_sha256": compartilhado, "job_id": "job-1"},
+        {"usuario_id": USUARIO, "aula_id": aula_id, "caminho": str(legado), "audio_sha256": exclusivo},
+    ]).inserted_ids
+    db.sessoes_escuta.insert_one({"_id": "x", "pdf_id": str(ids[0])})
+
+    totais = limpeza.purgar_exclusoes_task()
+
+    assert totais == {"pdfs": 2, "blobs_apagados": 1, "aulas": 1, "materias": 1}
+    assert revogados == ["job-1"]
+    assert db.pdfs.count_documents({}) == 0 and db.sessoes_escuta.count_documents({}) == 0
+    assert db.blobs.find_one({"_id": compartilhado})["refs"] == 1 and caminho.exists()
+    assert not caminho_exclusivo.exists() and not legado.exists()
+    assert not (DATA_DIR / "pdfs" / str(USUARIO) / aula_id).exists()
+
+    # idempotente: uma segunda passada não libera nada de novo
+    assert limpeza.purgar_exclusoes_task() == {"pdfs": 0, "blobs_apagados": 0, "aulas": 0, "materias": 0}
+
+
+def test_purgador_que_morre_no_meio_nao_libera_o_blob_duas_vezes(worker, monkeypatch):
+    db, _ = worker
+    sha, caminho = gravar_blob(b"audio de dois pdfs", "mp3")
+    reter_blob_sync(db, sha, caminho)
+    reter_blob_sync(db, sha, caminho)  # o outro PDF continua vivo
+    db.pdfs.insert_one({"usuario_id": USUARIO, "aula_id": "a1", "audio_sha256": sha, "excluido_em": datetime.utcnow()})
+
+    delete_many = db.pdfs.delete_many
+
+    def _morre(*args, **kwargs):
+        monkeypatch.setattr(db.pdfs, "delete_many", delete_many)
+        raise RuntimeError("worker morto")
+
+    monkeypatch.setattr(db.pdfs, "delete_many", _morre)
+    with pytest.raises(RuntimeError):
+        limpeza.purgar_exclusoes_task()
+    # O lote do purgador morto expira
+    db.pdfs.update_many({}, {"$set": {"purga.em": datetime.utcnow() - limpeza.PURGA_TIMEOUT - timedelta(minutes=1)}})
+    assert limpeza.purgar_exclusoes_task()["pdfs"] == 1
+    assert db.blobs.find_one({"_id": sha})["refs"] == 1 and caminho.exists()
+
+
+def test_lote_reivindicado_nao_e_purgado_duas_vezes(worker):
+    db, _ = worker
+    db.pdfs.insert_one({"usuario_id": USUARIO, "aula_id": "a1", "excluido_em": datetime.utcnow()})
+    assert len(limpeza._reivindicar_lote(db, "outro")) == 1
+    assert limpeza._reivindicar_lote(db, "meu") == []
+
+
+def test_liberar_em_lote_preserva_blob_retido_entre_find_e_delete():
+    db = mongomock.MongoClient().db
+    sha, caminho = gravar_blob(b"audio disputado", "mp3")
+    reter_blob_sync(db, sha, caminho)
+
+    class _Blobs:
+        """Outro PDF retém o blob logo depois do find dos mortos."""
+
+        def __getattr__(self, nome):
+            return getattr(db.blobs, nome)
+
+        def find(self, *args, **kwargs):
+            mortos = list(db.blobs.find(*args, **kwargs))
+            reter_blob_sync(db, sha, caminho)
+            return mortos
+
+    assert liberar_blobs_sync(SimpleNamespace(blobs=_Blobs()), [sha]) == 0
+    assert db.blobs.find_one({"_id": sha})["refs"] == 1 and caminho.exists()
+
+
+def test_guardar_blob_com_liberacao_concorrente_mantem_o_arquivo():
+    db = mongomock.MongoClient().db
+    dados = b"audio liberado no meio"
+    sha, caminho = gravar_blob(dados, "mp3")
+    reter_blob_sync(db, sha, caminho)  # o único dono vai soltar enquanto outro job retém
+
+    class _Blobs:
+        """A liberação do outro dono apaga registro e arquivo logo antes do upsert."""
+
+        def __getattr__(self, nome):
+            return getattr(db.blobs, nome)
+
+        def update_one(self, *args, **kwargs):
+            assert liberar_blob_sync(db, sha) and not caminho.exists()
+            return db.blobs.update_one(*args, **kwargs)
+
+    assert guardar_blob_sync(SimpleNamespace(blobs=_Blobs()), dados, "mp3") == (sha, caminho)
+    assert db.blobs.find_one({"_id": sha})["refs"] == 1
+    assert caminho.read_bytes() == dados
@@ -5,6 +5,7 @@ from pathlib import Path
 from bson import ObjectId
 
 from app.core.paths import audio_path
+from app.tasks import limpeza
 
 pytestmark = pytest.mark.asyncio
 
@@ -14,15 +15,15 @@ def _fake_pdf_bytes() -> bytes:
 
 async def test_full_flow_async(client, auth_headers, db, test_user_id_str):
     # 1) Criar matéria
-    resp = await client.post("/materias/", json={"titulo": "Banco de Dados"}, headers=auth_headers)
+    resp = await client.post("/api/materias/", json={"nome": "Banco de Dados"}, headers=auth_headers)
     assert resp.status_code == 200, resp.text
     materia = resp.json()
     materia_id = materia["id"]
-    assert materia["titulo"] == "Banco de Dados"
+    assert materia["nome"] == "Banco de Dados"
 
     # 2) Criar aula
     resp = await client.post(
-        "/aulas/",
+        "/api/aulas/",
         json={"titulo": "Índices e Normalização", "descricao": "Aula 01", "materia_id": materia_id},
         headers=auth_headers,
     )
@@ -33,7 +34,7 @@ async def test_full_flow_async(client, auth_headers, db, test_user_id_str):
     # 3) Upload PDF
     pdf_bytes = _fake_pdf_bytes()
     files = {"file": ("aula01.pdf", io.BytesIO(pdf_bytes), "application/pdf")}
-    resp = await client.post(f"/aulas/{aula_id}/pdfs/", files=files, headers=auth_headers)
+    resp = await client.post(f"/api/aulas/{aula_id}/pdfs/", files=files, headers=auth_headers)
     assert resp.status_code == 200, resp.text
     pdf_doc = resp.json()
     pdf_id = pdf_doc["id"]
@@ -51,26 +52,31 @@ async def test_full_flow_async(client, auth_headers, db, test_user_id_str):
     await db.pdfs.update_one({"_id": ObjectId(pdf_id)}, {"$set": {"audio_path": str(dest_audio)}})
 
     # 5) Tocar áudio
-    resp = await client.get(f"/pdfs/{pdf_id}/audio", headers=auth_headers)
+    resp = await client.get(f"/api/pdfs/{pdf_id}/audio", headers=auth_headers)
     assert resp.status_code == 200
     assert resp.headers["content-type"].startswith("audio/mpeg")
 
     # 6) Listar PDFs da aula
-    resp = await client.get(f"/aulas/{aula_id}/pdfs", headers=auth_headers)
+    resp = await client.get(f"/api/aulas/{aula_id}/pdfs", headers=auth_headers)
     assert resp.status_code == 200
     lst = resp.json()
     assert any(item["id"] == pdf_id for item in lst)
 
-    # 7) Excluir PDF (remove banco + arquivos)
-    resp = await client.delete(f"/pdfs/{pdf_id}", headers=auth_headers)
+    # 7) Excluir PDF (marca e agenda a purga; arquivos saem no worker, ver test_exclusao)
+    resp = await client.delete(f"/api/pdfs/{pdf_id}", headers=auth_headers)
     assert resp.status_code == 200
-    assert not path_pdf.exists()
-    assert not dest_audio.exists()
+    assert limpeza.purgar_exclusoes_task.delay.chamadas
+    resp = await client.get(f"/api/aulas/{aula_id}/pdfs", headers=auth_headers)
+    assert all(item["id"] != pdf_id for item in resp.json())
+    resp = await client.get(f"/api/pdfs/{pdf_id}/audio", headers=auth_headers)
+    assert resp.status_code == 404
 
     # 8) Excluir aula
-    resp = await client.delete(f"/aulas/{aula_id}", headers=auth_headers)
+    resp = await client.delete(f"/api/aulas/{aula_id}", headers=auth_headers)
     assert resp.status_code == 200
 
     # 9) Excluir matéria
-    resp = await client.delete(f"/materias/{materia_id}", headers=auth_headers)
+    resp = await client.delete(f"/api/materias/{materia_id}", headers=auth_headers)
     assert resp.status_code == 200
+    resp = await client.get("/api/materias/", headers=auth_headers)
+    assert all(m["id"] != materia_id for m in resp.json())
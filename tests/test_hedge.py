@@ -0,0 +1,124 @@
+# tests/test_hedge.py
+import asyncio
+import threading
+import time
+
+import fitz
+import mongomock
+import pytest
+from bson import ObjectId
+
+from app.services import hedge
+from app.services.audio_generator import TTS_CONFIG_GOOGLE
+from app.tasks import audio as audio_tasks
+
+
+@pytest.fixture
+def aquecido(monkeypatch):
+    """Faixa de blocos curtos com p95 de ~10 ms e orçamento de 1 hedge a cada 10 chamadas."""
+    latencias = hedge.Latencias(minimo=5)
+    for _ in range(10):
+        latencias.registrar("teste", 100, 0.01)
+    monkeypatch.setattr(hedge, "LATENCIAS", latencias)
+    monkeypatch.setattr(hedge, "_orcamentos", {"teste": hedge.Orcamento(fracao=0.1)})
+    for _ in range(9):
+        hedge._orcamentos["teste"].contar()
+    return latencias
+
+
+def _lenta_na_primeira(segundos: float):
+    chamadas = []
+
+    def fn():
+        chamadas.append(1)
+        if len(chamadas) == 1:
+            time.sleep(segundos)
+            return "lenta"
+        return "rapida"
+
+    return fn, chamadas
+
+
+def test_sem_amostras_roda_direto_e_aprende_a_latencia(monkeypatch):
+    monkeypatch.setattr(hedge, "LATENCIAS", hedge.Latencias(minimo=5))
+    assert hedge.executar("teste", 100, lambda: "ok") == ("ok", False)
+    assert hedge.LATENCIAS.limiar("teste", 100) is None
+    assert hedge.LATENCIAS._amostras[("teste", 0)]
+
+
+def test_chamada_acima_do_p95_dispara_hedge_e_o_orcamento_limita(aquecido):
+    fn, chamadas = _lenta_na_primeira(0.5)
+    t0 = time.monotonic()
+    assert hedge.executar("teste", 100, fn) == ("rapida", False)  # mesma chamada: não é "reserva"
+    assert time.monotonic() - t0 < 0.3
+    assert len(chamadas) == 2
+
+    # Orçamento gasto (1 hedge em 11 chamadas > 10%): a próxima lenta espera a principal
+    fn, chamadas = _lenta_na_primeira(0.2)
+    assert hedge.executar("teste", 100, fn) == ("lenta", False)
+    assert len(chamadas) == 1
+
+
+def test_pool_ocupado_roda_na_thread_de_quem_chama_e_chamada_tem_prazo(aquecido, monkeypatch):
+    monkeypatch.setattr(hedge, "_em_voo", hedge.HEDGE_THREADS)  # perdedoras penduradas ocupam tudo
+    fn, chamadas = _lenta_na_primeira(0.1)
+    threads = []
+    assert hedge.executar("teste", 100, lambda: threads.append(threading.get_ident()) or fn()) == ("lenta", False)
+    assert threads == [threading.get_ident()] and len(chamadas) == 1
+
+    assert hedge.prazo("teste", 100) == hedge.HEDGE_PRAZO_MIN  # 4 x p95 (~10 ms) fica no mínimo
+    assert hedge.prazo("teste", 3000) == hedge.HEDGE_PRAZO_PADRAO  # faixa sem amostras
+
+
+def test_async_reserva_vence_e_a_perdedora_e_cancelada(aquecido):
+    canceladas = []
+
+    async def pendurada():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            canceladas.append(1)
+            raise
+
+    async def reserva():
+        return "alternativa"
+
+    async def rodar():
+        resultado = await hedge.executar_async("teste", 100, pendurada, reserva)
+        await asyncio.sleep(0)
+        return resultado
+
+    assert asyncio.run(rodar()) == ("alternativa", True)
+    assert canceladas == [1]
+
+
+def test_job_com_bloco_da_voz_alternativa_marca_o_documento(tmp_path, monkeypatch):
+    db = mongomock.MongoClient().db
+    caminho = tmp_path / "p.pdf"
+    with fitz.open() as doc:
+        for texto in ("Pagina um.", "Pagina dois."):
+            doc.new_page().insert_text((72, 72), texto)
+        doc.save(caminho)
+    alternativa = {**TTS_CONFIG_GOOGLE, "voz": "pt-BR-Wavenet-B"}
+
+    def _executar(provedor, caracteres, primaria, reserva=None):
+        # O hedge com a voz alternativa vence só o bloco da página dois
+        dados = primaria()
+        return (reserva(), True) if b"DOIS" in dados else (dados, False)
+
+    monkeypatch.setattr(audio_tasks, "_get_db", lambda: (mongomock.MongoClient(), db))
+    monkeypatch.setattr(audio_tasks, "melhorar_pontuacao_com_gemini", lambda texto: texto.upper())
+    monkeypatch.setattr(audio_tasks, "sintetizar_bloco_google", lambda texto, voz, pausas: b"\xff\xf3" + texto.encode())
+    monkeypatch.setattr(audio_tasks, "sintetizar_bloco", lambda texto, config: b"\xff\xf3" + config["voz"].encode())
+    monkeypatch.setattr(audio_tasks, "HEDGE_ALTERNATIVA_GOOGLE", alternativa)
+    monkeypatch.setattr(audio_tasks.hedge, "executar", _executar)
+    monkeypatch.setattr(audio_tasks, "_post_evento", lambda **kw: None)
+    monkeypatch.setattr(audio_tasks, "verificar_cancelamento", lambda pdf_id: None)
+
+    pdf_id = db.pdfs.insert_one({"usuario_id": ObjectId(), "aula_id": "a1", "caminho": str(caminho)}).inserted_id
+    audio_tasks.gerar_audio_google_task(str(pdf_id))
+    doc = db.pdfs.find_one({"_id": pdf_id})
+    assert doc["status"] == "concluido" and doc["hedge_alternativo"] is True
+    assert [b.get("tts_config") for b in doc["blocos"]] == [None, alternativa]
+    # O bloco alternativo fica no cache sob a config que o gerou, não sob a principal
+    assert db.blobs.find_one({"chave": audio_tasks._chave_bloco(alternativa, "PAGINA DOIS.")})
@@ -0,0 +1,35 @@
+# tests/test_indice_audio.py
+import pytest
+
+from app.utils.mp3 import duracao_mp3
+from app.services.indice_audio import montar_indice, localizar_pagina
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, sem padding: 417 bytes / 1152 amostras por frame
+FRAME_V1 = b"\xff\xfb\x90\x00" + b"\x00" * 413
+# MPEG-2 Layer III, 32 kbps, 24 kHz (perfil do Google TTS): 96 bytes / 576 amostras
+FRAME_V2 = b"\xff\xf3\x44\x00" + b"\x00" * 92
+
+
+def test_duracao_soma_frames():
+    assert duracao_mp3(FRAME_V1 * 100) == pytest.approx(100 * 1152 / 44100)
+    assert duracao_mp3(FRAME_V2 * 250) == pytest.approx(250 * 576 / 24000)
+    # Tag ID3 e lixo antes do primeiro frame são ignorados
+    id3 = b"ID3\x03\x00\x00\x00\x00\x00\x05" + b"12345"
+    assert duracao_mp3(id3 + b"xx" + FRAME_V2 * 10) == pytest.approx(10 * 576 / 24000)
+
+
+def test_localiza_pagina_no_indice():
+    blocos = [
+        {"pagina": 1, "bytes": 960, "duracao": 0.24},
+        {"pagina": 1, "bytes": 480, "duracao": 0.12},
+        {"pagina": 3, "bytes": 960, "duracao": 0.24},  # página 2 sem texto
+    ]
+    indice = montar_indice(blocos, "abc")
+    assert indice["byte"] == [0, 960, 1440]
+    assert indice["ms"] == [0, 240, 360]
+    assert indice["total_bytes"] == 2400
+
+    assert localizar_pagina(indice, 1)["byte"] == 0
+    assert localizar_pagina(indice, 2) == localizar_pagina(indice, 3)
+    assert localizar_pagina(indice, 3)["segundos"] == pytest.approx(0.36)
+    assert localizar_pagina(indice, 4) is None
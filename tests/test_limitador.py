@@ -0,0 +1,162 @@
+# tests/test_limitador.py
+import asyncio
+import threading
+import time
+
+import fakeredis
+import fitz
+import mongomock
+import pytest
+from bson import ObjectId
+
+from app.services import hedge, limitador
+from app.services.limitador import Limites, ProvedorIndisponivel
+from app.tasks import audio as audio_tasks
+
+
+class _ErroHttp(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    """Limitador ligado contra um Redis em memória (com Lua), sem espera entre tentativas."""
+    r = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(limitador, "LIMITADOR", "redis")
+    monkeypatch.setattr(limitador, "redis_sync", lambda: r)
+    monkeypatch.setattr(limitador, "BACKOFF_BASE", 0.0)
+    monkeypatch.setitem(limitador.LIMITES, "teste", Limites(rpm=60000, concorrencia_inicial=4, concorrencia_max=8))
+    return r
+
+
+def _falha_antes(codigos: list[int]):
+    chamadas = []
+
+    def fn(x):
+        chamadas.append(x)
+        if len(chamadas) <= len(codigos):
+            raise _ErroHttp(codigos[len(chamadas) - 1])
+        return x * 2
+
+    return fn, chamadas
+
+
+def _janela(r) -> float:
+    return float(r.hget(f"{limitador._chaves('teste', 'k')[1]}", "limite"))
+
+
+def test_429_e_5xx_sao_repetidos_e_cortam_a_janela(redis):
+    fn, chamadas = _falha_antes([429, 503])
+    assert limitador.chamar("teste", fn, 21, chave_api="k") == 42
+    assert len(chamadas) == 3
+    assert _janela(redis) < 4  # cortou pela metade (um corte por intervalo) e voltou a subir pouco
+    assert not redis.zcard(limitador._chaves("teste", "k")[2])  # nenhuma vaga presa
+
+
+def test_esgota_tentativas_e_nao_repete_erro_do_pedido(redis, monkeypatch):
+    monkeypatch.setattr(limitador, "LIMITADOR_TENTATIVAS", 3)
+    fn, chamadas = _falha_antes([503] * 10)
+    with pytest.raises(ProvedorIndisponivel):
+        limitador.chamar("teste", fn, 1, chave_api="k")
+    assert len(chamadas) == 3
+
+    fn, chamadas = _falha_antes([400])
+    with pytest.raises(_ErroHttp):
+        limitador.chamar("teste", fn, 1, chave_api="k")
+    assert len(chamadas) == 1
+
+
+def test_concorrencia_e_cota_compartilhadas(redis, monkeypatch):
+    monkeypatch.setitem(limitador.LIMITES, "teste", Limites(rpm=600, concorrencia_inicial=2, concorrencia_max=2))
+    em_curso, pico, lock = [0], [0], threading.Lock()
+
+    def fn():
+        with lock:
+            em_curso[0] += 1
+            pico[0] = max(pico[0], em_curso[0])
+        time.sleep(0.02)
+        with lock:
+            em_curso[0] -= 1
+
+    t0 = time.monotonic()
+    threads = [threading.Thread(target=limitador.chamar, args=("teste", fn)) for _ in range(15)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert pico[0] == 2
+    # 10/s com rajada de 10: as 5 além da rajada esperam ~0,5 s de fichas
+    assert time.monotonic() - t0 >= 0.4
+
+
+def test_bloco_sem_cota_falha_o_job_em_vez_de_sumir(tmp_path, monkeypatch):
+    db = mongomock.MongoClient().db
+    caminho = tmp_path / "p.pdf"
+    with fitz.open() as doc:
+        for texto in ("Pagina um.", "Pagina dois."):
+            doc.new_page().insert_text((72, 72), texto)
+        doc.save(caminho)
+
+    def _tts(texto, voz, pausas):
+        if "DOIS" in texto:
+            raise ProvedorIndisponivel("google_tts", _ErroHttp(429))
+        return b"\xff\xf3" + texto.encode()
+
+    monkeypatch.setattr(audio_tasks, "_get_db", lambda: (mongomock.MongoClient(), db))
+    monkeypatch.setattr(audio_tasks, "melhorar_pontuacao_com_gemini", lambda texto: texto.upper())
+    monkeypatch.setattr(audio_tasks, "sintetizar_bloco_google", _tts)
+    monkeypatch.setattr(audio_tasks, "_post_evento", lambda **kw: None)
+    monkeypatch.setattr(audio_tasks, "verificar_cancelamento", lambda pdf_id: None)
+
+    pdf_id = db.pdfs.insert_one({"usuario_id": ObjectId(), "aula_id": "a1", "caminho": str(caminho)}).inserted_id
+    audio_tasks.gerar_audio_google_task(str(pdf_id))
+    doc = db.pdfs.find_one({"_id": pdf_id})
+    assert doc["status"] == "erro"
+    assert not doc.get("audio_path")
+    assert db.blobs.count_documents({"refs": {"$gt": 0}}) == 0  # o bloco pronto foi solto
+
+
+def test_scripts_por_evalsha_e_async_fala_com_o_redis_fora_do_loop(redis, monkeypatch):
+    monkeypatch.setattr(redis, "eval", lambda *a, **kw: pytest.fail("EVAL manda o corpo do script"))
+    assert limitador.chamar("teste", lambda: "ok") == "ok"
+    assert redis.script_exists(*(s.sha for s in limitador._scripts(redis).values())) == [True, True]
+
+    threads = []
+    tentar_vaga = limitador._tentar_vaga
+    monkeypatch.setattr(limitador, "_tentar_vaga", lambda *a: threads.append(threading.get_ident()) or tentar_vaga(*a))
+
+    async def fn():
+        return "ok"
+
+    assert asyncio.run(limitador.chamar_async("teste", fn)) == "ok"
+    assert threads and threading.get_ident() not in threads
+    assert redis.zcard(limitador._chaves("teste", None)[2]) == 0
+
+
+def test_perdedora_cancelada_do_hedge_solta_a_vaga(redis, monkeypatch):
+    latencias = hedge.Latencias(minimo=1)
+    latencias.registrar("teste", 100, 0.01)
+    monkeypatch.setattr(hedge, "LATENCIAS", latencias)
+    monkeypatch.setattr(hedge, "_orcamentos", {"teste": hedge.Orcamento(fracao=1.0)})
+
+    async def pendurada():
+        await asyncio.sleep(10)
+
+    async def rapida():
+        return "reserva"
+
+    async def rodar():
+        return await hedge.executar_async(
+            "teste", 100,
+            lambda: limitador.chamar_async("teste", pendurada),
+            lambda: limitador.chamar_async("teste", rapida),
+        )
+
+    assert asyncio.run(rodar()) == ("reserva", True)
+    vagas = limitador._chaves("teste", None)[2]
+    prazo = time.monotonic() + 2  # a liberação roda no pool do limitador
+    while redis.zcard(vagas) and time.monotonic() < prazo:
+        time.sleep(0.01)
+    assert redis.zcard(vagas) == 0
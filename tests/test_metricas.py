@@ -0,0 +1,28 @@
+# tests/test_metricas.py
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core import metricas
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_metrics_expoe_latencia_por_rota(client, auth_headers):
+    await client.get("/api/materias/", headers=auth_headers)
+    await client.get("/api/aulas/000000000000000000000000/pdfs", headers=auth_headers)  # 404
+
+    resp = await client.get("/metrics")
+    assert resp.status_code == 200
+    texto = resp.text
+    assert 'transcrissor_http_segundos_count{metodo="GET",rota="/api/materias/",status="200"}' in texto
+    assert 'rota="/api/aulas/{aula_id}/pdfs",status="404"' in texto
+    assert 'rota="/metrics"' not in texto
+
+
+async def test_medir_etapa_observa_mesmo_com_erro():
+    contagem = lambda: REGISTRY.get_sample_value("transcrissor_etapa_segundos_count", {"etapa": "gemini"})
+    antes = contagem()
+    with pytest.raises(RuntimeError):
+        with metricas.medir("gemini"):
+            raise RuntimeError("falhou")
+    assert contagem() == antes + 1
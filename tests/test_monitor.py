@@ -0,0 +1,67 @@
+# tests/test_monitor.py
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import metricas, monitor
+
+pytestmark = pytest.mark.asyncio
+
+
+def _trava_o_loop(segundos: float) -> None:
+    time.sleep(segundos)  # IO síncrono dentro de uma corrotina
+
+
+async def test_vigia_registra_travamento_com_a_pilha():
+    vigia = monitor.VigiaLoop(limiar_ms=50)
+    vigia.iniciar()
+    try:
+        await asyncio.sleep(0.05)
+        _trava_o_loop(0.3)
+        await asyncio.sleep(0.1)
+    finally:
+        vigia.parar()
+
+    assert len(vigia.travamentos) == 1
+    evento = vigia.travamentos[0]
+    assert "test_monitor.py" in evento["local"] and "_trava_o_loop" in evento["local"]
+    assert evento["duracao_ms"] >= 200
+    assert any("test_vigia_registra_travamento_com_a_pilha" in q for q in evento["pilha"])
+
+
+async def test_ouvinte_conta_idas_da_requisicao_e_registra_comando_lento():
+    ouvinte = monitor.OuvinteMongo(limiar_ms=100)
+    scope = {"method": "GET", "route": SimpleNamespace(path="/api/aulas/")}
+    requisicao = {"idas": 0, "scope": scope}
+    token = metricas.REQUISICAO_ATUAL.set(requisicao)
+    try:
+        for n, duracao in ((1, 2_000), (2, 250_000)):
+            comando = {"find": "aulas", "filter": {"usuario_id": "segredo", "excluido_em": None}, "sort": {"data_upload": -1}}
+            ouvinte.started(SimpleNamespace(connection_id=("db", 27017), request_id=n, command=comando))
+            ouvinte.succeeded(SimpleNamespace(
+                connection_id=("db", 27017), request_id=n, command_name="find", duration_micros=duracao,
+            ))
+    finally:
+        metricas.REQUISICAO_ATUAL.reset(token)
+
+    assert requisicao["idas"] == 2
+    assert len(ouvinte.lentos) == 1
+    lento = ouvinte.lentos[0]
+    assert lento["rota"] == "GET /api/aulas/" and lento["colecao"] == "aulas"
+    assert lento["filtro"] == ["excluido_em", "usuario_id"] and lento["ordem"] == ["data_upload"]
+    assert "segredo" not in str(lento)  # só a forma do filtro, nunca os valores
+
+
+async def test_endpoint_interno_expoe_idas_por_rota(client, auth_headers, monkeypatch):
+    await client.get("/api/materias/", headers=auth_headers)
+    assert (await client.get("/internal/monitor")).status_code == 404  # sem MONITOR_TOKEN: fechado
+
+    monkeypatch.setattr(monitor, "MONITOR_TOKEN", "segredo-do-monitor")
+    assert (await client.get("/internal/monitor", headers={"X-Monitor-Token": "errado"})).status_code == 404
+    resp = await client.get("/internal/monitor", headers={"X-Monitor-Token": "segredo-do-monitor"})
+    assert resp.status_code == 200
+    corpo = resp.json()
+    assert corpo["rotas"]["GET /api/materias/"]["requisicoes"] >= 1
+    assert set(corpo) == {"loop", "mongo", "rotas"}
@@ -0,0 +1,118 @@
+# tests/test_paginas.py
+from pathlib import Path
+
+import fitz
+import mongomock
+import pytest
+from bson import ObjectId
+
+from app.core.paths import audio_path
+from app.services.cancelamento import JobCancelado
+from app.tasks import audio as audio_tasks
+
+
+def _pdf(tmp_path, nome: str, paginas: list[str]) -> str:
+    caminho = tmp_path / nome
+    with fitz.open() as doc:
+        for texto in paginas:
+            doc.new_page().insert_text((72, 72), texto)
+        doc.save(caminho)
+    return str(caminho)
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Roda a task de forma síncrona contra um Mongo em memória e provedores falsos."""
+    db = mongomock.MongoClient().db
+    chamadas = {"gemini": 0, "tts": 0}
+
+    def _gemini(texto):
+        chamadas["gemini"] += 1
+        return texto.upper()
+
+    def _tts(texto, voz, pausas):
+        chamadas["tts"] += 1
+        return b"\xff\xf3" + texto.encode()
+
+    monkeypatch.setattr(audio_tasks, "_get_db", lambda: (mongomock.MongoClient(), db))
+    monkeypatch.setattr(audio_tasks, "melhorar_pontuacao_com_gemini", _gemini)
+    monkeypatch.setattr(audio_tasks, "sintetizar_bloco_google", _tts)
+    monkeypatch.setattr(audio_tasks, "_post_evento", lambda **kw: None)
+    monkeypatch.setattr(audio_tasks, "verificar_cancelamento", lambda pdf_id: None)
+    return db, chamadas
+
+
+def _processar(db, caminho: str) -> dict:
+    usuario = ObjectId("66aabbccddeeff0011223344")
+    pdf_id = db.pdfs.insert_one({"usuario_id": usuario, "aula_id": "a1", "caminho": caminho}).inserted_id
+    audio_tasks.gerar_audio_google_task(str(pdf_id))
+    return db.pdfs.find_one({"_id": pdf_id})
+
+
+def test_reupload_reaproveita_paginas_iguais(tmp_path, worker):
+    db, chamadas = worker
+    v1 = _processar(db, _pdf(tmp_path, "v1.pdf", ["Slide um.", "Slide dois.", "Slide tres."]))
+    assert v1["status"] == "concluido"
+    assert v1["resumo"]["paginas_reusadas"] == 0
+    assert v1["resumo"]["tempo_primeiro_audio"] is not None
+    assert "segmentos" not in v1  # finalizados no MP3 único
+    assert v1["hls_target"] == audio_tasks._alvo_hls(audio_tasks._dividir_paginas([
+        {"pagina": i + 1, "transcricao": t} for i, t in enumerate(("SLIDE UM.", "SLIDE DOIS.", "SLIDE TRES."))
+    ]))
+    assert chamadas == {"gemini": 3, "tts": 3}
+
+    v2 = _processar(db, _pdf(tmp_path, "v2.pdf", ["Slide um.", "Slide dois revisado.", "Slide tres."]))
+    assert v2["status"] == "concluido"
+    assert v2["resumo"]["paginas_reusadas"] == 2
+    assert v2["resumo"]["reuso_paginas"] == pytest.approx(0.667)
+    assert v2["resumo"]["blocos_reusados"] == 2
+    assert chamadas == {"gemini": 4, "tts": 4}  # só a página alterada foi reprocessada
+    assert [p["pagina"] for p in v2["paginas"]] == [1, 2, 3]
+
+
+def test_falha_ao_finalizar_solta_os_blocos_e_bloco_sem_arquivo_e_refeito(tmp_path, worker, monkeypatch):
+    db, chamadas = worker
+    v1 = _processar(db, _pdf(tmp_path, "v1.pdf", ["Slide um.", "Slide dois."]))
+    perdido = Path(db.blobs.find_one({"_id": v1["blocos"][0]["sha256"]})["caminho"])
+    perdido.unlink()
+    refs = {b["_id"]: b["refs"] for b in db.blobs.find()}
+
+    def _disco_cheio(*args, **kwargs):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(audio_tasks, "guardar_arquivo_sync", _disco_cheio)
+    v2 = _processar(db, _pdf(tmp_path, "v2.pdf", ["Slide um.", "Slide dois."]))
+    assert v2["status"] == "erro"
+    assert chamadas["tts"] == 3 and perdido.exists()  # sintetizado de novo, não pulado
+    assert {b["_id"]: b["refs"] for b in db.blobs.find()} == refs  # o job que falhou não retém nada
+
+
+def test_intervalo_reaproveita_blocos_do_audio_completo(tmp_path, worker):
+    db, chamadas = worker
+    doc = _processar(db, _pdf(tmp_path, "livro.pdf", ["Cap um.", "Cap dois.", "Cap tres.", "Cap quatro."]))
+    assert chamadas["tts"] == 4
+
+    audio_tasks.gerar_audio_intervalo_task(str(doc["_id"]), 2, 3)
+    intervalo = db.pdfs.find_one({"_id": doc["_id"]})["intervalos"]["2-3"]
+    assert intervalo["status"] == "concluido"
+    assert [b["pagina"] for b in intervalo["blocos"]] == [2, 3]
+    assert intervalo["resumo"]["blocos_reusados"] == 2
+    assert chamadas["tts"] == 4
+
+
+def test_cancelamento_para_entre_blocos_e_limpa_saida_parcial(tmp_path, worker, monkeypatch):
+    db, chamadas = worker
+
+    def _verificar(pdf_id):
+        if chamadas["tts"] >= 2:  # "excluído" depois do segundo bloco sintetizado
+            raise JobCancelado(pdf_id)
+
+    monkeypatch.setattr(audio_tasks, "verificar_cancelamento", _verificar)
+    doc = _processar(db, _pdf(tmp_path, "grande.pdf", ["Um.", "Dois.", "Tres.", "Quatro.", "Cinco."]))
+
+    assert doc["status"] == "cancelado"
+    assert doc["cancelamento"] == {"tts_desperdicadas": 2}
+    assert chamadas["tts"] == 2
+    assert "segmentos" not in doc and "audio_sha256" not in doc
+    assert db.blobs.count_documents({}) == 0  # blocos retidos foram soltos
+    assert not audio_path(str(doc["usuario_id"]), "a1", str(doc["_id"])).exists()
@@ -0,0 +1,40 @@
+# tests/test_perfil.py
+from contextlib import nullcontext
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.core import perfil
+from app.main import app
+from app.tasks import audio as audio_tasks
+
+
+def test_task_sem_pedido_nao_perfila(monkeypatch):
+    monkeypatch.setattr(perfil, "PERFIL_AMOSTRAGEM", 0.0)
+    assert isinstance(perfil.perfil_da_task("abc"), nullcontext)
+
+
+def test_task_perfilada_grava_cpu_e_alocacoes():
+    with perfil.perfil_da_task("pdf123", forcar=True):
+        sum(len(str(i)) for i in range(10000))
+    gerados = sorted(p.suffix for p in (perfil.PERFIL_DIR / "pdfs").glob("pdf123-*"))
+    assert gerados == [".prof", ".tracemalloc", ".txt"]
+
+
+@pytest.mark.asyncio
+async def test_header_com_token_perfila_requisicao_e_repassa_ao_job(monkeypatch, auth_headers):
+    monkeypatch.setattr(perfil, "PERFIL_TOKEN", "segredo")
+    async with AsyncClient(transport=ASGITransport(app=perfil.PerfilHTTP(app)), base_url="http://test") as c:
+        resp = await c.get("/api/materias/", headers={**auth_headers, "X-Perfil": "errado"})
+        assert "x-perfil-id" not in resp.headers
+
+        resp = await c.get("/api/materias/", headers={**auth_headers, "X-Perfil": "segredo"})
+        assert (perfil.PERFIL_DIR / "requisicoes" / f"{resp.headers['x-perfil-id']}.prof").exists()
+
+        resp = await c.post("/api/materias/", json={"nome": "P"}, headers=auth_headers)
+        resp = await c.post("/api/aulas/", json={"titulo": "A", "materia_id": resp.json()["id"]}, headers=auth_headers)
+        resp = await c.post(
+            f"/api/aulas/{resp.json()['id']}/pdfs/", files={"file": ("p.pdf", b"%PDF-1.4 perfil", "application/pdf")},
+            headers={**auth_headers, "X-Perfil": "segredo"},
+        )
+    assert audio_tasks.gerar_audio_google_task.delay.chamadas[-1] == (resp.json()["id"], {"perfilar": True})
@@ -0,0 +1,75 @@
+# tests/test_playlist.py
+import re
+import time
+
+import pytest
+from datetime import datetime
+
+from app.core.assinatura import ARQUIVOS_LINK_TTL
+from app.services.blob_store import gravar_blob
+from conftest import TEST_USER_ID
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_playlist_cresce_durante_processamento(client, auth_headers, db):
+    sha, _ = gravar_blob(b"\xff\xf3segmento-0", "mp3")
+    res = await db.pdfs.insert_one({
+        "usuario_id": TEST_USER_ID, "aula_id": "a1", "filename": "x.pdf", "caminho": "",
+        "data_upload": datetime.utcnow(), "status": "processando", "hls_target": 45,
+        "segmentos": [{"pagina": 1, "sha256": sha, "bytes": 12, "duracao": 4.2}],
+    })
+    pdf_id = str(res.inserted_id)
+
+    resp = await client.get(f"/api/pdfs/{pdf_id}/audio/playlist.m3u8", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/vnd.apple.mpegurl")
+    assert "#EXTINF:4.200,\n/api/arquivos/" in resp.text
+    assert "#EXT-X-ENDLIST" not in resp.text
+    assert "#EXT-X-TARGETDURATION:45\n" in resp.text  # fixado pelo job antes da síntese
+
+    resp = await client.get(f"/api/pdfs/{pdf_id}/audio/segmentos/0", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.content == b"\xff\xf3segmento-0"
+
+    resp = await client.get(f"/api/pdfs/{pdf_id}/audio/segmentos/1", headers=auth_headers)
+    assert resp.status_code == 404
+
+    # Concluído: o alvo não muda entre recargas, mesmo que o maior bloco seja menor
+    await db.pdfs.update_one({"_id": res.inserted_id}, {"$set": {
+        "status": "concluido", "audio_sha256": "final", "indice_audio": {"audio_sha256": "final"},
+        "blocos": [{"pagina": 1, "sha256": sha, "bytes": 12, "duracao": 4.2}],
+    }, "$unset": {"segmentos": ""}})
+    resp = await client.get(f"/api/pdfs/{pdf_id}/audio/playlist.m3u8", headers=auth_headers)
+    assert "#EXT-X-TARGETDURATION:45\n" in resp.text
+    assert resp.text.endswith("#EXT-X-ENDLIST\n")
+
+
+async def test_playlist_antes_da_sintese_nao_existe(client, auth_headers, db):
+    res = await db.pdfs.insert_one({
+        "usuario_id": TEST_USER_ID, "aula_id": "a1", "filename": "x.pdf", "caminho": "",
+        "data_upload": datetime.utcnow(), "status": "processando", "segmentos": [],
+    })
+    resp = await client.get(f"/api/pdfs/{res.inserted_id}/audio/playlist.m3u8", headers=auth_headers)
+    assert resp.status_code == 404
+
+
+async def test_playlist_completa_anuncia_o_maior_segmento(client, auth_headers, db):
+    blocos = []
+    for i, duracao in enumerate((300.0, 312.4, 298.1)):
+        sha, _ = gravar_blob(f"\xff\xf3bloco-{i}".encode(), "mp3")
+        blocos.append({"pagina": i + 1, "sha256": sha, "bytes": 12, "duracao": duracao})
+    res = await db.pdfs.insert_one({
+        "usuario_id": TEST_USER_ID, "aula_id": "a1", "filename": "x.pdf", "caminho": "",
+        "data_upload": datetime.utcnow(), "status": "concluido", "audio_sha256": "final",
+        "blocos": blocos, "indice_audio": {"audio_sha256": "final"},
+    })
+
+    resp = await client.get(f"/api/pdfs/{res.inserted_id}/audio/playlist.m3u8", headers=auth_headers)
+    assert resp.status_code == 200
+    assert "#EXT-X-TARGETDURATION:313\n" in resp.text
+    assert resp.text.endswith("#EXT-X-ENDLIST\n")
+    # Sem recarga depois do ENDLIST: todo link vale a aula inteira (~15 min) além da folga
+    expiracoes = [int(e) for e in re.findall(r"exp=(\d+)", resp.text)]
+    assert len(expiracoes) == 3
+    assert min(expiracoes) >= time.time() + 910 + ARQUIVOS_LINK_TTL - 5
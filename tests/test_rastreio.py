@@ -0,0 +1,49 @@
+# tests/test_rastreio.py
+import json
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.core import rastreio
+from app.tasks import audio as audio_tasks, celery_app
+
+pytestmark = pytest.mark.asyncio
+
+
+def _spans(trace_id: str) -> list[dict]:
+    with open(rastreio.TRACING_ARQUIVO, encoding="utf-8") as f:
+        return [s for s in map(json.loads, f) if s["trace_id"] == trace_id]
+
+
+async def test_trace_do_upload_ate_o_evento(client, auth_headers, db):
+    resp = await client.post("/api/materias/", json={"nome": "Tr"}, headers=auth_headers)
+    resp = await client.post("/api/aulas/", json={"titulo": "A", "materia_id": resp.json()["id"]}, headers=auth_headers)
+    aula_id = resp.json()["id"]
+
+    # O .delay está mockado: roda o hook de publicação dentro do span do upload
+    headers = {}
+    audio_tasks.gerar_audio_google_task.delay = lambda pdf_id: celery_app._marcar_enfileiramento(headers=headers)
+    resp = await client.post(
+        f"/api/aulas/{aula_id}/pdfs/", files={"file": ("t.pdf", b"%PDF-1.4 trace", "application/pdf")},
+        headers=auth_headers,
+    )
+    pdf_id = resp.json()["id"]
+    trace_id = (await db.pdfs.find_one({"_id": ObjectId(pdf_id)}))["trace_id"]
+    assert headers["traceparent"].split("-")[1] == trace_id
+
+    # Worker: span da task filho do traceparent; etapas e evento dentro dele
+    request = {"traceparent": headers["traceparent"]}
+    task = SimpleNamespace(name="app.tasks.audio.gerar_audio_google_task", request=SimpleNamespace(get=request.get, headers=None))
+    celery_app._iniciar_task(task_id="t1", task=task)
+    with rastreio.span("tts_bloco"):
+        evento = rastreio.injetar()
+    celery_app._encerrar_task(task_id="t1", task=task, state="SUCCESS")
+
+    await client.post("/api/eventos/pdf-audio", json={"pdf_id": pdf_id, "status": "concluido"}, headers=evento)
+
+    nomes = {s["nome"]: s for s in _spans(trace_id)}
+    assert {"upload_pdf", "gravar_pdf", task.name, "tts_bloco", "evento_pdf_audio"} <= set(nomes)
+    assert nomes["tts_bloco"]["pai"] == nomes[task.name]["span_id"]
+    assert nomes["evento_pdf_audio"]["pai"] == nomes["tts_bloco"]["span_id"]
+    assert "* " in rastreio.caminho_critico(_spans(trace_id))
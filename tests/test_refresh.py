@@ -0,0 +1,49 @@
+# tests/test_refresh.py
+import asyncio
+import pytest
+
+from app.routes.auth_routes import COOKIE_NAME
+
+pytestmark = pytest.mark.asyncio
+
+
+def _cookie(resp) -> str:
+    # O cookie é Secure (não volta sozinho em http://test): extrai do Set-Cookie e manda no header
+    valor = resp.headers["set-cookie"].split(";", 1)[0]
+    assert valor.startswith(f"{COOKIE_NAME}=")
+    return valor
+
+
+async def test_refresh_concorrente_tem_um_unico_vencedor(client, db):
+    await client.post("/api/auth/register", json={
+        "nome": "Aluno", "email": "refresh@exemplo.com", "cpf": "39053344705", "senha": "segredo123",
+    })
+    resp = await client.post("/api/auth/login", json={"identificador": "refresh@exemplo.com", "senha": "segredo123"})
+    assert resp.status_code == 200, resp.text
+    cookie = _cookie(resp)
+
+    respostas = await asyncio.gather(*[
+        client.post("/api/auth/refresh", headers={"Cookie": cookie}) for _ in range(10)
+    ])
+    vencedoras = [r for r in respostas if r.status_code == 200]
+    assert len(vencedoras) == 1
+    assert all(r.status_code == 401 for r in respostas if r is not vencedoras[0])
+    assert await db.refresh_tokens.count_documents({"user_id": {"$exists": True}, "rotated_from": cookie.split("=", 1)[1]}) == 1
+
+    # O cookie rotacionado vale uma vez; o antigo nunca mais
+    novo = _cookie(vencedoras[0])
+    assert (await client.post("/api/auth/refresh", headers={"Cookie": novo})).status_code == 200
+    assert (await client.post("/api/auth/refresh", headers={"Cookie": cookie})).status_code == 401
+
+
+async def test_refresh_de_usuario_apagado_responde_401(client, db):
+    await client.post("/api/auth/register", json={
+        "nome": "Aluno", "email": "apagado@exemplo.com", "cpf": "11144477735", "senha": "segredo123",
+    })
+    resp = await client.post("/api/auth/login", json={"identificador": "apagado@exemplo.com", "senha": "segredo123"})
+    assert resp.status_code == 200, resp.text
+    cookie = _cookie(resp)
+
+    await db.usuarios.delete_many({"email": "apagado@exemplo.com"})
+    assert (await client.post("/api/auth/refresh", headers={"Cookie": cookie})).status_code == 401
+    assert await db.refresh_tokens.count_documents({"rotated_from": cookie.split("=", 1)[1], "revoked": True}) == 1